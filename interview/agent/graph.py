@@ -1,7 +1,9 @@
 """Interview StateGraph definition."""
 
+import functools
 import logging
 import os
+import uuid
 from typing import Literal
 from langgraph.graph import END, StateGraph
 from langchain_core.messages import HumanMessage, AIMessage
@@ -12,6 +14,9 @@ from langgraph.graph import END, StateGraph
 from langgraph.checkpoint.memory import MemorySaver
 from dotenv import load_dotenv
 
+from resume_api.utils.model_routing import get_route
+from resume_api.utils.prompt_budget import Section, build_prompt
+
 from .state import State
 from .prompts import (
     START_PROMPT, 
@@ -31,17 +36,134 @@ load_dotenv()
 
 logger = logging.getLogger(__name__) 
 
-# Initialize the language model to be used for memory extraction
-MODEL_NAME = os.environ.get("LLM_MODEL", "groq/llama3-8b-8192")
-if "/" in MODEL_NAME:
-    provider, model = MODEL_NAME.split("/", 1)
+# Each task runs on the Groq model its route (LLM_ROUTES) picks. LLM_MODEL
+# ("provider/model", or a model of LLM_PROVIDER) replaces the model of the
+# interview conversation itself (questions and answer evaluation), as it
+# did before routing; voice analysis and the closing keep their own route.
+# The routes' max_tokens, temperature and timeout still apply.
+MODEL_NAME = os.environ.get("LLM_MODEL")
+MODEL_NAME_TASKS = frozenset({"interview_question", "interview_evaluate"})
+
+
+def _provider_model(task, route):
+    if not MODEL_NAME or task not in MODEL_NAME_TASKS:
+        return "groq", route.model
+    if "/" in MODEL_NAME:
+        return tuple(MODEL_NAME.split("/", 1))
+    return os.environ.get("LLM_PROVIDER", "openai"), MODEL_NAME
+
+
+@functools.lru_cache(maxsize=None)
+def _chat_model(provider, model, max_tokens, temperature, timeout):
     extra = {}
     if provider == "groq":
         extra["api_key"] = os.environ.get("GROQ_API_KEY")
-    llm = init_chat_model(model=model, model_provider=provider, **extra)
-else:
-    provider = os.environ.get("LLM_PROVIDER", "openai")
-    llm = init_chat_model(model=MODEL_NAME, model_provider=provider)
+    return init_chat_model(
+        model=model, model_provider=provider,
+        max_tokens=max_tokens, temperature=temperature, timeout=timeout, **extra,
+    )
+
+
+def _llm(task):
+    """(provider, route, chat model) for an interview task; models are shared per route."""
+    route = get_route(task)
+    provider, model = _provider_model(task, route)
+    return provider, route, _chat_model(provider, model, route.max_tokens, route.temperature, route.timeout)
+
+
+async def _ainvoke(task, messages):
+    """ainvoke on the task's model, queued behind the Groq rate limiter the resume API shares."""
+    from resume_api.utils.rate_limiter import estimate_tokens, get_rate_limiter
+
+    provider, route, llm = _llm(task)
+    limiter = get_rate_limiter() if provider == "groq" else None
+    if limiter is None:
+        return await llm.ainvoke(messages)
+
+    estimated = estimate_tokens(messages, route.max_tokens)
+    await limiter.aacquire(estimated)
+    # A failed call gives its whole reservation back
+    actual = 0
+    try:
+        response = await llm.ainvoke(messages)
+        usage = getattr(response, "usage_metadata", None)
+        actual = usage.get("total_tokens") if usage else None
+        return response
+    finally:
+        await limiter.asettle(estimated, actual)
+
+
+async def _astream(task, messages):
+    """astream behind the same rate limiter as _ainvoke()."""
+    from resume_api.utils.rate_limiter import estimate_tokens, get_rate_limiter
+
+    provider, route, llm = _llm(task)
+    limiter = get_rate_limiter() if provider == "groq" else None
+    if limiter is None:
+        async for chunk in llm.astream(messages):
+            yield chunk
+        return
+
+    estimated = estimate_tokens(messages, route.max_tokens)
+    await limiter.aacquire(estimated)
+    # Refund a stream that fails before its first chunk; one that breaks off
+    # midway keeps its reservation, as its real usage is unknown
+    usage = None
+    started = False
+    try:
+        async for chunk in llm.astream(messages):
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            started = True
+            yield chunk
+    finally:
+        if usage:
+            actual = usage.get("total_tokens")
+        else:
+            actual = None if started else 0
+        await limiter.asettle(estimated, actual)
+
+
+async def _stream_turn(interview_id, task, messages) -> str:
+    """Generate an interviewer turn, pushing it to the WebSocket as it is written.
+
+    The client gets a ``start`` frame, one ``delta`` frame per chunk and an
+    ``end`` frame with the whole message (or an ``error``). Returns the text.
+    """
+    from channels.layers import get_channel_layer
+    channel_layer = get_channel_layer()
+    group = f"interview_{interview_id}"
+    stream_id = uuid.uuid4().hex
+
+    async def send(frame):
+        await channel_layer.group_send(
+            group, {"type": "interview.stream", "frame": {"stream_id": stream_id, **frame}}
+        )
+
+    await send({"type": "start"})
+    parts = []
+    try:
+        async for chunk in _astream(task, messages):
+            if chunk.content:
+                parts.append(chunk.content)
+                await send({"type": "delta", "text": chunk.content})
+    except BaseException as e:
+        # Also on cancellation, so the client never waits on an open stream
+        await send({"type": "end", "error": str(e) or type(e).__name__})
+        raise
+    text = "".join(parts)
+    await send({"type": "end", "message": text})
+    return text
+
+
+def _stream_turns(state: State) -> bool:
+    """Stream when the client asked for it in its message, or the server opts everyone in."""
+    from django.conf import settings
+    return state.stream_turns or settings.INTERVIEW_STREAM_TURNS
+
+
+def _prompt_budget() -> int:
+    from django.conf import settings
+    return settings.LLM_PROMPT_TOKEN_BUDGET
 
 def calculate_max_questions(duration: int) -> int:
     """Calculate number of questions based on interview duration."""
@@ -93,25 +215,33 @@ async def start_interview(state: State) -> dict:
 
 async def ask_question(state: State) -> dict:
     """Ask a question to the user."""
-    prompt = NEXT_QUESTION_PROMPT.format(
+    # The history grows every turn; its oldest turns are dropped first
+    prompt = build_prompt("interview_question", NEXT_QUESTION_PROMPT, _prompt_budget(), {
+        "conversation_history": Section(
+            "\n".join([msg.content for msg in state.messages if hasattr(msg, 'content')]),
+            priority=0, min_tokens=1000, keep="tail",
+        ),
+        "job_description": Section(state.job_description, priority=1, min_tokens=500),
+    },
         job_title=state.job_title,
         company=state.company,
-        job_description=state.job_description,
         interview_type=state.interview_type.value if hasattr(state.interview_type, "value") else str(state.interview_type),
         experience_level=state.experience_level.value if hasattr(state.experience_level, "value") else str(state.experience_level),
-        conversation_history="\n".join([msg.content for msg in state.messages if hasattr(msg, 'content')])
     )
 
-    response = await llm.ainvoke([{"role": "system", "content": prompt}])
-    question = response.content
-
-    from channels.layers import get_channel_layer
-    channel_layer = get_channel_layer()
     interview_id = state.interview_id
+    if _stream_turns(state):
+        question = await _stream_turn(interview_id, "interview_question", [{"role": "system", "content": prompt}])
+    else:
+        response = await _ainvoke("interview_question", [{"role": "system", "content": prompt}])
+        question = response.content
 
-    await channel_layer.group_send(
-        f"interview_{interview_id}", {"type": "interview.message", "message": question}
-    )
+        from channels.layers import get_channel_layer
+        channel_layer = get_channel_layer()
+
+        await channel_layer.group_send(
+            f"interview_{interview_id}", {"type": "interview.message", "message": question}
+        )
 
     return {
         "messages": [{"role": "assistant", "content": question}],
@@ -125,23 +255,26 @@ async def analyze_voice_response(state: State) -> dict:
     if not state.voice_analysis_enabled or not state.user_response:
         return {"voice_feedback": None}
     
-    prompt = VOICE_ANALYSIS_PROMPT.format(user_response = state.user_response)
-    response = await llm.ainvoke([{"role": "system", "content": prompt}])
+    prompt = build_prompt("interview_voice", VOICE_ANALYSIS_PROMPT, _prompt_budget(), {
+        "user_response": Section(state.user_response),
+    })
+    response = await _ainvoke("interview_voice", [{"role": "system", "content": prompt}])
 
     return {"voice_feedback":response.content}
 
 async def evaluate_answer(state: State) -> dict:
     """Evaluate the answer of the user."""
     voice_analysis = await analyze_voice_response(state)
-    prompt = EVALUATE_ANSWER_PROMPT.format(
-        job_description=state.job_description,
+    prompt = build_prompt("interview_evaluate", EVALUATE_ANSWER_PROMPT, _prompt_budget(), {
+        "job_description": Section(state.job_description, priority=0, min_tokens=500),
+        "user_response": Section(state.user_response, priority=1, min_tokens=1000),
+    },
         job_title=state.job_title,
         interview_type=state.interview_type.value if hasattr(state.interview_type, "value") else str(state.interview_type),
         current_question=state.current_question,
-        user_response=state.user_response,
     )
 
-    response = await llm.ainvoke([{"role": "system", "content": prompt}])
+    response = await _ainvoke("interview_evaluate", [{"role": "system", "content": prompt}])
     evaluation = response.content
 
     feedback = ""
@@ -219,8 +352,11 @@ async def end_interview(state: State) -> dict:
         company = state.company,
         interview_type = state.interview_type.value if hasattr(state.interview_type, "value") else str(state.interview_type),
     )
-    response = await llm.ainvoke([{"role": "system", "content": prompt}])
-    closing = response.content
+    if _stream_turns(state):
+        closing = await _stream_turn(state.interview_id, "interview_closing", [{"role": "system", "content": prompt}])
+    else:
+        response = await _ainvoke("interview_closing", [{"role": "system", "content": prompt}])
+        closing = response.content
     return {
         "messages": [{"role": "assistant", "content": closing}],
         "current_state": "end",
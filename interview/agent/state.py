@@ -46,6 +46,8 @@ class State:
     voice_analysis_enabled: bool = field(default = False)
     voice_feedback: Optional[str] = field(default = None)
     interview_id: Optional[str] = None
+    # The client's last message asked for start/delta/end frames
+    stream_turns: bool = field(default = False)
 
 __all__ = [
     "State",
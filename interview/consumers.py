@@ -1,7 +1,12 @@
 import json
+import logging
+
 from channels.generic.websocket import AsyncWebsocketConsumer
+from resume_api.utils.rate_limiter import RateLimitTimeout
 from .agent import create_app
 
+logger = logging.getLogger(__name__)
+
 _app = create_app("interview_memory.db")
 
 class InterviewConsumer(AsyncWebsocketConsumer):
@@ -35,10 +40,26 @@ class InterviewConsumer(AsyncWebsocketConsumer):
             "messages": messages,
             "user_response": user_response,
             "current_state": "evaluate_answer",
+            # Streamed start/delta/end frames are opt-in per message
+            "stream_turns": bool(data.get("stream", False)),
         }
         
         # Run graph step
-        result = await _app.ainvoke(updated_state, config=config)
+        try:
+            result = await _app.ainvoke(updated_state, config=config)
+        except RateLimitTimeout as e:
+            # The shared LLM quota stayed exhausted; the client can resend the answer
+            await self.send(text_data=json.dumps({
+                "error": "LLM rate limit reached", "message": str(e), "code": "rate_limited",
+            }))
+            return
+        except Exception as e:
+            # Keep the socket open; the client can resend the answer
+            logger.exception("Interview turn failed for %s", self.interview_id)
+            await self.send(text_data=json.dumps({
+                "error": "Interview turn failed", "message": str(e), "code": "upstream_error",
+            }))
+            return
         
         # Send response
         msg = ""
@@ -51,4 +72,8 @@ class InterviewConsumer(AsyncWebsocketConsumer):
 
     async def interview_message(self, event):
         message = event["message"]
-        await self.send(text_data=json.dumps({"message": message}))
\ No newline at end of file
+        await self.send(text_data=json.dumps({"message": message}))
+
+    async def interview_stream(self, event):
+        # start/delta/end frame of an interviewer turn that is still being generated
+        await self.send(text_data=json.dumps(event["frame"]))
\ No newline at end of file
@@ -1,3 +1,165 @@
-from django.test import TestCase
+import json
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from .agent import graph
+from .agent.state import State
+from . import consumers
+
+
+class _Chunk:
+    def __init__(self, content, usage_metadata=None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+
+def _stream_of(*chunks, error=None):
+    async def astream(task, messages):
+        for chunk in chunks:
+            yield _Chunk(chunk)
+        if error:
+            raise error
+    return astream
+
+
+class StreamTurnTests(SimpleTestCase):
+    def setUp(self):
+        self.layer = mock.Mock(group_send=mock.AsyncMock())
+        patcher = mock.patch("channels.layers.get_channel_layer", return_value=self.layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def frames(self):
+        return [call.args[1]["frame"] for call in self.layer.group_send.call_args_list]
+
+    async def test_sends_start_deltas_and_end(self):
+        with mock.patch.object(graph, "_astream", _stream_of("Tell me ", "", "about Go.")):
+            text = await graph._stream_turn("abc", "interview_question", [])
+
+        self.assertEqual(text, "Tell me about Go.")
+        frames = self.frames()
+        self.assertEqual([frame["type"] for frame in frames], ["start", "delta", "delta", "end"])
+        self.assertEqual([frame["text"] for frame in frames[1:3]], ["Tell me ", "about Go."])
+        self.assertEqual(frames[-1]["message"], "Tell me about Go.")
+        self.assertEqual(len({frame["stream_id"] for frame in frames}), 1)
+        self.assertEqual(self.layer.group_send.call_args.args[0], "interview_abc")
+
+    async def test_provider_error_ends_the_stream(self):
+        astream = _stream_of("Tell me ", error=RuntimeError("provider down"))
+        with mock.patch.object(graph, "_astream", astream):
+            with self.assertRaises(RuntimeError):
+                await graph._stream_turn("abc", "interview_question", [])
+
+        frames = self.frames()
+        self.assertEqual([frame["type"] for frame in frames], ["start", "delta", "end"])
+        self.assertEqual(frames[-1]["error"], "provider down")
+        self.assertNotIn("message", frames[-1])
+
+    async def test_questions_are_one_message_unless_the_client_asks_to_stream(self):
+        response = SimpleNamespace(content="Why Go?")
+        with mock.patch.object(graph, "_ainvoke", mock.AsyncMock(return_value=response)), \
+                mock.patch.object(graph, "_astream", _stream_of("Why ", "Go?")):
+            await graph.ask_question(State(messages=[], interview_id="abc"))
+            self.assertEqual(
+                self.layer.group_send.call_args.args[1],
+                {"type": "interview.message", "message": "Why Go?"},
+            )
+
+            self.layer.group_send.reset_mock()
+            await graph.ask_question(State(messages=[], interview_id="abc", stream_turns=True))
+            self.assertEqual([frame["type"] for frame in self.frames()], ["start", "delta", "delta", "end"])
+
+    @override_settings(INTERVIEW_STREAM_TURNS=True)
+    def test_setting_streams_for_every_client(self):
+        self.assertTrue(graph._stream_turns(State(messages=[])))
+
+
+class ReservationTests(SimpleTestCase):
+    def setUp(self):
+        self.limiter = mock.Mock(aacquire=mock.AsyncMock(), asettle=mock.AsyncMock())
+        patcher = mock.patch(
+            "resume_api.utils.rate_limiter.get_rate_limiter", return_value=self.limiter
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.route = SimpleNamespace(max_tokens=100)
+
+    def llm(self, **methods):
+        return mock.patch.object(graph, "_llm", return_value=("groq", self.route, mock.Mock(**methods)))
+
+    async def test_failed_invoke_returns_its_reservation(self):
+        with self.llm(ainvoke=mock.AsyncMock(side_effect=RuntimeError("provider down"))):
+            with self.assertRaises(RuntimeError):
+                await graph._ainvoke("interview_question", [{"role": "system", "content": "hi"}])
+
+        estimated = self.limiter.aacquire.call_args.args[0]
+        self.limiter.asettle.assert_awaited_once_with(estimated, 0)
+
+    async def test_invoke_settles_actual_usage(self):
+        response = _Chunk("ok", usage_metadata={"total_tokens": 42})
+        with self.llm(ainvoke=mock.AsyncMock(return_value=response)):
+            await graph._ainvoke("interview_question", [{"role": "system", "content": "hi"}])
+
+        estimated = self.limiter.aacquire.call_args.args[0]
+        self.limiter.asettle.assert_awaited_once_with(estimated, 42)
+
+    async def test_stream_failing_before_output_returns_its_reservation(self):
+        async def astream(messages):
+            raise RuntimeError("provider down")
+            yield
+
+        with self.llm(astream=astream):
+            with self.assertRaises(RuntimeError):
+                async for _ in graph._astream("interview_question", []):
+                    pass
+
+        estimated = self.limiter.aacquire.call_args.args[0]
+        self.limiter.asettle.assert_awaited_once_with(estimated, 0)
+
+    async def test_stream_settles_actual_usage(self):
+        async def astream(messages):
+            yield _Chunk("Why ")
+            yield _Chunk("Go?", usage_metadata={"total_tokens": 7})
+
+        with self.llm(astream=astream):
+            chunks = [chunk.content async for chunk in graph._astream("interview_question", [])]
+
+        self.assertEqual(chunks, ["Why ", "Go?"])
+        estimated = self.limiter.aacquire.call_args.args[0]
+        self.limiter.asettle.assert_awaited_once_with(estimated, 7)
+
+
+class InterviewConsumerTests(SimpleTestCase):
+    def setUp(self):
+        self.consumer = consumers.InterviewConsumer()
+        self.consumer.interview_id = "abc"
+        self.consumer.send = mock.AsyncMock()
+        self.app = mock.Mock(
+            aget_state=mock.AsyncMock(return_value=SimpleNamespace(values={"messages": []})),
+            ainvoke=mock.AsyncMock(return_value={"messages": [{"role": "assistant", "content": "Next?"}]}),
+        )
+        patcher = mock.patch.object(consumers, "_app", self.app)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sent(self):
+        return [json.loads(call.kwargs["text_data"]) for call in self.consumer.send.call_args_list]
+
+    async def test_streaming_is_requested_per_message(self):
+        await self.consumer.receive(json.dumps({"message": "I used Go."}))
+        self.assertFalse(self.app.ainvoke.call_args.args[0]["stream_turns"])
+
+        await self.consumer.receive(json.dumps({"message": "I used Go.", "stream": True}))
+        self.assertTrue(self.app.ainvoke.call_args.args[0]["stream_turns"])
+        self.assertEqual(self.sent()[-1], {"message": "Next?"})
+
+    async def test_provider_error_is_reported_to_the_client(self):
+        self.app.ainvoke.side_effect = RuntimeError("provider down")
+        with self.assertLogs("interview.consumers", "ERROR"):
+            await self.consumer.receive(json.dumps({"message": "I used Go."}))
+
+        self.assertEqual(self.sent(), [{
+            "error": "Interview turn failed", "message": "provider down", "code": "upstream_error",
+        }])
@@ -11,6 +11,7 @@ from rest_framework.decorators import permission_classes
 from rest_framework.permissions import AllowAny
 
 from .agent.state import State, InterviewType, ExperienceLevel
+from resume_api.utils.rate_limiter import RateLimitTimeout
 
 
 def _extract_last_message_content(messages):
@@ -143,6 +144,8 @@ def start_interview(request):
             'interview_started': True,
             'max_questions': result.get('max_questions', 8)
         })
+    except RateLimitTimeout as e:
+        return Response({'error': 'LLM rate limit reached', 'message': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
     
@@ -175,6 +178,8 @@ def response_to_question(request):
             response_data['voice_feedback'] = result['voice_feedback']
         
         return Response(response_data)
+    except RateLimitTimeout as e:
+        return Response({'error': 'LLM rate limit reached', 'message': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
     
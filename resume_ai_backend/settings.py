@@ -92,6 +92,10 @@ CHANNEL_LAYERS = {
         "BACKEND": "channels.layers.InMemoryChannelLayer",
     }
 }
+# Push interviewer questions and the closing message to every WebSocket as
+# start/delta/end frames while they are generated, instead of one message.
+# Off by default: a client opts in per message with {"stream": true}
+INTERVIEW_STREAM_TURNS = os.getenv("INTERVIEW_STREAM_TURNS", "false").lower() == "true"
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -148,6 +152,184 @@ STATICFILES_DIRS = [
 MEDIA_URL = "/resumes/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Shared Groq client (resume_api/llm_client.py). POOL_SIZE is the number of
+# kept-alive connections; LLM_WARMUP opens one at startup.
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", 32))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 60))
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"
+# Retries of 429/5xx/transport errors: exponential backoff with full jitter
+# (honouring Retry-After), at most MAX_ATTEMPTS tries within DEADLINE
+# seconds. After BREAKER_THRESHOLD consecutive failed calls the circuit
+# opens and calls fail fast for BREAKER_RESET seconds.
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", 4))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 0.5))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 8))
+LLM_REQUEST_DEADLINE = float(os.getenv("LLM_REQUEST_DEADLINE", 90))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", 5))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", 30))
+# Upper bound on concurrent completions per event loop for the async views
+LLM_ASYNC_MAX_CONNECTIONS = int(os.getenv("LLM_ASYNC_MAX_CONNECTIONS", 200))
+# Client-side token buckets shared by all workers through a SQLite file, so
+# together they stay under the provider's per-key requests and tokens per
+# minute. Calls queue for capacity for up to MAX_WAIT seconds (and never
+# past LLM_REQUEST_DEADLINE); COMPLETION_TOKENS is reserved per call until
+# the response reports actual usage. 0 disables a bucket.
+LLM_RATE_LIMIT_RPM = int(os.getenv("LLM_RATE_LIMIT_RPM", 30))
+LLM_RATE_LIMIT_TPM = int(os.getenv("LLM_RATE_LIMIT_TPM", 30000))
+LLM_RATE_LIMIT_COMPLETION_TOKENS = int(os.getenv("LLM_RATE_LIMIT_COMPLETION_TOKENS", 1024))
+LLM_RATE_LIMIT_MAX_WAIT = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", 60))
+LLM_RATE_LIMIT_DB = os.getenv("LLM_RATE_LIMIT_DB", str(BASE_DIR / "llm_rate_limit.sqlite3"))
+# Batch ingestion may use at most BATCH_SHARE of the RPM/TPM quota, so the
+# rest stays free for interactive requests. Batch calls queue for up to
+# BATCH_MAX_WAIT seconds since no user is waiting on them. 1 disables the share.
+LLM_RATE_LIMIT_BATCH_SHARE = float(os.getenv("LLM_RATE_LIMIT_BATCH_SHARE", 0.5))
+LLM_RATE_LIMIT_BATCH_MAX_WAIT = float(os.getenv("LLM_RATE_LIMIT_BATCH_MAX_WAIT", 300))
+# Context window (prompt plus completion tokens) of the configured models
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", 8192))
+# Prompt size cap (approximate tokens) for every LLM task; over-budget
+# sections (resume text, job description, interview history) are truncated
+# by priority. Leaves room for the completion in the models' 8k context.
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", 6000))
+# chat_json() asks Groq for JSON mode (response_format json_object) and
+# sends one repair prompt when a completion can't be repaired locally
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
+LLM_JSON_REPAIR_PROMPT = os.getenv("LLM_JSON_REPAIR_PROMPT", "true").lower() == "true"
+# Identical parse/match/cover-letter requests that arrive while one is in
+# flight wait for its result instead of calling the LLM again; across
+# workers through an LLMRequestLock row held for at most LOCK_TTL seconds.
+# The TTL must outlast the computation: by default two deadline-bounded
+# LLM calls (a completion and its JSON repair prompt), plus the batch
+# queueing time for batch parses. The rows live in the default database,
+# which should be a server database when several workers share it.
+LLM_SINGLE_FLIGHT_LOCK_TTL = float(os.getenv("LLM_SINGLE_FLIGHT_LOCK_TTL", 2 * LLM_REQUEST_DEADLINE))
+# Model tiers (resume_api/utils/model_routing.py): each is a Groq model with
+# its own completion cap (MAX_TOKENS), temperature and per-attempt read
+# TIMEOUT in seconds. "extract" serves the JSON tasks, "generate" long-form
+# text (cover letters), and "fast" the interview turns, which are short and
+# latency-bound. JSON calls lower the extract cap to what LLM_CONTEXT_TOKENS
+# leaves after their prompt. Its default fits the JSON of a resume just
+# short of the section split (half the prompt budget), which runs to about
+# 4/3 of the resume text.
+LLM_TIERS = {
+    "extract": {
+        "model": os.getenv("LLM_TIER_EXTRACT_MODEL", "llama3-70b-8192"),
+        "max_tokens": int(os.getenv("LLM_TIER_EXTRACT_MAX_TOKENS", LLM_PROMPT_TOKEN_BUDGET * 2 // 3)),
+        "temperature": float(os.getenv("LLM_TIER_EXTRACT_TEMPERATURE", 0.1)),
+        "timeout": float(os.getenv("LLM_TIER_EXTRACT_TIMEOUT", 60)),
+    },
+    "generate": {
+        "model": os.getenv("LLM_TIER_GENERATE_MODEL", "llama3-70b-8192"),
+        "max_tokens": int(os.getenv("LLM_TIER_GENERATE_MAX_TOKENS", 1024)),
+        "temperature": float(os.getenv("LLM_TIER_GENERATE_TEMPERATURE", 0.1)),
+        "timeout": float(os.getenv("LLM_TIER_GENERATE_TIMEOUT", 45)),
+    },
+    "fast": {
+        "model": os.getenv("LLM_TIER_FAST_MODEL", "llama3-8b-8192"),
+        "max_tokens": int(os.getenv("LLM_TIER_FAST_MAX_TOKENS", 512)),
+        "temperature": float(os.getenv("LLM_TIER_FAST_TEMPERATURE", 0.3)),
+        "timeout": float(os.getenv("LLM_TIER_FAST_TIMEOUT", 15)),
+    },
+}
+# Tier of every LLM task, e.g. LLM_ROUTE_INTERVIEW_EVALUATE=fast
+LLM_ROUTES = {
+    "resume_parse": os.getenv("LLM_ROUTE_RESUME_PARSE", "extract"),
+    "match_analysis": os.getenv("LLM_ROUTE_MATCH_ANALYSIS", "extract"),
+    "cover_letter": os.getenv("LLM_ROUTE_COVER_LETTER", "generate"),
+    "interview_question": os.getenv("LLM_ROUTE_INTERVIEW_QUESTION", "fast"),
+    "interview_evaluate": os.getenv("LLM_ROUTE_INTERVIEW_EVALUATE", "fast"),
+    "interview_voice": os.getenv("LLM_ROUTE_INTERVIEW_VOICE", "fast"),
+    "interview_closing": os.getenv("LLM_ROUTE_INTERVIEW_CLOSING", "fast"),
+}
+# Serve process/, match/ and cover-letter endpoints with the async views
+RESUME_ASYNC_VIEWS = os.getenv("RESUME_ASYNC_VIEWS", "true").lower() == "true"
+
+# Resume uploads up to this size are kept and parsed in memory; larger ones
+# are spooled to a per-request temporary file by Django and parsed from there.
+RESUME_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv("RESUME_UPLOAD_MAX_MEMORY_SIZE", 2_621_440))
+FILE_UPLOAD_MAX_MEMORY_SIZE = RESUME_UPLOAD_MAX_MEMORY_SIZE
+# Single-resume uploads larger than this are aborted while streaming in
+RESUME_UPLOAD_MAX_SIZE = int(os.getenv("RESUME_UPLOAD_MAX_SIZE", 10 * 1024 * 1024))
+
+# PDF text extraction process pool (resume_api/utils/extraction_service.py).
+# Set PDF_EXTRACTION_WORKERS=0 to extract inline on the request thread.
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", os.cpu_count() or 2))
+PDF_EXTRACTION_MAX_PENDING = int(os.getenv("PDF_EXTRACTION_MAX_PENDING", 32))
+PDF_EXTRACTION_TIMEOUT = float(os.getenv("PDF_EXTRACTION_TIMEOUT", 30))
+PDF_EXTRACTION_MAX_PAGES = int(os.getenv("PDF_EXTRACTION_MAX_PAGES", 200))
+PDF_EXTRACTION_MAX_TASKS_PER_CHILD = int(os.getenv("PDF_EXTRACTION_MAX_TASKS_PER_CHILD", 200))
+# Documents larger than MAX_BYTES are rejected before they reach a worker.
+# A job whose worker RSS passes MEMORY_LIMIT is aborted and the pool is
+# recycled; 0 disables either check. TRACK_MEMORY records the tracemalloc
+# peak of every worker job alongside the sampled RSS peak. It slows the
+# job's allocations, so leave it off except while chasing a leak.
+PDF_EXTRACTION_MAX_BYTES = int(os.getenv("PDF_EXTRACTION_MAX_BYTES", 20 * 1024 * 1024))
+PDF_EXTRACTION_MEMORY_LIMIT = int(os.getenv("PDF_EXTRACTION_MEMORY_LIMIT", 512 * 1024 * 1024))
+PDF_EXTRACTION_TRACK_MEMORY = os.getenv("PDF_EXTRACTION_TRACK_MEMORY", "false").lower() == "true"
+
+# Extraction for the resume endpoints stops after this many pages or once
+# roughly this many tokens of text have been produced.
+RESUME_EXTRACT_PAGE_LIMIT = int(os.getenv("RESUME_EXTRACT_PAGE_LIMIT", 10))
+RESUME_EXTRACT_TOKEN_BUDGET = int(os.getenv("RESUME_EXTRACT_TOKEN_BUDGET", 6000))
+
+# Pre-flight checks run in the extraction worker before extraction
+# (resume_api/utils/pdf_preflight.py). A first page with fewer characters
+# than MIN_TEXT_CHARS that holds an image is treated as a scan. Page counts
+# are capped by PDF_EXTRACTION_MAX_PAGES only; RESUME_EXTRACT_PAGE_LIMIT
+# truncates long CVs rather than rejecting them.
+RESUME_PREFLIGHT_MIN_TEXT_CHARS = int(os.getenv("RESUME_PREFLIGHT_MIN_TEXT_CHARS", 50))
+
+# Strip repeated headers/footers, page numbers, hyphenation breaks and
+# duplicate link URIs from extracted text before it reaches the LLM.
+RESUME_TEXT_COMPACTION = os.getenv("RESUME_TEXT_COMPACTION", "true").lower() == "true"
+
+# Resumes of at least this many (approximate) tokens are split into sections
+# that are extracted by concurrent completions; shorter ones are parsed with a
+# single completion, since splitting them only multiplies the per-request
+# overhead. Defaults to half the prompt budget (about 3-4 dense pages), where
+# one completion starts to take long and risks running into its output cap.
+RESUME_SECTION_SPLIT_MIN_TOKENS = int(
+    os.getenv("RESUME_SECTION_SPLIT_MIN_TOKENS", LLM_PROMPT_TOKEN_BUDGET // 2)
+)
+
+# Cache of successful ats_extractor responses, keyed by model, prompt version
+# and normalized resume text. MAX_ITEMS bounds the in-process LRU and
+# MAX_ROWS the DB table; both tiers expire entries after TTL seconds.
+RESUME_PARSE_CACHE_TTL = int(os.getenv("RESUME_PARSE_CACHE_TTL", 30 * 24 * 60 * 60))
+RESUME_PARSE_CACHE_MAX_ITEMS = int(os.getenv("RESUME_PARSE_CACHE_MAX_ITEMS", 1024))
+RESUME_PARSE_CACHE_MAX_ROWS = int(os.getenv("RESUME_PARSE_CACHE_MAX_ROWS", 20000))
+
+# Cache of match_analyzer results, keyed by canonical resume JSON, normalized
+# job description and model
+MATCH_CACHE_TTL = int(os.getenv("MATCH_CACHE_TTL", 7 * 24 * 60 * 60))
+MATCH_CACHE_MAX_ITEMS = int(os.getenv("MATCH_CACHE_MAX_ITEMS", 2048))
+MATCH_CACHE_MAX_ROWS = int(os.getenv("MATCH_CACHE_MAX_ROWS", 50000))
+
+# Batch resume ingestion (resume_api/batch_processing.py). Workers is the
+# shared pool size; each user may have at most PER_USER items in flight and
+# batch items together make at most LLM_CONCURRENCY parse calls at once.
+RESUME_BATCH_WORKERS = int(os.getenv("RESUME_BATCH_WORKERS", 8))
+RESUME_BATCH_PER_USER_CONCURRENCY = int(os.getenv("RESUME_BATCH_PER_USER_CONCURRENCY", 4))
+RESUME_BATCH_LLM_CONCURRENCY = int(os.getenv("RESUME_BATCH_LLM_CONCURRENCY", 6))
+RESUME_BATCH_MAX_FILES = int(os.getenv("RESUME_BATCH_MAX_FILES", 500))
+RESUME_BATCH_MAX_FILE_SIZE = int(os.getenv("RESUME_BATCH_MAX_FILE_SIZE", 10 * 1024 * 1024))
+# A batch's runner records a heartbeat every HEARTBEAT_INTERVAL seconds, also
+# while it waits for slots. On its first request each process fails the
+# pending/running batches whose heartbeat is older than ORPHAN_AFTER seconds
+# (their runner died in a restart) and deletes their files.
+RESUME_BATCH_RECOVER_ON_STARTUP = os.getenv("RESUME_BATCH_RECOVER_ON_STARTUP", "true").lower() == "true"
+RESUME_BATCH_HEARTBEAT_INTERVAL = float(os.getenv("RESUME_BATCH_HEARTBEAT_INTERVAL", 60))
+RESUME_BATCH_ORPHAN_AFTER = int(os.getenv("RESUME_BATCH_ORPHAN_AFTER", 10 * 60))
+
+# Allow a batch upload to carry one multipart part per resume
+DATA_UPLOAD_MAX_NUMBER_FILES = RESUME_BATCH_MAX_FILES
+
+# Extracted resume text cache, keyed by the SHA-256 of the PDF bytes and the
+# extraction settings above (resume_api/utils/text_cache.py). TTL applies to the database tier.
+RESUME_TEXT_CACHE_MAX_ITEMS = int(os.getenv("RESUME_TEXT_CACHE_MAX_ITEMS", 512))
+RESUME_TEXT_CACHE_MAX_CHARS = int(os.getenv("RESUME_TEXT_CACHE_MAX_CHARS", 16 * 1024 * 1024))
+RESUME_TEXT_CACHE_TTL = int(os.getenv("RESUME_TEXT_CACHE_TTL", 7 * 24 * 60 * 60))
+
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
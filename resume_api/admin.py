@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Resume
+from .models import Resume, ResumeBatch
 
 @admin.register(Resume)
 class ResumeAdmin(admin.ModelAdmin):
@@ -11,3 +11,10 @@ class ResumeAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
     list_editable = ('original_filename',)
 
+
+@admin.register(ResumeBatch)
+class ResumeBatchAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'created_at', 'updated_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__email',)
+    ordering = ('-created_at',)
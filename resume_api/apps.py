@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class ResumeApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "resume_api"
+
+    def ready(self):
+        from django.conf import settings
+
+        if settings.LLM_WARMUP:
+            from .llm_client import warm_up_in_background
+
+            warm_up_in_background()
+
+        if settings.RESUME_BATCH_RECOVER_ON_STARTUP:
+            from django.core.signals import request_started
+
+            from .batch_processing import recover_on_first_request
+
+            request_started.connect(recover_on_first_request, dispatch_uid="resume_api.batch_processing")
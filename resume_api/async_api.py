@@ -0,0 +1,82 @@
+"""Minimal async counterpart of DRF's @api_view.
+
+DRF's function views are sync only, so a coroutine view wrapped in
+@api_view would hold a worker thread for the whole LLM call. async_api_view
+authenticates, throttles and parses the request with DRF's own machinery
+(the configured authentication and throttle classes, CSRF enforcement for
+session auth, the given parsers and their upload handlers) in a thread,
+then awaits the view on the event loop. Views receive the DRF Request and
+return a JsonResponse.
+"""
+
+import math
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+def _check_throttles(request, view, throttle_classes):
+    """APIView.check_throttles for a function view."""
+    durations = []
+    for throttle in [throttle_class() for throttle_class in throttle_classes]:
+        if not throttle.allow_request(request, view):
+            durations.append(throttle.wait())
+    if durations:
+        durations = [duration for duration in durations if duration is not None]
+        raise exceptions.Throttled(max(durations, default=None))
+
+
+def _authenticate_and_parse(request, view, throttle_classes):
+    if not (request.user and request.user.is_authenticated):
+        raise exceptions.NotAuthenticated()
+    # Throttle before parsing, as DRF does, so a throttled upload isn't read
+    _check_throttles(request, view, throttle_classes)
+    # Force parsing so the view never triggers blocking body reads itself
+    request.data
+    request.FILES
+
+
+def async_api_view(methods, parser_classes, throttle_classes=None):
+    """Wrap an ``async def`` view that requires an authenticated user.
+
+    ``throttle_classes`` defaults to DEFAULT_THROTTLE_CLASSES, like @api_view;
+    throttles see the view function, so ScopedRateThrottle can read a
+    ``throttle_scope`` attribute set on it.
+    """
+    allowed = [method.upper() for method in methods]
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                return JsonResponse(
+                    {"detail": f'Method "{request.method}" not allowed.'}, status=405
+                )
+
+            drf_request = Request(
+                request,
+                parsers=[parser() for parser in parser_classes],
+                authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+            )
+            throttles = (
+                api_settings.DEFAULT_THROTTLE_CLASSES if throttle_classes is None else throttle_classes
+            )
+            try:
+                await sync_to_async(_authenticate_and_parse)(drf_request, wrapper, throttles)
+            except exceptions.Throttled as exc:
+                headers = {'Retry-After': str(math.ceil(exc.wait))} if exc.wait is not None else None
+                return JsonResponse({"detail": exc.detail}, status=exc.status_code, headers=headers)
+            except exceptions.APIException as exc:
+                return JsonResponse({"detail": exc.detail}, status=exc.status_code)
+
+            return await view(drf_request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,317 @@
+"""Background processing for batch resume uploads.
+
+Uploaded PDFs are written to a per-batch directory under MEDIA_ROOT and one
+ResumeBatchItem row is created per file. A runner thread per batch feeds
+items to a shared worker pool, holding one of the owner's per-user slots
+for every item in flight, so a single large batch cannot monopolise the
+pool. LLM calls made by batch items share a separate global cap and take
+from the batch share of the LLM rate limit, which leaves LLM capacity free
+for interactive requests.
+
+Runner threads die with their process, and refresh their batch's heartbeat
+while they live. recover_orphaned_batches(), run once per process on its
+first request, fails the batches with a stale heartbeat that a restart left
+behind and deletes their files.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DatabaseError, close_old_connections, connection
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ResumeBatch, ResumeBatchItem
+from .resume_parser import ats_extractor
+from .resume_text import read_pdf_path
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class BatchError(Exception):
+    """Raised for uploads that cannot be turned into a batch."""
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.RESUME_BATCH_WORKERS, thread_name_prefix="resume-batch"
+)
+_llm_slots = threading.BoundedSemaphore(settings.RESUME_BATCH_LLM_CONCURRENCY)
+# user id -> [semaphore, running batches]; dropped when the last one ends
+_user_slots = {}
+_user_slots_lock = threading.Lock()
+
+
+def _batch_dir(batch_id):
+    return os.path.join(settings.MEDIA_ROOT, 'batches', str(batch_id))
+
+
+def _iter_upload_pdfs(uploaded_files):
+    """Yield (filename, chunks) for every PDF in the upload, expanding zips."""
+    for uploaded_file in uploaded_files:
+        name = uploaded_file.name or ''
+        if name.lower().endswith('.pdf'):
+            if uploaded_file.size > settings.RESUME_BATCH_MAX_FILE_SIZE:
+                raise BatchError(f"{name} is larger than the per-file limit")
+            yield name, uploaded_file.chunks()
+        elif name.lower().endswith('.zip'):
+            yield from _iter_zip_pdfs(uploaded_file)
+        else:
+            raise BatchError(f"{name} is not a PDF or zip file")
+
+
+def _iter_zip_pdfs(uploaded_file):
+    try:
+        archive = zipfile.ZipFile(uploaded_file)
+    except zipfile.BadZipFile:
+        raise BatchError(f"{uploaded_file.name} is not a valid zip file")
+
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith('.pdf'):
+                continue
+            # Skip macOS resource forks and other hidden entries
+            basename = os.path.basename(info.filename)
+            if basename.startswith('.') or info.filename.startswith('__MACOSX/'):
+                continue
+            # file_size comes from the archive header; read() below is capped
+            # as well so a lying header can't inflate past the limit
+            if info.file_size > settings.RESUME_BATCH_MAX_FILE_SIZE:
+                raise BatchError(f"{basename} is larger than the per-file limit")
+            with archive.open(info) as member:
+                data = member.read(settings.RESUME_BATCH_MAX_FILE_SIZE + 1)
+            if len(data) > settings.RESUME_BATCH_MAX_FILE_SIZE:
+                raise BatchError(f"{basename} is larger than the per-file limit")
+            yield basename, [data]
+
+
+def create_batch(user, uploaded_files):
+    """Store the uploaded PDFs and create the batch and its items.
+
+    Raises BatchError when the upload is empty, too large or contains a
+    file that is neither a PDF nor a zip of PDFs.
+    """
+    batch = ResumeBatch.objects.create(user=user)
+    directory = _batch_dir(batch.id)
+    os.makedirs(directory, exist_ok=True)
+
+    items = []
+    try:
+        for index, (name, chunks) in enumerate(_iter_upload_pdfs(uploaded_files)):
+            if index >= settings.RESUME_BATCH_MAX_FILES:
+                raise BatchError(f"A batch can contain at most {settings.RESUME_BATCH_MAX_FILES} PDFs")
+            path = os.path.join(directory, f"{index:04d}.pdf")
+            with open(path, 'wb') as destination:
+                for chunk in chunks:
+                    destination.write(chunk)
+            items.append(ResumeBatchItem(batch=batch, original_filename=name[:255], file_path=path))
+
+        if not items:
+            raise BatchError("No PDF files found in upload")
+    except Exception:
+        batch.delete()
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    ResumeBatchItem.objects.bulk_create(items)
+    return batch
+
+
+def start_batch(batch):
+    """Process the batch's pending items in the background."""
+    thread = threading.Thread(
+        target=_run_batch, args=(batch.id, batch.user_id),
+        name=f"resume-batch-{batch.id}", daemon=True,
+    )
+    thread.start()
+
+
+def _acquire_user_slots(user_id):
+    with _user_slots_lock:
+        entry = _user_slots.get(user_id)
+        if entry is None:
+            entry = _user_slots[user_id] = [
+                threading.BoundedSemaphore(settings.RESUME_BATCH_PER_USER_CONCURRENCY), 0
+            ]
+        entry[1] += 1
+        return entry[0]
+
+
+def _release_user_slots(user_id):
+    with _user_slots_lock:
+        entry = _user_slots[user_id]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _user_slots[user_id]
+
+
+def _heartbeat(batch_id):
+    ResumeBatch.objects.filter(id=batch_id).update(heartbeat_at=timezone.now())
+
+
+def _acquire_slot(slots, batch_id):
+    """slots.acquire(), keeping the batch's heartbeat fresh while it blocks."""
+    while not slots.acquire(timeout=settings.RESUME_BATCH_HEARTBEAT_INTERVAL):
+        _heartbeat(batch_id)
+
+
+def _wait_for_items(futures, batch_id):
+    """Wait for every queued item, keeping the batch's heartbeat fresh."""
+    pending = futures
+    while pending:
+        _, pending = wait(pending, timeout=settings.RESUME_BATCH_HEARTBEAT_INTERVAL)
+        if pending:
+            _heartbeat(batch_id)
+
+
+def _run_batch(batch_id, user_id):
+    slots = _acquire_user_slots(user_id)
+    futures = []
+    try:
+        now = timezone.now()
+        ResumeBatch.objects.filter(id=batch_id).update(
+            status=ResumeBatch.STATUS_RUNNING, updated_at=now, heartbeat_at=now
+        )
+        item_ids = list(
+            ResumeBatchItem.objects.filter(batch_id=batch_id, status=ResumeBatchItem.STATUS_PENDING)
+            .values_list('id', flat=True)
+        )
+        for item_id in item_ids:
+            # Blocks while this user already has their maximum in flight
+            _acquire_slot(slots, batch_id)
+            try:
+                future = _executor.submit(_process_item, item_id, user_id)
+            except Exception:
+                slots.release()
+                raise
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+
+        _wait_for_items(futures, batch_id)
+
+        ResumeBatch.objects.filter(id=batch_id).update(
+            status=ResumeBatch.STATUS_COMPLETED, updated_at=timezone.now()
+        )
+        shutil.rmtree(_batch_dir(batch_id), ignore_errors=True)
+    except Exception:
+        logger.exception("Resume batch %s failed", batch_id)
+        # Items already queued still hold this user's slots
+        wait(futures)
+        _fail_batch(batch_id, "Batch processing failed")
+    finally:
+        _release_user_slots(user_id)
+        connection.close()
+
+
+def _fail_batch(batch_id, reason):
+    """Fail a batch's unfinished items and the batch itself, and delete its files."""
+    ResumeBatchItem.objects.filter(
+        batch_id=batch_id,
+        status__in=[ResumeBatchItem.STATUS_PENDING, ResumeBatchItem.STATUS_PROCESSING],
+    ).update(status=ResumeBatchItem.STATUS_FAILED, error=reason, updated_at=timezone.now())
+    ResumeBatch.objects.filter(id=batch_id).update(
+        status=ResumeBatch.STATUS_FAILED, updated_at=timezone.now()
+    )
+    shutil.rmtree(_batch_dir(batch_id), ignore_errors=True)
+
+
+def recover_orphaned_batches():
+    """Fail batches whose runner died with an earlier process; returns how many.
+
+    Other live processes run batches too, so only a batch whose heartbeat
+    (or, before its runner started, its last update) is older than
+    RESUME_BATCH_ORPHAN_AFTER seconds counts as orphaned.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.RESUME_BATCH_ORPHAN_AFTER)
+    orphaned = list(
+        ResumeBatch.objects
+        .filter(status__in=[ResumeBatch.STATUS_PENDING, ResumeBatch.STATUS_RUNNING])
+        .annotate(last_seen=Coalesce('heartbeat_at', 'updated_at'))
+        .filter(last_seen__lt=cutoff)
+        .values_list('id', flat=True)
+    )
+    for batch_id in orphaned:
+        _fail_batch(batch_id, "Interrupted by a server restart")
+    if orphaned:
+        logger.warning("Marked %d orphaned resume batches failed", len(orphaned))
+    return len(orphaned)
+
+
+def recover_on_first_request(sender, **kwargs):
+    """request_started receiver: recover orphaned batches once per process."""
+    request_started.disconnect(dispatch_uid="resume_api.batch_processing")
+    try:
+        recover_orphaned_batches()
+    except DatabaseError:
+        logger.exception("Could not recover orphaned resume batches")
+
+
+def _process_item(item_id, user_id):
+    close_old_connections()
+    try:
+        item = ResumeBatchItem.objects.get(id=item_id)
+        item.status = ResumeBatchItem.STATUS_PROCESSING
+        item.save(update_fields=['status', 'updated_at'])
+
+        try:
+            # Parsed from disk so the PDF bytes aren't held through the LLM call
+            text = read_pdf_path(item.file_path)
+
+            with _llm_slots:
+                parsed_data = ats_extractor(text, batch=True)
+        except Exception as e:
+            parsed_data = {"error": "Failed to process file", "message": str(e)}
+
+        if isinstance(parsed_data, dict) and "error" in parsed_data:
+            item.status = ResumeBatchItem.STATUS_FAILED
+            item.error = parsed_data.get("message") or parsed_data["error"]
+        else:
+            item.status = ResumeBatchItem.STATUS_DONE
+            item.result = parsed_data
+            User.objects.filter(id=user_id).update(resume_analyzed=F('resume_analyzed') + 1)
+
+        item.save(update_fields=['status', 'result', 'error', 'updated_at'])
+
+        if os.path.exists(item.file_path):
+            os.remove(item.file_path)
+    except Exception:
+        logger.exception("Resume batch item %s failed", item_id)
+    finally:
+        connection.close()
+
+
+def batch_summary(batch, include_results=True):
+    """Serialize a batch with per-item status (and results when done)."""
+    items = []
+    counts = defaultdict(int)
+    for item in batch.items.all():
+        counts[item.status] += 1
+        entry = {
+            'id': item.id,
+            'filename': item.original_filename,
+            'status': item.status,
+        }
+        if item.status == ResumeBatchItem.STATUS_FAILED:
+            entry['error'] = item.error
+        if include_results and item.status == ResumeBatchItem.STATUS_DONE:
+            entry['result'] = item.result
+        items.append(entry)
+
+    return {
+        'batch_id': str(batch.id),
+        'status': batch.status,
+        'total': len(items),
+        'counts': {status: counts[status] for status, _ in ResumeBatchItem.STATUS_CHOICES},
+        'created_at': batch.created_at,
+        'updated_at': batch.updated_at,
+        'items': items,
+    }
@@ -1,39 +1,47 @@
-import os
-import re
 import json
-from dotenv import load_dotenv
-import requests
+import re
 
-load_dotenv()
+from django.conf import settings
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-model = "llama3-70b-8192"
+from .llm_client import get_async_llm_client, get_llm_client
+from .utils.model_routing import get_route
+from .utils.prompt_budget import Section, build_prompt, compact_json, project
+from .utils.response_cache import ResponseCache, cache_key
+from .utils.single_flight import SingleFlight
 
-def clean_json_string(s):
-    # Remove trailing commas before } or ]
-    s = re.sub(r",\s*([}\]])", r"\1", s)
-    # Remove markdown formatting
-    s = re.sub(r"^```(json)?", "", s, flags=re.IGNORECASE).strip()
-    s = re.sub(r"```$", "", s).strip()
-    return s
+# The prompt asks for no preamble, but the model still sometimes opens with
+# "Here is a cover letter for ...:". The letter starts at the salutation.
+SALUTATION = re.compile(r"^[ \t*#]*(?:dear|to whom it may concern|hello|greetings)\b", re.IGNORECASE | re.MULTILINE)
+PREAMBLE_LINE = re.compile(
+    r"^\s*(?:sure|certainly|of course|here(?:'s| is)|below is)\b[^\n]*\n", re.IGNORECASE
+)
+# How far into the letter a salutation is looked for
+PREAMBLE_WINDOW = 300
 
+# Resume fields a letter draws on: who is writing, and what they've done
+COVER_LETTER_FIELDS = [
+    "name", "email", "phone", "linkedin", "portfolio", "summary", "skills",
+    "experience", "projects", "education", "certifications", "awards",
+]
 
+# Cover letters aren't cached: a later request for the same job gets a
+# fresh letter. Only requests that arrive while an identical one is still
+# generating share its result, which other workers pick up from here.
+cover_letter_results = ResponseCache(
+    "cover_letter", ttl=settings.LLM_SINGLE_FLIGHT_LOCK_TTL, max_items=32, max_rows=256
+)
+cover_letter_flight = SingleFlight("cover_letter", lock_ttl=settings.LLM_SINGLE_FLIGHT_LOCK_TTL)
 
-def generate_cover_letter(resume_data=None, job_description=None, company_name=None, job_title=None, additional_prompts=None, model=model):
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
 
+def _cover_letter_messages(resume_data, job_description, company_name, job_title, additional_prompts):
     # Handle optional resume_data
     resume_section = ""
     if resume_data:
-        resume_section = f"🧾 Resume Data:\n{resume_data}\n"
+        resume_section = f"🧾 Resume Data:\n{compact_json(project(resume_data, COVER_LETTER_FIELDS))}\n"
     else:
         resume_section = "🧾 Resume Data: Not provided - write a general but professional cover letter\n"
 
-    prompt = f'''
+    prompt = '''
     You are an expert career coach and professional writer.
     Write a customized, concise, and compelling cover letter for the following job application.
     
@@ -49,7 +57,7 @@ def generate_cover_letter(resume_data=None, job_description=None, company_name=N
     {job_title}
     
     💬 Additional Instructions or Custom Prompts:
-    {additional_prompts or "None provided"}
+    {additional_prompts}
     
     ---
     ✍️ CRITICAL INSTRUCTIONS:
@@ -67,24 +75,120 @@ def generate_cover_letter(resume_data=None, job_description=None, company_name=N
     - End with a call to action (e.g., request for interview or contact)
     - If no resume data is provided, write a general but professional cover letter that could be customized
     '''
+    # The job description's tail goes first, then the resume's; the user's
+    # own instructions are cut last and keep at least 300 tokens, which
+    # leaves any normal-length request whole
+    prompt = build_prompt("cover_letter", prompt, settings.LLM_PROMPT_TOKEN_BUDGET, {
+        "resume_section": Section(resume_section, priority=1, min_tokens=800),
+        "job_description": Section(str(job_description or ""), priority=0, min_tokens=500),
+        "additional_prompts": Section(additional_prompts or "None provided", priority=2, min_tokens=300),
+    }, company_name=company_name, job_title=job_title)
     
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": "You are an expert career coach and professional writer. You write compelling, professional cover letters tailored to specific job applications. IMPORTANT: Output ONLY the cover letter content with no preamble, introduction, or explanatory text. Start directly with the salutation."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.1
-    }
-    try:
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
-            return content
-        else:
-            return {"error": f"API request failed with status code {response.status_code}", "message": response.text}
-    except requests.exceptions.RequestException as e:
-        return {"error": "Request failed", "message": str(e)}
-    except json.JSONDecodeError:
-        return {"error": "Failed to parse JSON from response", "raw": response.text}
\ No newline at end of file
+    return [
+        {"role": "system", "content": "You are an expert career coach and professional writer. You write compelling, professional cover letters tailored to specific job applications. IMPORTANT: Output ONLY the cover letter content with no preamble, introduction, or explanatory text. Start directly with the salutation."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def strip_preamble(text):
+    """Drop anything the model wrote before the letter itself."""
+    match = SALUTATION.search(text, 0, PREAMBLE_WINDOW)
+    if match:
+        return text[match.start():].lstrip()
+    return PREAMBLE_LINE.sub("", text, count=1).lstrip()
+
+
+class PreambleStripper:
+    """strip_preamble() for a streamed letter.
+
+    Text is held back until the salutation (or PREAMBLE_WINDOW characters)
+    has arrived, then passed through unchanged.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._released = False
+
+    def feed(self, delta):
+        """Return the text that can be sent on, possibly empty."""
+        if self._released:
+            return delta
+        self._buffer += delta
+        match = SALUTATION.search(self._buffer, 0, PREAMBLE_WINDOW)
+        # A match at the very end may still be growing ("Hello" vs "Hellos")
+        if (match and match.end() < len(self._buffer)) or len(self._buffer) >= PREAMBLE_WINDOW:
+            return self.finish()
+        return ""
+
+    def finish(self):
+        """Release whatever is still held back once the stream ends."""
+        if self._released:
+            return ""
+        self._released = True
+        return strip_preamble(self._buffer)
+
+
+def _flight_key(messages, model):
+    return cache_key(model, json.dumps(messages, sort_keys=True))
+
+
+def generate_cover_letter(resume_data=None, job_description=None, company_name=None, job_title=None, additional_prompts=None, model=None):
+    route = get_route("cover_letter", model)
+    messages = _cover_letter_messages(resume_data, job_description, company_name, job_title, additional_prompts)
+    key = _flight_key(messages, route.model)
+
+    def compute():
+        cover_letter = get_llm_client().chat(messages, **route._asdict())
+        if isinstance(cover_letter, str):
+            cover_letter = strip_preamble(cover_letter)
+        cover_letter_results.set(key, cover_letter)
+        return cover_letter
+
+    return cover_letter_flight.do(key, compute, lambda: cover_letter_results.get(key))
+
+
+async def agenerate_cover_letter(resume_data=None, job_description=None, company_name=None, job_title=None, additional_prompts=None, model=None):
+    route = get_route("cover_letter", model)
+    messages = _cover_letter_messages(resume_data, job_description, company_name, job_title, additional_prompts)
+    key = _flight_key(messages, route.model)
+
+    async def acompute():
+        cover_letter = await get_async_llm_client().chat(messages, **route._asdict())
+        if isinstance(cover_letter, str):
+            cover_letter = strip_preamble(cover_letter)
+        await cover_letter_results.aset(key, cover_letter)
+        return cover_letter
+
+    return await cover_letter_flight.ado(key, acompute, lambda: cover_letter_results.aget(key))
+
+
+def stream_cover_letter(resume_data=None, job_description=None, company_name=None, job_title=None, additional_prompts=None, model=None):
+    """Yield the letter in pieces as it is generated, preamble removed.
+
+    Raises LLMStreamError if the completion fails. Streams bypass the
+    in-flight coalescing of generate_cover_letter().
+    """
+    route = get_route("cover_letter", model)
+    messages = _cover_letter_messages(resume_data, job_description, company_name, job_title, additional_prompts)
+    stripper = PreambleStripper()
+    for delta in get_llm_client().stream_chat(messages, **route._asdict()):
+        text = stripper.feed(delta)
+        if text:
+            yield text
+    text = stripper.finish()
+    if text:
+        yield text
+
+
+async def astream_cover_letter(resume_data=None, job_description=None, company_name=None, job_title=None, additional_prompts=None, model=None):
+    """stream_cover_letter for async callers."""
+    route = get_route("cover_letter", model)
+    messages = _cover_letter_messages(resume_data, job_description, company_name, job_title, additional_prompts)
+    stripper = PreambleStripper()
+    async for delta in get_async_llm_client().stream_chat(messages, **route._asdict()):
+        text = stripper.feed(delta)
+        if text:
+            yield text
+    text = stripper.finish()
+    if text:
+        yield text
@@ -0,0 +1,803 @@
+"""Shared Groq chat-completions client.
+
+All LLM calls go through one pooled requests.Session, so repeat calls reuse
+kept-alive TLS connections instead of paying a fresh TCP+TLS handshake each
+time. Connect and read timeouts keep a stalled API from pinning request
+workers, and warm_up() opens a connection at startup so the first user
+request doesn't pay for the handshake either.
+
+AsyncLLMClient is the asyncio counterpart used by the async views: an
+httpx.AsyncClient whose pool lets one event loop keep hundreds of
+completions in flight without a thread per call.
+
+Both clients retry 429/5xx responses and transport errors with exponential
+backoff and full jitter, honouring Retry-After, until a per-request
+deadline. A process-wide CircuitBreaker fails calls fast once retries keep
+failing, so workers aren't pinned waiting on a degraded upstream.
+
+When a TokenBucketLimiter is configured, every attempt first waits for
+request and token capacity shared by all worker processes, and the token
+estimate is settled against the usage the API reports.
+
+Callers pass the model, max_tokens, temperature and timeout of their task's
+Route (utils.model_routing); ``timeout`` bounds each attempt's read.
+
+stream_chat() is the streaming variant: it yields text deltas as they
+arrive and raises LLMStreamError (carrying the same error dict) on failure.
+Retries only happen before the first delta has been yielded.
+
+chat_json() requests the provider's JSON mode and parses the completion
+with utils.json_repair, which salvages prose-wrapped, trailing-comma and
+truncated output locally. Only output that can't be salvaged costs one
+more call, a targeted repair prompt.
+
+Error dicts carry a ``code`` the views map to an HTTP status:
+rate_limited, unavailable (circuit open), timeout, upstream_error and
+bad_response.
+"""
+
+import asyncio
+import email.utils
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from .utils.json_repair import REPAIRED_FLAG, JSONRepairError, repair_json
+from .utils.rate_limiter import RateLimitTimeout, estimate_tokens, get_batch_rate_limiter, get_rate_limiter
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_API_BASE = "https://api.groq.com/openai/v1"
+GROQ_API_URL = f"{GROQ_API_BASE}/chat/completions"
+
+
+_json_counters = {"clean": 0, "repaired": 0, "failed": 0, "repair_prompts": 0, "repair_prompts_fixed": 0}
+_json_counters_lock = threading.Lock()
+
+
+def _count_json(name):
+    with _json_counters_lock:
+        _json_counters[name] += 1
+
+
+def json_stats():
+    """How completions parsed: cleanly, after local repair, or not at all."""
+    with _json_counters_lock:
+        return dict(_json_counters)
+
+
+def parse_json_content(content):
+    """Parse the JSON object in a completion, repairing it if needed, or return an error dict.
+
+    Repaired objects carry ``"repaired": True``: they may have lost whatever
+    followed a truncation, so they are returned but never cached.
+    """
+    try:
+        parsed, repaired = repair_json(content)
+    except JSONRepairError as e:
+        _count_json("failed")
+        return {"error": "Failed to parse JSON from completion", "raw": content, "message": str(e), "code": "bad_response"}
+
+    if repaired:
+        _count_json("repaired")
+        logger.info("Repaired malformed JSON in LLM completion")
+        if isinstance(parsed, dict):
+            parsed[REPAIRED_FLAG] = True
+    else:
+        _count_json("clean")
+    return parsed
+
+
+def _json_text(result):
+    """Completion text from chat(), or None for an error with nothing to parse.
+
+    In JSON mode Groq rejects output that isn't valid JSON with a 400 whose
+    body still carries the generation, which local repair can often save.
+    """
+    if isinstance(result, str):
+        return result
+    try:
+        return json.loads(result.get("message", ""))["error"]["failed_generation"] or None
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+REPAIR_PROMPT = (
+    "The following text was meant to be a single JSON object but is not valid JSON. "
+    "Return only the corrected JSON object, keeping every field and value that is present "
+    "and closing anything left unfinished.\n\n{content}"
+)
+
+
+def _repair_messages(content):
+    return [
+        {"role": "system", "content": "You repair malformed JSON. Respond with JSON only."},
+        {"role": "user", "content": REPAIR_PROMPT.format(content=content)},
+    ]
+
+
+def _parse_json_result(result):
+    """Return (parsed, repair_messages); repair_messages is set when only a repair prompt can help."""
+    text = _json_text(result)
+    if text is None:
+        return result, None
+    parsed = parse_json_content(text)
+    if "error" in parsed:
+        return parsed, _repair_messages(text)
+    return parsed, None
+
+
+def _parse_repaired(parsed, result):
+    """The repair prompt's answer if it parses, else the original error."""
+    text = _json_text(result)
+    if text is None:
+        return parsed
+    repaired = parse_json_content(text)
+    if "error" in repaired:
+        return parsed
+    _count_json("repair_prompts_fixed")
+    # The model rewrote broken output; it may have dropped or made up values
+    repaired[REPAIRED_FLAG] = True
+    return repaired
+
+
+def _payload(model, messages, temperature, json_mode=False, max_tokens=None):
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+    }
+    if max_tokens:
+        payload["max_tokens"] = max_tokens
+    if json_mode:
+        payload["response_format"] = {"type": "json_object"}
+    return payload
+
+
+# Responses worth another attempt: rate limiting and transient server errors
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def _completion_content(status_code, text, load_json):
+    """Completion text from an API response, or an error dict."""
+    if status_code != 200:
+        return {
+            "error": f"API request failed with status code {status_code}",
+            "message": text,
+            "code": "rate_limited" if status_code == 429 else "upstream_error",
+        }
+
+    try:
+        return load_json()['choices'][0]['message']['content'].strip()
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return {"error": "Failed to parse JSON from response", "raw": text, "code": "bad_response"}
+
+
+def _usage_tokens(status_code, load_json):
+    """Tokens the API charged for a response; failed calls are charged none."""
+    if status_code != 200:
+        return 0
+    try:
+        return int(load_json()["usage"]["total_tokens"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _rate_limit_error(e):
+    return {"error": "LLM rate limit reached", "message": str(e), "code": "rate_limited"}
+
+
+class LLMStreamError(Exception):
+    """A streamed completion failed; ``error`` is the usual error dict."""
+
+    def __init__(self, error):
+        super().__init__(error["error"])
+        self.error = error
+
+
+def _stream_chunk(line):
+    """(delta, usage) from one SSE line of a streamed completion.
+
+    Returns None for blank lines, comments and the final ``[DONE]`` marker.
+    Groq reports usage on the last chunk under ``x_groq``.
+    """
+    if not line.startswith("data:"):
+        return None
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return None
+    chunk = json.loads(data)
+    choices = chunk.get("choices") or [{}]
+    delta = (choices[0].get("delta") or {}).get("content") or ""
+    usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+    return delta, usage
+
+
+def _stream_failed(e, started):
+    if isinstance(e, ValueError):
+        error = {"error": "Failed to parse streamed response", "message": str(e), "code": "bad_response"}
+    else:
+        error = _transport_error(e, isinstance(e, (requests.exceptions.Timeout, httpx.TimeoutException)))
+    if started:
+        error["message"] = f"Stream interrupted: {error['message']}"
+    return error
+
+
+def _parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, bounded by attempts and a deadline."""
+
+    def __init__(self, max_attempts=4, backoff_base=0.5, backoff_max=8.0, deadline=90.0):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait after ``attempt`` failed attempts."""
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        # Retry-After is the provider telling us when capacity is back;
+        # never retry sooner, but keep the jitter so callers don't stampede
+        return backoff if retry_after is None else retry_after + backoff
+
+    def next_delay(self, attempt, deadline_at, retry_after=None):
+        """Delay before the next attempt, or None when retries are exhausted."""
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.delay(attempt, retry_after)
+        if time.monotonic() + delay >= deadline_at:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures.
+
+    After ``failure_threshold`` consecutive failed calls (each already
+    retried) the circuit opens and calls are refused for ``reset_timeout``
+    seconds. Then one trial call is let through: success closes the circuit,
+    failure opens it again.
+
+    allow() hands out a ticket that must be passed to release() when the
+    call is over, so a trial that ends without a verdict (a rate-limit queue
+    timeout, a cancelled request) frees the trial slot instead of leaving
+    the circuit half-open for good.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        # Ticket of the half-open trial call, while one is running
+        self._trial = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Admit a call: a ticket for release(), or None when the circuit is open."""
+        with self._lock:
+            if self._opened_at is None:
+                return object()
+            if self._trial is None and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._trial = object()
+                return self._trial
+            return None
+
+    def release(self, ticket):
+        """End an admitted call; frees the trial slot if it recorded no outcome."""
+        with self._lock:
+            if self._trial is ticket:
+                self._trial = None
+
+    def retry_in(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial is not None:
+                    logger.warning("LLM circuit opened after %d consecutive failures", self._failures)
+                self._opened_at = time.monotonic()
+                self._trial = None
+
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                state = "closed"
+            elif self._trial is not None:
+                state = "half_open"
+            else:
+                state = "open"
+            return {"state": state, "consecutive_failures": self._failures}
+
+    def open_error(self):
+        return {
+            "error": "LLM provider is unavailable",
+            "message": f"Too many recent failures; retry in {self.retry_in():.0f}s",
+            "code": "unavailable",
+        }
+
+
+def _transport_error(e, timed_out):
+    if timed_out:
+        return {"error": "Request timed out", "message": str(e), "code": "timeout"}
+    return {"error": "Request failed", "message": str(e), "code": "upstream_error"}
+
+
+class LLMClient:
+    """Pooled session for the Groq chat-completions API."""
+
+    def __init__(self, api_key=GROQ_API_KEY, pool_size=32, connect_timeout=5.0, read_timeout=60.0,
+                 retry=None, breaker=None, limiter=None, completion_tokens=1024,
+                 json_mode=True, repair_prompt=True, batch_limiter=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        # Calls made with batch=True draw on the batch share of the quota
+        self.batch_limiter = batch_limiter or limiter
+        # Completion size assumed when reserving tokens before a call
+        self.completion_tokens = completion_tokens
+        # chat_json() asks for the provider's JSON mode, and sends one
+        # repair prompt when local repair can't save the output
+        self.json_mode = json_mode
+        self.repair_prompt = repair_prompt
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+        # Every call goes to the same host, so one pool sized for the
+        # concurrent callers (batch slots x section threads) is enough
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+
+    def chat(self, messages, model, temperature=0.2, json_mode=False, max_tokens=None, timeout=None,
+             batch=False):
+        """Return the completion text, or an error dict on failure.
+
+        Retryable failures are retried until RetryPolicy gives up; the
+        circuit breaker only sees the outcome of the whole call. ``batch``
+        calls take from the batch limiter, and time spent queued for it
+        doesn't count against the request deadline.
+        """
+        ticket = self.breaker.allow()
+        if not ticket:
+            return self.breaker.open_error()
+        try:
+            return self._chat(messages, model, temperature, json_mode, max_tokens, timeout, batch)
+        finally:
+            self.breaker.release(ticket)
+
+    def _chat(self, messages, model, temperature, json_mode, max_tokens, timeout, batch):
+        limiter = self.batch_limiter if batch else self.limiter
+        payload = _payload(model, messages, temperature, json_mode, max_tokens)
+        estimated = estimate_tokens(messages, max_tokens or self.completion_tokens)
+        deadline_at = time.monotonic() + self.retry.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            if limiter:
+                queued_at = time.monotonic()
+                try:
+                    # No user is waiting on a batch call; its limiter's own max_wait bounds the queueing
+                    limiter.acquire(estimated, max_wait=None if batch else deadline_at - queued_at)
+                except RateLimitTimeout as e:
+                    return _rate_limit_error(e)
+                if batch:
+                    deadline_at += time.monotonic() - queued_at
+            read_timeout = max(0.1, min(timeout or self.read_timeout, deadline_at - time.monotonic()))
+            try:
+                response = self.session.post(
+                    GROQ_API_URL, json=payload, timeout=(self.connect_timeout, read_timeout)
+                )
+            except requests.exceptions.RequestException as e:
+                error = _transport_error(e, isinstance(e, requests.exceptions.Timeout))
+            else:
+                if limiter:
+                    limiter.settle(estimated, _usage_tokens(response.status_code, response.json))
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    return _completion_content(response.status_code, response.text, response.json)
+                error = _completion_content(response.status_code, response.text, response.json)
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+
+            delay = self.retry.next_delay(attempt, deadline_at, retry_after)
+            if delay is None:
+                self.breaker.record_failure()
+                return error
+            logger.warning("LLM call failed (%s), retry %d in %.2fs", error["error"], attempt, delay)
+            time.sleep(delay)
+
+    def chat_json(self, messages, model, temperature=0.2, max_tokens=None, timeout=None, batch=False):
+        """Return the completion parsed as a JSON object, or an error dict."""
+        options = {"json_mode": self.json_mode, "max_tokens": max_tokens, "timeout": timeout, "batch": batch}
+        parsed, repair = _parse_json_result(self.chat(messages, model, temperature, **options))
+        if repair is None or not self.repair_prompt:
+            return parsed
+        _count_json("repair_prompts")
+        return _parse_repaired(parsed, self.chat(repair, model, 0.0, **options))
+
+    def stream_chat(self, messages, model, temperature=0.2, max_tokens=None, timeout=None):
+        """Yield completion text deltas as the API streams them.
+
+        Failures before the first delta are retried like chat(); once text
+        has been yielded, or when retries are exhausted, LLMStreamError is
+        raised instead.
+        """
+        ticket = self.breaker.allow()
+        if not ticket:
+            raise LLMStreamError(self.breaker.open_error())
+        try:
+            yield from self._stream_chat(messages, model, temperature, max_tokens, timeout)
+        finally:
+            self.breaker.release(ticket)
+
+    def _stream_chat(self, messages, model, temperature, max_tokens, timeout):
+        payload = {**_payload(model, messages, temperature, max_tokens=max_tokens), "stream": True}
+        estimated = estimate_tokens(messages, max_tokens or self.completion_tokens)
+        deadline_at = time.monotonic() + self.retry.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            started = False
+            if self.limiter:
+                try:
+                    self.limiter.acquire(estimated, max_wait=deadline_at - time.monotonic())
+                except RateLimitTimeout as e:
+                    raise LLMStreamError(_rate_limit_error(e))
+            read_timeout = max(0.1, min(timeout or self.read_timeout, deadline_at - time.monotonic()))
+            try:
+                with self.session.post(
+                    GROQ_API_URL, json=payload, timeout=(self.connect_timeout, read_timeout), stream=True
+                ) as response:
+                    if response.status_code == 200:
+                        response.encoding = "utf-8"
+                        usage = None
+                        for line in response.iter_lines(decode_unicode=True):
+                            event = _stream_chunk(line)
+                            if event is None:
+                                continue
+                            delta, usage = event[0], event[1] or usage
+                            if delta:
+                                started = True
+                                yield delta
+                        self.breaker.record_success()
+                        if self.limiter:
+                            self.limiter.settle(estimated, usage["total_tokens"] if usage else None)
+                        return
+
+                    if self.limiter:
+                        self.limiter.settle(estimated, 0)
+                    error = _completion_content(response.status_code, response.text, response.json)
+                    if response.status_code not in RETRYABLE_STATUS:
+                        self.breaker.record_success()
+                        raise LLMStreamError(error)
+                    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+            except GeneratorExit:
+                # The consumer stopped reading mid-stream; the API was answering fine
+                self.breaker.record_success()
+                raise
+            except (requests.exceptions.RequestException, ValueError) as e:
+                error = _stream_failed(e, started)
+                if started:
+                    self.breaker.record_failure()
+                    raise LLMStreamError(error)
+
+            delay = self.retry.next_delay(attempt, deadline_at, retry_after)
+            if delay is None:
+                self.breaker.record_failure()
+                raise LLMStreamError(error)
+            logger.warning("LLM stream failed (%s), retry %d in %.2fs", error["error"], attempt, delay)
+            time.sleep(delay)
+
+    def warm_up(self):
+        """Open a pooled connection to the API host ahead of the first call."""
+        try:
+            self.session.get(f"{GROQ_API_BASE}/models", timeout=self.timeout).close()
+        except requests.exceptions.RequestException as e:
+            logger.warning("LLM client warm-up failed: %s", e)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncLLMClient:
+    """Pooled httpx.AsyncClient for the Groq chat-completions API.
+
+    An httpx client is bound to the event loop it was first used on, so
+    get_async_llm_client() keeps one per running loop.
+    """
+
+    def __init__(self, api_key=GROQ_API_KEY, max_connections=200, max_keepalive=32,
+                 connect_timeout=5.0, read_timeout=60.0, retry=None, breaker=None,
+                 limiter=None, completion_tokens=1024, json_mode=True, repair_prompt=True):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter
+        # Completion size assumed when reserving tokens before a call
+        self.completion_tokens = completion_tokens
+        # chat_json() asks for the provider's JSON mode, and sends one
+        # repair prompt when local repair can't save the output
+        self.json_mode = json_mode
+        self.repair_prompt = repair_prompt
+        self.client = httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+        )
+
+    async def chat(self, messages, model, temperature=0.2, json_mode=False, max_tokens=None, timeout=None):
+        """Return the completion text, or an error dict on failure."""
+        ticket = self.breaker.allow()
+        if not ticket:
+            return self.breaker.open_error()
+        try:
+            return await self._chat(messages, model, temperature, json_mode, max_tokens, timeout)
+        finally:
+            self.breaker.release(ticket)
+
+    async def _chat(self, messages, model, temperature, json_mode, max_tokens, timeout):
+        payload = _payload(model, messages, temperature, json_mode, max_tokens)
+        estimated = estimate_tokens(messages, max_tokens or self.completion_tokens)
+        deadline_at = time.monotonic() + self.retry.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            if self.limiter:
+                try:
+                    await self.limiter.aacquire(estimated, max_wait=deadline_at - time.monotonic())
+                except RateLimitTimeout as e:
+                    return _rate_limit_error(e)
+            read_timeout = max(0.1, min(timeout or self.read_timeout, deadline_at - time.monotonic()))
+            try:
+                response = await self.client.post(
+                    GROQ_API_URL, json=payload,
+                    timeout=httpx.Timeout(read_timeout, connect=self.connect_timeout),
+                )
+            except httpx.HTTPError as e:
+                error = _transport_error(e, isinstance(e, httpx.TimeoutException))
+            else:
+                if self.limiter:
+                    await self.limiter.asettle(estimated, _usage_tokens(response.status_code, response.json))
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    return _completion_content(response.status_code, response.text, response.json)
+                error = _completion_content(response.status_code, response.text, response.json)
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+
+            delay = self.retry.next_delay(attempt, deadline_at, retry_after)
+            if delay is None:
+                self.breaker.record_failure()
+                return error
+            logger.warning("LLM call failed (%s), retry %d in %.2fs", error["error"], attempt, delay)
+            await asyncio.sleep(delay)
+
+    async def chat_json(self, messages, model, temperature=0.2, max_tokens=None, timeout=None):
+        """Return the completion parsed as a JSON object, or an error dict."""
+        parsed, repair = _parse_json_result(
+            await self.chat(messages, model, temperature, json_mode=self.json_mode, max_tokens=max_tokens, timeout=timeout)
+        )
+        if repair is None or not self.repair_prompt:
+            return parsed
+        _count_json("repair_prompts")
+        return _parse_repaired(
+            parsed, await self.chat(repair, model, 0.0, json_mode=self.json_mode, max_tokens=max_tokens, timeout=timeout)
+        )
+
+    async def stream_chat(self, messages, model, temperature=0.2, max_tokens=None, timeout=None):
+        """Async generator counterpart of LLMClient.stream_chat()."""
+        ticket = self.breaker.allow()
+        if not ticket:
+            raise LLMStreamError(self.breaker.open_error())
+        stream = self._stream_chat(messages, model, temperature, max_tokens, timeout)
+        try:
+            async for delta in stream:
+                yield delta
+        finally:
+            # Async generators aren't closed with their consumer; close the
+            # inner one first so it can record the outcome
+            await stream.aclose()
+            self.breaker.release(ticket)
+
+    async def _stream_chat(self, messages, model, temperature, max_tokens, timeout):
+        payload = {**_payload(model, messages, temperature, max_tokens=max_tokens), "stream": True}
+        estimated = estimate_tokens(messages, max_tokens or self.completion_tokens)
+        deadline_at = time.monotonic() + self.retry.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            started = False
+            if self.limiter:
+                try:
+                    await self.limiter.aacquire(estimated, max_wait=deadline_at - time.monotonic())
+                except RateLimitTimeout as e:
+                    raise LLMStreamError(_rate_limit_error(e))
+            read_timeout = max(0.1, min(timeout or self.read_timeout, deadline_at - time.monotonic()))
+            try:
+                async with self.client.stream(
+                    "POST", GROQ_API_URL, json=payload,
+                    timeout=httpx.Timeout(read_timeout, connect=self.connect_timeout),
+                ) as response:
+                    if response.status_code == 200:
+                        usage = None
+                        async for line in response.aiter_lines():
+                            event = _stream_chunk(line)
+                            if event is None:
+                                continue
+                            delta, usage = event[0], event[1] or usage
+                            if delta:
+                                started = True
+                                yield delta
+                        self.breaker.record_success()
+                        if self.limiter:
+                            await self.limiter.asettle(estimated, usage["total_tokens"] if usage else None)
+                        return
+
+                    await response.aread()
+                    if self.limiter:
+                        await self.limiter.asettle(estimated, 0)
+                    error = _completion_content(response.status_code, response.text, response.json)
+                    if response.status_code not in RETRYABLE_STATUS:
+                        self.breaker.record_success()
+                        raise LLMStreamError(error)
+                    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+            except GeneratorExit:
+                # The consumer stopped reading mid-stream; the API was answering fine
+                self.breaker.record_success()
+                raise
+            except (httpx.HTTPError, ValueError) as e:
+                error = _stream_failed(e, started)
+                if started:
+                    self.breaker.record_failure()
+                    raise LLMStreamError(error)
+
+            delay = self.retry.next_delay(attempt, deadline_at, retry_after)
+            if delay is None:
+                self.breaker.record_failure()
+                raise LLMStreamError(error)
+            logger.warning("LLM stream failed (%s), retry %d in %.2fs", error["error"], attempt, delay)
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+_retry = None
+_breaker = None
+
+
+def _shared_policies():
+    """RetryPolicy and CircuitBreaker shared by every client in the process."""
+    global _retry, _breaker
+    from django.conf import settings
+
+    with _client_lock:
+        if _breaker is None:
+            _retry = RetryPolicy(
+                max_attempts=settings.LLM_MAX_ATTEMPTS,
+                backoff_base=settings.LLM_BACKOFF_BASE,
+                backoff_max=settings.LLM_BACKOFF_MAX,
+                deadline=settings.LLM_REQUEST_DEADLINE,
+            )
+            _breaker = CircuitBreaker(
+                failure_threshold=settings.LLM_BREAKER_THRESHOLD,
+                reset_timeout=settings.LLM_BREAKER_RESET,
+            )
+        return _retry, _breaker
+
+
+def circuit_state():
+    """State of the shared circuit breaker, for monitoring."""
+    return _shared_policies()[1].state()
+
+
+def get_llm_client():
+    """Return the process-wide LLMClient configured from settings."""
+    global _client
+    if _client is None:
+        from django.conf import settings
+
+        retry, breaker = _shared_policies()
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient(
+                    pool_size=settings.LLM_POOL_SIZE,
+                    connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+                    read_timeout=settings.LLM_READ_TIMEOUT,
+                    retry=retry,
+                    breaker=breaker,
+                    limiter=get_rate_limiter(),
+                    batch_limiter=get_batch_rate_limiter(),
+                    completion_tokens=settings.LLM_RATE_LIMIT_COMPLETION_TOKENS,
+                    json_mode=settings.LLM_JSON_MODE,
+                    repair_prompt=settings.LLM_JSON_REPAIR_PROMPT,
+                )
+    return _client
+
+
+def get_async_llm_client():
+    """Return the AsyncLLMClient for the running event loop.
+
+    Under ASGI every request shares the server's loop, and with it one
+    connection pool.
+    """
+    from django.conf import settings
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        retry, breaker = _shared_policies()
+        client = _async_clients[loop] = AsyncLLMClient(
+            max_connections=settings.LLM_ASYNC_MAX_CONNECTIONS,
+            max_keepalive=settings.LLM_POOL_SIZE,
+            connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+            read_timeout=settings.LLM_READ_TIMEOUT,
+            retry=retry,
+            breaker=breaker,
+            limiter=get_rate_limiter(),
+            completion_tokens=settings.LLM_RATE_LIMIT_COMPLETION_TOKENS,
+            json_mode=settings.LLM_JSON_MODE,
+            repair_prompt=settings.LLM_JSON_REPAIR_PROMPT,
+        )
+    return client
+
+
+def warm_up_in_background():
+    """Warm the shared client on a daemon thread so startup isn't blocked."""
+    if not GROQ_API_KEY:
+        return
+    threading.Thread(
+        target=lambda: get_llm_client().warm_up(), name="llm-warm-up", daemon=True
+    ).start()
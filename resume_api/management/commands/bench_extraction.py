@@ -0,0 +1,181 @@
+import time
+from pathlib import Path
+from unittest import mock
+
+import fitz  # PyMuPDF
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from resume_api.utils.pdf_extraction import (
+    TEXT_MODE_BLOCKS,
+    TEXT_MODE_TEXT,
+    LinkIndex,
+    extract_clean_text,
+)
+
+
+def _legacy_extract_clean_text(pdf_bytes: bytes) -> str:
+    """Original nested-loop implementation, kept only as a baseline."""
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    full_text_pages = []
+
+    for page in doc:
+        blocks = page.get_text("blocks")
+        links = page.get_links()
+
+        link_rects = [(fitz.Rect(link["from"]), link["uri"]) for link in links if "uri" in link]
+
+        page_text_with_links = ""
+
+        for block in blocks:
+            block_rect = fitz.Rect(block[:4])
+            block_text = block[4]
+
+            appended_urls = []
+            for rect, uri in link_rects:
+                if rect.intersects(block_rect):
+                    appended_urls.append(uri)
+
+            combined = block_text
+            for url in appended_urls:
+                combined += " " + url
+
+            page_text_with_links += combined
+
+        full_text_pages.append(page_text_with_links)
+
+    return "\n\n".join(full_text_pages)
+
+
+def _document_uris(pdf_bytes: bytes) -> list:
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        return [link["uri"] for page in doc for link in page.get_links() if "uri" in link]
+    finally:
+        doc.close()
+
+
+def _text_and_links(output: str, uris: list):
+    """Whitespace-normalised text with the link URIs cut out, and each URI's count.
+
+    The legacy output glues a block's URIs onto the next block's first
+    word, while the indexed output keeps them on the block's own line;
+    comparing text and links separately ignores only that layout change.
+    """
+    counts = {}
+    # Longest first so a URI that prefixes another doesn't split it
+    for uri in sorted(set(uris), key=len, reverse=True):
+        counts[uri] = output.count(" " + uri)
+        output = output.replace(" " + uri, " ")
+    return " ".join(output.split()), counts
+
+
+def _linear_uris_for(self, block_rect):
+    """LinkIndex.uris_for without the index: test every link on the page."""
+    hits = [(order, uri) for _, order, rect, uri in self._entries if rect.intersects(block_rect)]
+    hits.sort()
+    return [uri for _, uri in hits]
+
+
+def _unindexed_extract_clean_text(pdf_bytes: bytes) -> str:
+    """The current extractor with the y-interval index replaced by a linear scan."""
+    with mock.patch.object(LinkIndex, "uris_for", _linear_uris_for):
+        return extract_clean_text(pdf_bytes, text_mode=TEXT_MODE_BLOCKS)
+
+
+def _synthetic_pdf(lines: int) -> bytes:
+    """One page of ``lines`` text lines, each its own block with its own link.
+
+    Link-heavy pages (publication lists, portfolios) are where the index
+    pays off: a linear scan tests every block against every link.
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=20 * lines + 100)
+    for number in range(lines):
+        y = 40 + number * 20
+        page.insert_text((72, y), f"Project {number}: link text")
+        page.insert_link({
+            "kind": fitz.LINK_URI,
+            "from": fitz.Rect(70, y - 12, 300, y + 2),
+            "uri": f"https://example.com/project/{number}",
+        })
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark extract_clean_text against the sample PDFs in resumes/ "
+        "and, with --synthetic, generated link-heavy pages"
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            help="PDF files or directories to benchmark (default: BASE_DIR/resumes)",
+        )
+        parser.add_argument("--repeat", type=int, default=50, help="Runs per PDF and variant")
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            nargs="*",
+            default=[],
+            metavar="LINES",
+            help="Also benchmark generated one-page PDFs with LINES linked lines each",
+        )
+
+    def handle(self, *args, **options):
+        documents = [
+            (pdf.name, pdf.read_bytes())
+            for pdf in self._collect_pdfs(options["paths"] or [Path(settings.BASE_DIR) / "resumes"])
+        ]
+        documents += [(f"synthetic-{lines}-links", _synthetic_pdf(lines)) for lines in options["synthetic"]]
+        if not documents:
+            raise CommandError("No PDF files found to benchmark")
+
+        repeat = max(1, options["repeat"])
+        variants = [
+            ("legacy", _legacy_extract_clean_text),
+            ("unindexed", _unindexed_extract_clean_text),
+            ("indexed", lambda data: extract_clean_text(data, text_mode=TEXT_MODE_BLOCKS)),
+            ("text-mode", lambda data: extract_clean_text(data, text_mode=TEXT_MODE_TEXT)),
+        ]
+
+        for name, data in documents:
+            uris = _document_uris(data)
+            if _text_and_links(_legacy_extract_clean_text(data), uris) != _text_and_links(
+                extract_clean_text(data, text_mode=TEXT_MODE_BLOCKS), uris
+            ):
+                self.stderr.write(self.style.WARNING(
+                    f"{name}: indexed output differs from legacy (text or links)"
+                ))
+
+            self.stdout.write(name)
+            baseline = None
+            for variant, func in variants:
+                elapsed = self._time(func, data, repeat)
+                baseline = baseline or elapsed
+                self.stdout.write(
+                    f"  {variant:<10} {elapsed * 1000:8.3f} ms/doc  x{baseline / elapsed:5.2f}"
+                )
+
+    def _collect_pdfs(self, paths):
+        pdfs = []
+        for raw in paths:
+            path = Path(raw)
+            if path.is_dir():
+                pdfs.extend(sorted(path.glob("*.pdf")))
+            elif path.suffix.lower() == ".pdf" and path.exists():
+                pdfs.append(path)
+        return pdfs
+
+    def _time(self, func, data, repeat):
+        func(data)  # warm-up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(data)
+        return (time.perf_counter() - start) / repeat
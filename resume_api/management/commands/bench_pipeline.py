@@ -0,0 +1,265 @@
+"""Offline benchmark suite for the resume extraction and parsing pipeline.
+
+Each case runs in a fresh spawned process so its peak RSS is measured in
+isolation. Results are written as JSON and can be compared against a
+previous run to catch regressions:
+
+    python manage.py bench_pipeline --output bench.json
+    python manage.py bench_pipeline --compare bench.json --threshold 1.25
+"""
+
+import json
+import multiprocessing
+import platform
+import re
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from resume_api.llm_client import parse_json_content
+from resume_api.utils.pdf_extraction import (
+    TEXT_MODE_BLOCKS,
+    TEXT_MODE_TEXT,
+    extract_clean_text,
+    iter_clean_pages,
+)
+from resume_api.utils.text_compaction import compact_pages
+
+LOREM = (
+    "Designed and shipped data pipelines processing millions of events per day, "
+    "improving reliability and reducing infrastructure cost across teams."
+)
+
+
+def synthetic_large_pdf(pages=200):
+    """Long text-only document: many pages of dense bullet points."""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        y = 50
+        page.insert_text((50, y), f"Section {number + 1}", fontsize=14)
+        while y < 760:
+            y += 14
+            page.insert_text((50, y), f"- {LOREM[:90]}", fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def synthetic_link_heavy_pdf(pages=5, links_per_page=300):
+    """Publication-list style document with hundreds of URI links per page."""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        columns, rows = 3, links_per_page // 3
+        for index in range(links_per_page):
+            column, row = index % columns, index // columns
+            x = 40 + column * 180
+            y = 40 + row * (740 / rows)
+            page.insert_text((x, y + 7), f"Paper {number}-{index}", fontsize=6)
+            page.insert_link({
+                "kind": fitz.LINK_URI,
+                "from": fitz.Rect(x, y, x + 60, y + 8),
+                "uri": f"https://example.org/papers/{number}/{index}",
+            })
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def synthetic_llm_output(entries=400, malformed=False):
+    """A large resume JSON wrapped the way LLMs tend to return it."""
+    resume = {
+        "name": "Jane Doe",
+        "skills": [f"skill-{i}" for i in range(200)],
+        "experience": [
+            {
+                "title": f"Engineer {i}",
+                "company": f"Company {i}",
+                "start_date": "2020",
+                "end_date": "2022",
+                "description": LOREM,
+            }
+            for i in range(entries)
+        ],
+    }
+    body = json.dumps(resume, indent=2)
+    # Trailing commas before closing brackets, as models often emit
+    body = re.sub(r"(\"|\d|\]|\})\n(\s*)([}\]])", r"\1,\n\2\3", body)
+    content = f"Here is the parsed resume:\n```json\n{body}\n```\nLet me know if you need anything else."
+    if malformed:
+        # Truncated mid-object, as when max_tokens cuts a completion short
+        content = content[: int(len(content) * 0.9)]
+    return content
+
+
+def _peak_rss_kb():
+    # On Linux ru_maxrss survives exec, so a spawned child would report the
+    # parent's peak; VmHWM belongs to the child's own address space.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _run_extraction_case(name, pdf_bytes, text_mode, repeat, compact):
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    pages = doc.page_count
+    doc.close()
+
+    extract_clean_text(pdf_bytes, text_mode=text_mode)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if compact:
+            compact_pages(list(iter_clean_pages(pdf_bytes, text_mode=text_mode)))
+        else:
+            extract_clean_text(pdf_bytes, text_mode=text_mode)
+        timings.append(time.perf_counter() - start)
+
+    total = sum(timings)
+    mean = total / repeat
+    return {
+        "case": name,
+        "kind": "extraction",
+        "pages": pages,
+        "bytes": len(pdf_bytes),
+        "repeat": repeat,
+        "mean_ms": round(mean * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "per_page_ms": round(mean * 1000 / max(pages, 1), 4),
+        "docs_per_sec": round(repeat / total, 2) if total else None,
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def _run_json_case(name, content, repeat):
+    timings = []
+    parsed = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parsed = parse_json_content(content)
+        timings.append(time.perf_counter() - start)
+
+    total = sum(timings)
+    return {
+        "case": name,
+        "kind": "json",
+        "bytes": len(content),
+        "repeat": repeat,
+        "parsed": "error" not in parsed,
+        "mean_ms": round(total * 1000 / repeat, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "docs_per_sec": round(repeat / total, 2) if total else None,
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def _run_case(kind, *args):
+    # Executed in a fresh spawned process so peak RSS is per case
+    if kind == "extraction":
+        return _run_extraction_case(*args)
+    return _run_json_case(*args)
+
+
+class Command(BaseCommand):
+    help = "Benchmark PDF extraction and LLM JSON post-processing; emits JSON results"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs per case")
+        parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+        parser.add_argument("--compare", help="Previous results JSON to compare mean_ms against")
+        parser.add_argument(
+            "--threshold", type=float, default=1.25,
+            help="Fail when a case's mean_ms exceeds the baseline by this factor",
+        )
+        parser.add_argument("--skip-synthetic", action="store_true", help="Only benchmark resumes/*.pdf")
+
+    def handle(self, *args, **options):
+        repeat = max(1, options["repeat"])
+        cases = self._cases(repeat, options["skip_synthetic"])
+
+        results = []
+        context = multiprocessing.get_context("spawn")
+        for case in cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(_run_case, *case).result()
+            results.append(result)
+            self.stderr.write(
+                f"{result['case']:<32} {result['mean_ms']:>10.3f} ms  "
+                f"{result['docs_per_sec'] or 0:>9.2f} docs/s  {result['peak_rss_kb']:>8} KB"
+            )
+
+        report = {
+            "python": platform.python_version(),
+            "pymupdf": fitz.VersionBind,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "results": results,
+        }
+
+        payload = json.dumps(report, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(payload)
+        else:
+            self.stdout.write(payload)
+
+        if options["compare"]:
+            self._compare(results, options["compare"], options["threshold"])
+
+    def _cases(self, repeat, skip_synthetic):
+        cases = []
+        for pdf in sorted((Path(settings.BASE_DIR) / "resumes").glob("*.pdf")):
+            data = pdf.read_bytes()
+            cases.append(("extraction", f"sample:{pdf.stem}", data, TEXT_MODE_BLOCKS, repeat, False))
+            cases.append(("extraction", f"sample:{pdf.stem}:compact", data, TEXT_MODE_BLOCKS, repeat, True))
+
+        if not skip_synthetic:
+            large = synthetic_large_pdf()
+            links = synthetic_link_heavy_pdf()
+            cases += [
+                ("extraction", "synthetic:large-200p", large, TEXT_MODE_BLOCKS, max(1, repeat // 5), False),
+                ("extraction", "synthetic:large-200p:text", large, TEXT_MODE_TEXT, max(1, repeat // 5), False),
+                ("extraction", "synthetic:links-5x300", links, TEXT_MODE_BLOCKS, repeat, False),
+            ]
+
+        cases += [
+            ("json", "json:large-trailing-commas", synthetic_llm_output(), repeat * 10),
+            ("json", "json:large-truncated", synthetic_llm_output(malformed=True), repeat * 10),
+        ]
+        if not cases:
+            raise CommandError("Nothing to benchmark")
+        return cases
+
+    def _compare(self, results, baseline_path, threshold):
+        try:
+            baseline = json.loads(Path(baseline_path).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read baseline {baseline_path}: {e}")
+
+        previous = {result["case"]: result for result in baseline.get("results", [])}
+        regressions = []
+        for result in results:
+            before = previous.get(result["case"])
+            if not before or not before.get("mean_ms"):
+                continue
+            ratio = result["mean_ms"] / before["mean_ms"]
+            if ratio > threshold:
+                regressions.append(f"{result['case']}: {before['mean_ms']} -> {result['mean_ms']} ms (x{ratio:.2f})")
+
+        if regressions:
+            raise CommandError("Performance regressions:\n  " + "\n  ".join(regressions))
+        self.stderr.write(self.style.SUCCESS(f"No regressions beyond x{threshold} against {baseline_path}"))
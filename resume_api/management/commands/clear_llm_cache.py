@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from resume_api.models import CachedLLMResponse
+
+
+class Command(BaseCommand):
+    help = "Delete cached LLM responses (all, one namespace, or only rows older than N seconds)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--namespace", help="Only clear this cache, e.g. resume_parse")
+        parser.add_argument(
+            "--older-than", type=int, metavar="SECONDS",
+            help="Only delete entries created more than this many seconds ago",
+        )
+
+    def handle(self, *args, **options):
+        rows = CachedLLMResponse.objects.all()
+        if options["namespace"]:
+            rows = rows.filter(namespace=options["namespace"])
+        if options["older_than"] is not None:
+            rows = rows.filter(created_at__lt=timezone.now() - timedelta(seconds=options["older_than"]))
+
+        deleted, _ = rows.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} cached response(s). Running workers keep their "
+            f"in-memory copies until they expire or are evicted."
+        ))
@@ -1,30 +1,31 @@
-import os
-import re
 import json
-from dotenv import load_dotenv
-import requests
 
-load_dotenv()
+from django.conf import settings
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-model = "llama3-70b-8192"
+from .llm_client import get_async_llm_client, get_llm_client
+from .utils.json_repair import strip_repaired_flag
+from .utils.model_routing import fit_to_context, get_route
+from .utils.prompt_budget import Section, build_prompt, compact_json, project
+from .utils.response_cache import ResponseCache, cache_key
+from .utils.single_flight import SingleFlight
 
-def clean_json_string(s):
-    # Remove trailing commas before } or ]
-    s = re.sub(r",\s*([}\]])", r"\1", s)
-    # Remove markdown formatting
-    s = re.sub(r"^```(json)?", "", s, flags=re.IGNORECASE).strip()
-    s = re.sub(r"```$", "", s).strip()
-    return s
+# Scores come from a low-temperature completion, so a repeat run of the same
+# resume against the same job description reuses the earlier result
+match_cache = ResponseCache(
+    "match_analysis",
+    ttl=settings.MATCH_CACHE_TTL,
+    max_items=settings.MATCH_CACHE_MAX_ITEMS,
+    max_rows=settings.MATCH_CACHE_MAX_ROWS,
+)
+match_flight = SingleFlight("match_analysis", lock_ttl=settings.LLM_SINGLE_FLIGHT_LOCK_TTL)
 
+# Resume fields that bear on the scores; contact details don't
+MATCH_FIELDS = ['summary', 'skills', 'experience', 'education', 'projects', 'certifications']
 
-def match_analyzer(resume_data, job_description, model=model):
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
+REQUIRED_FIELDS = ['overallMatch', 'skillsMatch', 'experienceMatch', 'educationMatch', 'missingKeywords', 'recommendedImprovements']
 
+
+def _match_messages(resume_data, job_description):
     prompt = '''
     You are an expert HR professional and resume analyzer. Your task is to analyze how well a candidate's resume matches a specific job description.
 
@@ -56,51 +57,76 @@ def match_analyzer(resume_data, job_description, model=model):
     Only return valid JSON. Do not include any markdown formatting or additional text.
     '''
 
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": "You are an expert HR professional that analyzes resume-job matches and provides detailed scoring and recommendations."},
-            {"role": "user", "content": prompt.format(resume_data=json.dumps(resume_data, indent=2), job_description=job_description)}
-        ],
-        "temperature": 0.1
-    }
-
-    try:
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
-
-            # Try to isolate valid JSON block using regex
-            match = re.search(r"\{[\s\S]*\}", content)
-            if match:
-                json_string = clean_json_string(match.group())
-
-                try:
-                    parsed_data = json.loads(json_string)
-                    
-                    # Validate and ensure all required fields are present
-                    required_fields = ['overallMatch', 'skillsMatch', 'experienceMatch', 'educationMatch', 'missingKeywords', 'recommendedImprovements']
-                    for field in required_fields:
-                        if field not in parsed_data:
-                            if field in ['overallMatch', 'skillsMatch', 'experienceMatch', 'educationMatch']:
-                                parsed_data[field] = 0  # Default to 0 for missing scores
-                            elif field in ['missingKeywords', 'recommendedImprovements']:
-                                parsed_data[field] = []  # Default to empty array for missing lists
-                    
-                    return parsed_data
-                except json.JSONDecodeError as e:
-                    return {"error": "Failed to parse JSON after cleaning", "raw": json_string, "message": str(e)}
-            else:
-                return {"error": "No valid JSON object found", "raw": content}
-
-        else:
-            return {"error": f"API request failed with status code {response.status_code}", "message": response.text}
-
-    except requests.exceptions.RequestException as e:
-        return {"error": "Request failed", "message": str(e)}
-
-    except json.JSONDecodeError:
-        return {"error": "Failed to parse JSON from response", "raw": response.text}
-    
+    # Job descriptions end in boilerplate (benefits, EEO statements), so
+    # they are cut before the resume
+    prompt = build_prompt("match_analysis", prompt, settings.LLM_PROMPT_TOKEN_BUDGET, {
+        "resume_data": Section(compact_json(project(resume_data, MATCH_FIELDS)), priority=1, min_tokens=1000),
+        "job_description": Section(str(job_description), priority=0, min_tokens=500),
+    })
+    return [
+        {"role": "system", "content": "You are an expert HR professional that analyzes resume-job matches and provides detailed scoring and recommendations."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _with_required_fields(parsed_data):
+    if "error" in parsed_data:
+        return parsed_data
+
+    # Validate and ensure all required fields are present
+    for field in REQUIRED_FIELDS:
+        if field not in parsed_data:
+            if field in ['overallMatch', 'skillsMatch', 'experienceMatch', 'educationMatch']:
+                parsed_data[field] = 0  # Default to 0 for missing scores
+            elif field in ['missingKeywords', 'recommendedImprovements']:
+                parsed_data[field] = []  # Default to empty array for missing lists
+
+    return parsed_data
+
+
+def match_cache_key(resume_data, job_description, model=None):
+    """Hash of canonical resume JSON, whitespace-normalized JD and model."""
+    resume_json = json.dumps(resume_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return cache_key(
+        get_route("match_analysis", model).model,
+        cache_key(resume_json),
+        cache_key(" ".join(str(job_description).split())),
+    )
+
+
+def match_analyzer(resume_data, job_description, model=None, use_cache=True):
+    key = match_cache_key(resume_data, job_description, model)
+    if use_cache:
+        cached = match_cache.get(key)
+        if cached is not None:
+            return cached
+    else:
+        match_cache.bypass()
+
+    def compute():
+        messages = _match_messages(resume_data, job_description)
+        route = fit_to_context(get_route("match_analysis", model), messages)
+        match_result = _with_required_fields(get_llm_client().chat_json(messages, **route._asdict()))
+        match_cache.set(key, match_result)
+        return strip_repaired_flag(match_result)
+
+    return match_flight.do(key, compute, lambda: match_cache.get(key))
+
+
+async def amatch_analyzer(resume_data, job_description, model=None, use_cache=True):
+    key = match_cache_key(resume_data, job_description, model)
+    if use_cache:
+        cached = await match_cache.aget(key)
+        if cached is not None:
+            return cached
+    else:
+        match_cache.bypass()
+
+    async def acompute():
+        messages = _match_messages(resume_data, job_description)
+        route = fit_to_context(get_route("match_analysis", model), messages)
+        match_result = _with_required_fields(await get_async_llm_client().chat_json(messages, **route._asdict()))
+        await match_cache.aset(key, match_result)
+        return strip_repaired_flag(match_result)
+
+    return await match_flight.ado(key, acompute, lambda: match_cache.aget(key))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume_api', '0004_cachedllmresponse'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMRequestLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(max_length=32)),
+                ('key', models.CharField(max_length=64)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('namespace', 'key'), name='unique_llm_request_lock')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume_api', '0005_llmrequestlock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmrequestlock',
+            name='owner',
+            field=models.CharField(default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume_api', '0006_llmrequestlock_owner'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resumebatch',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
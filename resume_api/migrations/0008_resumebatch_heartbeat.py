@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resume_api', '0007_resumebatch_failed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumebatch',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
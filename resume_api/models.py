@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import User
@@ -10,4 +12,91 @@ class Resume(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+class ExtractedText(models.Model):
+    """Persistent tier of the extracted-text cache, keyed by PDF SHA-256."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['created_at'])]
+
+
+class CachedLLMResponse(models.Model):
+    """Persistent tier of the LLM response caches (utils/response_cache.py)."""
+    namespace = models.CharField(max_length=32)
+    key = models.CharField(max_length=64)
+    response = models.JSONField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['namespace', 'key'], name='unique_llm_response_key'),
+        ]
+        indexes = [models.Index(fields=['namespace', 'created_at'])]
+
+
+class LLMRequestLock(models.Model):
+    """Held by the worker computing an LLM response others are waiting on (utils/single_flight.py)."""
+    namespace = models.CharField(max_length=32)
+    key = models.CharField(max_length=64)
+    # Token of the leader holding the row; only it may release the lock
+    owner = models.CharField(max_length=32, default='')
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['namespace', 'key'], name='unique_llm_request_lock'),
+        ]
+
+
+class ResumeBatch(models.Model):
+    """A set of resumes uploaded together and processed in the background."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Refreshed by the batch's runner thread while it is alive
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class ResumeBatchItem(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    batch = models.ForeignKey(ResumeBatch, related_name='items', on_delete=models.CASCADE)
+    original_filename = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=500, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
@@ -1,113 +1,308 @@
-import os
-import re
-import json
-from dotenv import load_dotenv
-import requests
-
-load_dotenv()
-
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-model = "llama3-70b-8192"
-
-def clean_json_string(s):
-    # Remove trailing commas before } or ]
-    s = re.sub(r",\s*([}\]])", r"\1", s)
-    # Remove markdown formatting
-    s = re.sub(r"^```(json)?", "", s, flags=re.IGNORECASE).strip()
-    s = re.sub(r"```$", "", s).strip()
-    return s
-
-def ats_extractor(resume_data, model=model):
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    prompt = '''
-    You are an AI bot designed to act as a professional for parsing resumes. You are given a resume data and your job is to extract the following information:
-    - name
-    - email
-    - phone
-    - linkedin (if available)
-    - github (if available)
-    - address (if available)
-    - portfolio (if available)
-    - summary (2-3 sentence professional summary)
-    - skills (as a list)
-    - experience: list of work experience entries with
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .llm_client import get_async_llm_client, get_llm_client
+from .utils.contact_extraction import extract_contact_fields
+from .utils.json_repair import REPAIRED_FLAG, strip_repaired_flag
+from .utils.model_routing import fit_to_context, get_route
+from .utils.prompt_budget import Section, build_prompt, count_tokens
+from .utils.response_cache import ResponseCache, cache_key
+from .utils.section_segmenter import SECTION_HEADER, segment_resume
+from .utils.single_flight import SingleFlight
+
+# Prompt lines for every field of the parsed schema, in schema order.
+# Contact fields extracted locally by extract_contact_fields are left out.
+FIELD_PROMPTS = [
+    ("name", "    - name"),
+    ("email", "    - email"),
+    ("phone", "    - phone"),
+    ("linkedin", "    - linkedin (if available)"),
+    ("github", "    - github (if available)"),
+    ("address", "    - address (if available)"),
+    ("portfolio", "    - portfolio (if available)"),
+    ("summary", "    - summary (2-3 sentence professional summary)"),
+    ("skills", "    - skills (as a list)"),
+    ("experience", """    - experience: list of work experience entries with
         - title (job title)
         - company
         - start_date (if available)
         - end_date (if available)
-        - description (main bullet point or summary of experience)
-    - education: list of education entries with
+        - description (main bullet point or summary of experience)"""),
+    ("education", """    - education: list of education entries with
         - degree
         - university
-        - graduation_year (if available)
-    - projects: list of projects with
+        - graduation_year (if available)"""),
+    ("projects", """    - projects: list of projects with
         - name (project name)
         - description (project description)
         - technologies (if available)
-        - Links: Github, or any live link ( if available)
-    - certifications (if available): list of certifications with
+        - Links: Github, or any live link ( if available)"""),
+    ("certifications", """    - certifications (if available): list of certifications with
         - name (certification name)
         - issuer (certification issuer)
         - issue_date (if available)
-        - and pursuiing (if available)
-    - awards (if available): list of awards with
+        - and pursuiing (if available)"""),
+    ("awards", """    - awards (if available): list of awards with
         - name (award name)
         - description (award description)
-        - year (award year) 
+        - year (award year) """),
+]
+
+# Sections that get their own concurrent completion when a resume is split.
+# Everything else (header, summary, skills, unrecognised sections) goes to
+# the "profile" task together with any field whose section wasn't found.
+SECTION_TASKS = {
+    "experience": ["experience"],
+    "education": ["education"],
+    "projects": ["projects"],
+    "credentials": ["certifications", "awards"],
+}
+
+# Split only when at least this many of the SECTION_TASKS sections were found
+MIN_SPLIT_SECTIONS = 2
+
+PROMPT = '''
+    You are an AI bot designed to act as a professional for parsing resumes. You are given a resume data and your job is to extract the following information:
+{fields}
+
 
-    
     Only return valid JSON. Ensure all strings are properly closed and formatted. Do not include trailing commas, incomplete objects, or markdown formatting.
-    
+
     Resume text:
     \"\"\"{resume_data}\"\"\"
     '''
 
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": "You are a helpful assistant that parses resumes into structured JSON data."},
-            {"role": "user", "content": prompt.format(resume_data=resume_data)}
-        ],
-        "temperature": 0.2
-    }
+SECTION_PROMPT = '''
+    You are an AI bot designed to act as a professional for parsing resumes. You are given one part of a resume and your job is to extract the following information from it:
+{fields}
+
+    Return a JSON object with exactly these keys. Use an empty list for a list field with no entries.
+    Only return valid JSON. Ensure all strings are properly closed and formatted. Do not include trailing commas, incomplete objects, or markdown formatting.
+
+    Resume section:
+    \"\"\"{resume_data}\"\"\"
+    '''
+
+LIST_FIELDS = ["skills", "experience", "education", "projects", "certifications", "awards"]
+
+# Bump when the parsing logic changes in a way the prompt text doesn't show
+PARSER_REVISION = 2
+
+# Part of the response cache key, so cached parses are retired whenever a
+# prompt template or the parser revision changes
+PROMPT_VERSION = cache_key(
+    str(PARSER_REVISION), PROMPT, SECTION_PROMPT, *(line for _, line in FIELD_PROMPTS)
+)[:12]
+
+parse_cache = ResponseCache(
+    "resume_parse",
+    ttl=settings.RESUME_PARSE_CACHE_TTL,
+    max_items=settings.RESUME_PARSE_CACHE_MAX_ITEMS,
+    max_rows=settings.RESUME_PARSE_CACHE_MAX_ROWS,
+)
+# Identical uploads that arrive while a parse is running wait for it
+parse_flight = SingleFlight("resume_parse", lock_ttl=settings.LLM_SINGLE_FLIGHT_LOCK_TTL)
+
+
+def _field_prompts(fields):
+    return "\n".join(line for field, line in FIELD_PROMPTS if field in fields)
+
+
+def _messages(prompt):
+    return [
+        {"role": "system", "content": "You are a helpful assistant that parses resumes into structured JSON data."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _request_json(prompt, route, batch=False):
+    messages = _messages(prompt)
+    return get_llm_client().chat_json(messages, **fit_to_context(route, messages)._asdict(), batch=batch)
+
+
+async def _arequest_json(prompt, route):
+    messages = _messages(prompt)
+    return await get_async_llm_client().chat_json(messages, **fit_to_context(route, messages)._asdict())
+
+
+def _in_schema_order(data):
+    """Order keys as in FIELD_PROMPTS, whichever source produced them."""
+    ordered = {field: data[field] for field, _ in FIELD_PROMPTS if field in data}
+    ordered.update((key, value) for key, value in data.items() if key not in ordered)
+    return ordered
+
+
+def _plan_sections(resume_data, wanted_fields):
+    """Group segmented resume text into concurrent extraction tasks.
+
+    Returns a list of (fields, text) pairs, or None when the resume is too
+    short or too unstructured to be worth splitting.
+    """
+    if count_tokens(resume_data) < settings.RESUME_SECTION_SPLIT_MIN_TOKENS:
+        return None
+
+    sections = segment_resume(resume_data)
+    found = [task for task, names in SECTION_TASKS.items() if any(name in sections for name in names)]
+    if len(found) < MIN_SPLIT_SECTIONS:
+        return None
+
+    tasks = []
+    split_fields = set()
+    for task in found:
+        names = SECTION_TASKS[task]
+        text = "\n\n".join(sections[name] for name in names if name in sections)
+        tasks.append((names, text))
+        split_fields.update(names)
+
+    profile_fields = [field for field in wanted_fields if field not in split_fields]
+    profile_text = "\n\n".join(
+        text for name, text in sections.items() if name not in split_fields
+    )
+    if profile_fields:
+        # The header is where name/contact details live, so always include it
+        if SECTION_HEADER not in sections:
+            profile_text = resume_data[:1000] + "\n\n" + profile_text
+        tasks.append((profile_fields, profile_text))
+    return tasks
+
+
+def _section_prompt(task):
+    fields, text = task
+    return build_prompt(
+        "resume_parse_section", SECTION_PROMPT, settings.LLM_PROMPT_TOKEN_BUDGET,
+        {"resume_data": Section(text)}, fields=_field_prompts(fields),
+    )
+
+
+def _merge_sections(tasks, results):
+    """Combine per-section results, or None if any section failed."""
+    merged = {}
+    for (fields, _), result in zip(tasks, results):
+        if not isinstance(result, dict) or "error" in result:
+            return None
+        if result.get(REPAIRED_FLAG):
+            merged[REPAIRED_FLAG] = True
+        for field in fields:
+            if field in result:
+                merged[field] = result[field]
+            elif field in LIST_FIELDS:
+                merged[field] = []
+    return merged
+
+
+def _extract_sections(tasks, route, batch=False):
+    """Run one completion per section concurrently and merge the results.
+
+    Wall-clock time is bounded by the slowest section rather than the sum.
+    Returns None if any section fails so the caller can fall back to a
+    single completion.
+    """
+    with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        results = list(pool.map(lambda task: _request_json(_section_prompt(task), route, batch), tasks))
+    return _merge_sections(tasks, results)
+
+
+async def _aextract_sections(tasks, route):
+    """Async variant of _extract_sections; sections run as concurrent coroutines."""
+    results = await asyncio.gather(*(_arequest_json(_section_prompt(task), route) for task in tasks))
+    return _merge_sections(tasks, results)
+
+
+def _plan(resume_data):
+    # Contact details found locally are merged in afterwards instead of
+    # being regenerated by the model as output tokens
+    local_fields = extract_contact_fields(resume_data)
+    wanted_fields = [field for field, _ in FIELD_PROMPTS if field not in local_fields]
+    return local_fields, wanted_fields, _plan_sections(resume_data, wanted_fields)
+
+
+def _full_prompt(resume_data, wanted_fields):
+    return build_prompt(
+        "resume_parse", PROMPT, settings.LLM_PROMPT_TOKEN_BUDGET,
+        {"resume_data": Section(resume_data)}, fields=_field_prompts(wanted_fields),
+    )
+
+
+def _with_local_fields(parsed_data, local_fields):
+    if isinstance(parsed_data, dict) and "error" not in parsed_data:
+        parsed_data = _in_schema_order({**parsed_data, **local_fields})
+    return parsed_data
+
+
+def parse_cache_key(resume_data, model=None):
+    """Cache key for a parse: model, prompt version and whitespace-normalized text."""
+    return cache_key(get_route("resume_parse", model).model, PROMPT_VERSION, " ".join(resume_data.split()))
+
+
+def invalidate_parse(resume_data, model=None):
+    """Forget the cached parse of ``resume_data`` so the next call re-parses it."""
+    parse_cache.invalidate(parse_cache_key(resume_data, model))
+
+
+def _parse(resume_data, model, batch=False):
+    route = get_route("resume_parse", model)
+    local_fields, wanted_fields, tasks = _plan(resume_data)
+    parsed_data = _extract_sections(tasks, route, batch) if tasks else None
+
+    if parsed_data is None:
+        parsed_data = _request_json(_full_prompt(resume_data, wanted_fields), route, batch)
 
-    try:
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
+    return _with_local_fields(parsed_data, local_fields)
 
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
 
-            # Try to isolate valid JSON block using regex
-            match = re.search(r"\{[\s\S]*\}", content)
-            if match:
-                json_string = clean_json_string(match.group())
+async def _aparse(resume_data, model):
+    route = get_route("resume_parse", model)
+    local_fields, wanted_fields, tasks = _plan(resume_data)
+    parsed_data = await _aextract_sections(tasks, route) if tasks else None
 
-                try:
-                    parsed_data = json.loads(json_string)
-                    return parsed_data
-                except json.JSONDecodeError as e:
-                    return {"error": "Failed to parse JSON after cleaning", "raw": json_string, "message": str(e)}
-            else:
-                return {"error": "No valid JSON object found", "raw": content}
+    if parsed_data is None:
+        parsed_data = await _arequest_json(_full_prompt(resume_data, wanted_fields), route)
 
-        else:
-            return {"error": f"API request failed with status code {response.status_code}", "message": response.text}
+    return _with_local_fields(parsed_data, local_fields)
 
-    except requests.exceptions.RequestException as e:
-        return {"error": "Request failed", "message": str(e)}
 
-    except json.JSONDecodeError:
-        return {"error": "Failed to parse JSON from response", "raw": response.text}
+def ats_extractor(resume_data, model=None, use_cache=True, batch=False):
+    """Parse resume text into the structured schema.
 
+    ``model`` overrides the model routed to the resume_parse task.
+    Successful parses are cached under parse_cache_key(); ``use_cache=False``
+    skips the lookup and refreshes the cached entry. Concurrent calls for
+    the same key share one parse, across workers too. ``batch`` calls
+    use the batch share of the LLM rate limit.
+    """
+    key = parse_cache_key(resume_data, model)
+    if use_cache:
+        cached = parse_cache.get(key)
+        if cached is not None:
+            return cached
+    else:
+        parse_cache.bypass()
 
+    def compute():
+        parsed_data = _parse(resume_data, model, batch)
+        parse_cache.set(key, parsed_data)
+        return strip_repaired_flag(parsed_data)
 
+    # Batch calls may queue for the batch share's capacity first
+    lock_ttl = settings.LLM_SINGLE_FLIGHT_LOCK_TTL + settings.LLM_RATE_LIMIT_BATCH_MAX_WAIT if batch else None
+    return parse_flight.do(key, compute, lambda: parse_cache.get(key), lock_ttl=lock_ttl)
 
 
+async def aats_extractor(resume_data, model=None, use_cache=True):
+    """ats_extractor for async callers; no thread is held while waiting on the API."""
+    key = parse_cache_key(resume_data, model)
+    if use_cache:
+        cached = await parse_cache.aget(key)
+        if cached is not None:
+            return cached
+    else:
+        parse_cache.bypass()
 
+    async def acompute():
+        parsed_data = await _aparse(resume_data, model)
+        await parse_cache.aset(key, parsed_data)
+        return strip_repaired_flag(parsed_data)
 
+    return await parse_flight.ado(key, acompute, lambda: parse_cache.aget(key))
@@ -0,0 +1,139 @@
+"""Upload -> resume text pipeline shared by the resume endpoints.
+
+Text is looked up in the content-addressed cache first; on a miss the
+extraction service pre-flights the PDF and extracts it with the configured
+page/token budget, and the result is compacted before it is cached. Cache
+keys combine the PDF digest with a fingerprint of the extraction settings,
+so changing them never serves text produced under the old ones.
+"""
+
+import functools
+import logging
+import tempfile
+
+from django.conf import settings
+
+from .utils import text_cache, text_compaction
+from .utils.extraction_service import get_extraction_service
+from .utils.pdf_extraction import PAGE_SEPARATOR, TEXT_MODE_BLOCKS
+from .utils.pdf_preflight import preflight_pdf
+from .utils.response_cache import cache_key
+from .utils.text_compaction import compact_pages
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction or compaction code changes the text it produces
+EXTRACTION_REVISION = 2
+
+
+def read_uploaded_pdf(uploaded_file, digest=None):
+    """Extract text from an uploaded PDF without a shared temp path.
+
+    ``digest`` is the upload's SHA-256 as computed by PDFUploadHandler while
+    the request streamed in, so a text cache hit never touches the file.
+    Without it the upload is hashed first. On a miss, an upload Django
+    already spooled to disk is parsed from its temp file; others up to
+    RESUME_UPLOAD_MAX_MEMORY_SIZE are parsed from memory, and larger ones
+    from a unique NamedTemporaryFile.
+    """
+    if digest is None:
+        hasher = text_cache.new_hasher()
+        for chunk in uploaded_file.chunks():
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+
+    return cached_extract(digest, lambda: _extract_upload(uploaded_file))
+
+
+def _extract_upload(uploaded_file):
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return _read_file_from_path(uploaded_file.temporary_file_path())
+
+    if uploaded_file.size <= settings.RESUME_UPLOAD_MAX_MEMORY_SIZE:
+        # One growing buffer rather than a chunk list plus its joined copy
+        buffer = bytearray()
+        for chunk in uploaded_file.chunks():
+            buffer += chunk
+        try:
+            return extract_resume_text(pdf_bytes=buffer)
+        finally:
+            del buffer[:]
+
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+        destination.flush()
+        return _read_file_from_path(destination.name)
+
+
+def read_pdf_bytes(pdf_bytes):
+    """Extract text from PDF bytes already in memory, using the text cache."""
+    digest = text_cache.new_hasher()
+    digest.update(pdf_bytes)
+    return cached_extract(digest.hexdigest(), lambda: extract_resume_text(pdf_bytes=pdf_bytes))
+
+
+def read_pdf_path(path):
+    """Extract text from a PDF on disk, hashing it in chunks for the text cache."""
+    hasher = text_cache.new_hasher()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            hasher.update(chunk)
+    return cached_extract(hasher.hexdigest(), lambda: _read_file_from_path(path))
+
+
+def cached_extract(digest, extract):
+    """Return cached text for ``digest``, running ``extract`` on a miss."""
+    key = cache_key(digest, extraction_fingerprint())
+    text = text_cache.get_text(key)
+    if text is None:
+        text = extract()
+        text_cache.set_text(key, text)
+    return text
+
+
+def extraction_fingerprint():
+    """Everything besides the PDF bytes that shapes the extracted text."""
+    budget = extraction_budget()
+    return cache_key(
+        str(EXTRACTION_REVISION), TEXT_MODE_BLOCKS, PAGE_SEPARATOR,
+        str(budget['page_limit']), str(budget['token_budget']),
+        str(settings.RESUME_TEXT_COMPACTION),
+    )
+
+
+def _read_file_from_path(path):
+    """Extract text from PDF file"""
+    
+    return extract_resume_text(path=path)
+
+
+def extract_resume_text(pdf_bytes=None, path=None):
+    """Extract resume pages off the request thread and compact them"""
+    # The worker pre-flights the file and raises PreflightError for a bad
+    # one; the page cap is the service's own PDF_EXTRACTION_MAX_PAGES.
+    preflight = functools.partial(
+        preflight_pdf, min_text_chars=settings.RESUME_PREFLIGHT_MIN_TEXT_CHARS
+    )
+    pages = get_extraction_service().extract(
+        pdf_bytes=pdf_bytes, path=path, text_mode=TEXT_MODE_BLOCKS, as_pages=True,
+        preflight=preflight, **extraction_budget()
+    )
+    if not settings.RESUME_TEXT_COMPACTION:
+        return PAGE_SEPARATOR.join(pages)
+
+    text, stats = compact_pages(pages)
+    text_compaction.record(stats)
+    logger.info(
+        "Compacted resume text: %d -> %d chars, ~%d tokens saved",
+        stats.chars_before, stats.chars_after, stats.tokens_saved,
+    )
+    return text
+
+
+def extraction_budget():
+    """Early cutoff so padded appendices are never parsed or sent to the LLM"""
+    return {
+        'page_limit': settings.RESUME_EXTRACT_PAGE_LIMIT,
+        'token_budget': settings.RESUME_EXTRACT_TOKEN_BUDGET,
+    }
@@ -1,3 +1,1132 @@
-from django.test import TestCase
+import asyncio
+import email.utils
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import fitz
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopUpload
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from . import batch_processing, generate_cover_letter, match_analyzer, resume_parser, resume_text, views
+from .models import LLMRequestLock, ResumeBatch, ResumeBatchItem
+from .upload_handlers import PDFUploadHandler
+from .llm_client import (
+    AsyncLLMClient, CircuitBreaker, LLMClient, LLMStreamError, RetryPolicy, _parse_retry_after, parse_json_content,
+)
+from .utils import text_cache
+from .utils.contact_extraction import extract_contact_fields
+from .utils.extraction_service import ExtractionBusy, ExtractionService, _run_extraction
+from .utils.json_repair import JSONRepairError, repair_json
+from .utils.model_routing import Route, fit_to_context, get_route, routing_table
+from .utils.pdf_extraction import TEXT_MODE_TEXT, LinkIndex, extract_clean_text
+from .utils.pdf_preflight import PreflightError, preflight_pdf
+from .utils.prompt_budget import count_tokens
+from .utils.rate_limiter import RateLimitTimeout, TokenBucketLimiter, estimate_tokens
+from .utils.response_cache import is_cacheable
+from .utils.section_segmenter import SECTION_HEADER, classify_heading, segment_resume
+from .utils.single_flight import SingleFlight
+from .utils.text_compaction import compact_pages
+
+
+class _Response:
+    def __init__(self, status_code=200, content="ok"):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = {"choices": [{"message": {"content": content}}], "usage": {"total_tokens": 10}}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+
+class _TimingOutLimiter:
+    def acquire(self, tokens, max_wait=None):
+        raise RateLimitTimeout("no capacity")
+
+    async def aacquire(self, tokens, max_wait=None):
+        raise RateLimitTimeout("no capacity")
+
+
+def _open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    return breaker
+
+
+class RetryPolicyTests(SimpleTestCase):
+    def test_backoff_grows_up_to_its_cap(self):
+        policy = RetryPolicy(backoff_base=0.5, backoff_max=4.0)
+        with mock.patch("random.uniform", side_effect=lambda low, high: high):
+            self.assertEqual([policy.delay(attempt) for attempt in range(1, 7)], [0.5, 1.0, 2.0, 4.0, 4.0, 4.0])
+
+    def test_retry_after_is_a_floor(self):
+        policy = RetryPolicy(backoff_base=0.5, backoff_max=4.0)
+        for attempt in range(1, 5):
+            delay = policy.delay(attempt, retry_after=10)
+            self.assertGreaterEqual(delay, 10)
+            self.assertLessEqual(delay, 14)
+
+    def test_stops_at_max_attempts_and_the_deadline(self):
+        policy = RetryPolicy(max_attempts=3, backoff_base=0.5)
+        deadline_at = time.monotonic() + 60
+        self.assertIsNotNone(policy.next_delay(2, deadline_at))
+        self.assertIsNone(policy.next_delay(3, deadline_at))
+        self.assertIsNone(policy.next_delay(1, deadline_at, retry_after=120))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(_parse_retry_after("2.5"), 2.5)
+        self.assertEqual(_parse_retry_after("-3"), 0.0)
+        self.assertIsNone(_parse_retry_after(None))
+        self.assertIsNone(_parse_retry_after("soon"))
+
+        retry_at = email.utils.format_datetime(timezone.now() + timedelta(seconds=30), usegmt=True)
+        self.assertAlmostEqual(_parse_retry_after(retry_at), 30, delta=2)
+        past = email.utils.format_datetime(timezone.now() - timedelta(seconds=30), usegmt=True)
+        self.assertEqual(_parse_retry_after(past), 0.0)
+
+    def test_client_retries_up_to_the_cap_honouring_retry_after(self):
+        busy = _Response(status_code=429)
+        busy.headers = {"Retry-After": "3"}
+        client = LLMClient(api_key="test", breaker=CircuitBreaker(), limiter=None,
+                           retry=RetryPolicy(max_attempts=3, backoff_base=0.5, deadline=60))
+        with mock.patch.object(client.session, "post", return_value=busy) as post, \
+                mock.patch("time.sleep") as sleep:
+            result = client.chat([{"role": "user", "content": "hi"}], "m")
+        self.assertEqual(result["code"], "rate_limited")
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertTrue(all(call.args[0] >= 3 for call in sleep.call_args_list))
+
+    def test_client_does_not_retry_client_errors(self):
+        client = LLMClient(api_key="test", breaker=CircuitBreaker(), limiter=None, retry=RetryPolicy(max_attempts=3))
+        with mock.patch.object(client.session, "post", return_value=_Response(status_code=400)) as post:
+            client.chat([{"role": "user", "content": "hi"}], "m")
+        self.assertEqual(post.call_count, 1)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_open_half_open_closed(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        with mock.patch("time.monotonic", return_value=100.0):
+            breaker.record_failure()
+            self.assertEqual(breaker.state()["state"], "open")
+            self.assertIsNone(breaker.allow())
+            self.assertEqual(breaker.retry_in(), 30)
+        with mock.patch("time.monotonic", return_value=130.0):
+            self.assertTrue(breaker.allow())
+            self.assertEqual(breaker.state()["state"], "half_open")
+            breaker.record_success()
+        self.assertEqual(breaker.state()["state"], "closed")
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        with mock.patch("time.monotonic", return_value=100.0):
+            for _ in range(3):
+                breaker.record_failure()
+        with mock.patch("time.monotonic", return_value=130.0):
+            self.assertTrue(breaker.allow())
+            # One failed trial is enough, whatever the threshold
+            breaker.record_failure()
+            self.assertEqual(breaker.state()["state"], "open")
+            self.assertIsNone(breaker.allow())
+            self.assertEqual(breaker.retry_in(), 30)
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state()["state"], "open")
+        self.assertIsNone(breaker.allow())
+
+    def test_only_one_trial_when_half_open(self):
+        breaker = _open_breaker()
+        trial = breaker.allow()
+        self.assertTrue(trial)
+        self.assertEqual(breaker.state()["state"], "half_open")
+        self.assertIsNone(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state()["state"], "closed")
+
+    def test_release_frees_trial_without_outcome(self):
+        breaker = _open_breaker()
+        trial = breaker.allow()
+        breaker.release(trial)
+        self.assertEqual(breaker.state()["state"], "open")
+        self.assertTrue(breaker.allow())
+
+    def test_release_of_other_call_keeps_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        closed_ticket = breaker.allow()
+        breaker.record_failure()
+        breaker.allow()
+        breaker.release(closed_ticket)
+        self.assertEqual(breaker.state()["state"], "half_open")
+
+    def test_trial_hitting_limiter_timeout_is_released(self):
+        breaker = _open_breaker()
+        client = LLMClient(api_key="test", breaker=breaker, retry=RetryPolicy(max_attempts=1),
+                           limiter=_TimingOutLimiter())
+        self.assertEqual(client.chat([{"role": "user", "content": "hi"}], "m")["code"], "rate_limited")
+        self.assertEqual(breaker.state()["state"], "open")
+
+        # The next call gets the trial and closes the circuit
+        client.limiter = None
+        with mock.patch.object(client.session, "post", return_value=_Response()):
+            self.assertEqual(client.chat([{"role": "user", "content": "hi"}], "m"), "ok")
+        self.assertEqual(breaker.state()["state"], "closed")
+
+    def test_async_trial_hitting_limiter_timeout_is_released(self):
+        breaker = _open_breaker()
+
+        async def call():
+            client = AsyncLLMClient(api_key="test", breaker=breaker, retry=RetryPolicy(max_attempts=1),
+                                    limiter=_TimingOutLimiter())
+            try:
+                return await client.chat([{"role": "user", "content": "hi"}], "m")
+            finally:
+                await client.aclose()
+
+        self.assertEqual(asyncio.run(call())["code"], "rate_limited")
+        self.assertEqual(breaker.state()["state"], "open")
+        self.assertTrue(breaker.allow())
+
+    def test_cancelled_trial_is_released(self):
+        breaker = _open_breaker()
+
+        async def call():
+            client = AsyncLLMClient(api_key="test", breaker=breaker)
+
+            async def hang(*args, **kwargs):
+                await asyncio.sleep(60)
+
+            with mock.patch.object(client.client, "post", hang):
+                task = asyncio.ensure_future(client.chat([{"role": "user", "content": "hi"}], "m"))
+                await asyncio.sleep(0.01)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+            await client.aclose()
+
+        asyncio.run(call())
+        self.assertEqual(breaker.state()["state"], "open")
+        self.assertTrue(breaker.allow())
+
+    def test_stream_trial_hitting_limiter_timeout_is_released(self):
+        breaker = _open_breaker()
+        client = LLMClient(api_key="test", breaker=breaker, limiter=_TimingOutLimiter())
+        with self.assertRaises(LLMStreamError):
+            list(client.stream_chat([{"role": "user", "content": "hi"}], "m"))
+        self.assertEqual(breaker.state()["state"], "open")
+        self.assertTrue(breaker.allow())
+
+
+class TokenBucketLimiterTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "buckets.sqlite3")
+
+    def _limiter(self, rpm=0, tpm=0, **kwargs):
+        return TokenBucketLimiter(self.path, requests_per_minute=rpm, tokens_per_minute=tpm, **kwargs)
+
+    def _available(self, limiter):
+        return limiter._refilled(limiter._connection(), time.time())
+
+    def test_requests_bucket_runs_out(self):
+        limiter = self._limiter(rpm=2)
+        limiter.acquire(10, max_wait=0)
+        limiter.acquire(10, max_wait=0)
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire(10, max_wait=0)
+        self.assertEqual(limiter.stats()["timeouts"], 1)
+
+    def test_settle_returns_unused_tokens(self):
+        limiter = self._limiter(tpm=1000)
+        limiter.acquire(600, max_wait=0)
+        limiter.settle(600, 100)
+        self.assertGreaterEqual(self._available(limiter)[1], 899)
+
+    def test_processes_share_buckets_through_the_file(self):
+        self._limiter(rpm=1).acquire(1, max_wait=0)
+        with self.assertRaises(RateLimitTimeout):
+            self._limiter(rpm=1).acquire(1, max_wait=0)
+
+    def test_batch_share_leaves_capacity_for_interactive_calls(self):
+        shared = self._limiter(rpm=4, name="shared")
+        batch = self._limiter(rpm=2, name="shared_batch", parent=shared)
+        batch.acquire(1, max_wait=0)
+        batch.acquire(1, max_wait=0)
+        with self.assertRaises(RateLimitTimeout):
+            batch.acquire(1, max_wait=0)
+        # Interactive callers still have the other half of the quota
+        shared.acquire(1, max_wait=0)
+        shared.acquire(1, max_wait=0)
+
+    def test_batch_share_is_refunded_when_shared_bucket_refuses(self):
+        shared = self._limiter(rpm=1, tpm=100, name="shared")
+        batch = self._limiter(rpm=2, tpm=100, name="shared_batch", parent=shared)
+        shared.acquire(50, max_wait=0)
+        with self.assertRaises(RateLimitTimeout):
+            batch.acquire(50, max_wait=0)
+        requests, tokens = self._available(batch)
+        self.assertGreater(requests, 1.99)
+        self.assertGreater(tokens, 99)
+
+    def test_batch_settle_reaches_shared_bucket(self):
+        shared = self._limiter(tpm=1000, name="shared")
+        batch = self._limiter(tpm=500, name="shared_batch", parent=shared)
+        batch.acquire(400, max_wait=0)
+        batch.settle(400, 0)
+        self.assertGreater(self._available(shared)[1], 999)
+        self.assertGreater(self._available(batch)[1], 499)
+
+    def test_batch_calls_use_batch_limiter(self):
+        calls = []
+
+        class Recorder:
+            def __init__(self, name):
+                self.name = name
+
+            def acquire(self, tokens, max_wait=None):
+                calls.append((self.name, max_wait))
+
+            def settle(self, estimated, actual):
+                pass
+
+        client = LLMClient(api_key="test", breaker=CircuitBreaker(),
+                           limiter=Recorder("shared"), batch_limiter=Recorder("batch"))
+        with mock.patch.object(client.session, "post", return_value=_Response()):
+            client.chat([{"role": "user", "content": "hi"}], "m")
+            client.chat([{"role": "user", "content": "hi"}], "m", batch=True)
+        self.assertEqual(calls[0][0], "shared")
+        self.assertIsNotNone(calls[0][1])
+        # Batch calls wait as long as the batch limiter allows
+        self.assertEqual(calls[1], ("batch", None))
+
+
+class TextCompactionTests(SimpleTestCase):
+    def test_rejoins_words_broken_across_lines(self):
+        text, stats = compact_pages(["Led the experi-\nence redesign"])
+        self.assertEqual(text, "Led the experience redesign")
+        self.assertEqual(stats.hyphenations_joined, 1)
+
+    def test_keeps_hyphen_of_wrapped_compounds(self):
+        text, stats = compact_pages(["Built state-\nof-the-art tooling and end-to-\nend tests"])
+        self.assertEqual(text, "Built state-of-the-art tooling and end-to-end tests")
+        self.assertEqual(stats.hyphenations_joined, 0)
+
+    def test_keeps_only_copy_of_mailto_address(self):
+        text, stats = compact_pages(["Email mailto:jane@example.com"])
+        self.assertEqual(text, "Email mailto:jane@example.com")
+        self.assertEqual(stats.urls_removed, 0)
+
+    def test_drops_link_whose_target_is_in_the_text(self):
+        text, stats = compact_pages(["jane@example.com mailto:jane@example.com\ngithub.com/jane https://github.com/jane/"])
+        self.assertEqual(text, "jane@example.com\ngithub.com/jane")
+        self.assertEqual(stats.urls_removed, 2)
+
+    def test_drops_repeated_urls(self):
+        text, _ = compact_pages(["Site https://x.io/a and again https://x.io/a"])
+        self.assertEqual(text, "Site https://x.io/a and again")
+
+    def test_removes_running_headers_and_page_numbers(self):
+        bodies = [
+            ["Experience", "Acme Corp", "Built the billing system", "Led four engineers", "Python, Go"],
+            ["Education", "State University", "BSc Computer Science", "Graduated 2015", "Honours"],
+            ["Projects", "Resume parser", "Open source tool", "Used by many people", "MIT licensed"],
+        ]
+        pages = [
+            "\n".join(["Jane Doe - Resume", *body, f"Page {n} of 3"])
+            for n, body in enumerate(bodies, start=1)
+        ]
+        text, stats = compact_pages(pages)
+        self.assertNotIn("Jane Doe - Resume", text)
+        self.assertNotIn("Page 2 of 3", text)
+        self.assertEqual(stats.repeated_lines_removed, 3)
+        self.assertEqual(stats.page_numbers_removed, 3)
+        self.assertIn("BSc Computer Science", text)
+
+
+    def test_keeps_date_ranges_at_page_edges(self):
+        pages = [
+            "Acme Corp\n2020 - 2023\nBuilt the billing system\nLed four engineers\nShipped v2\nPython\nJan 2019 - Dec 2019",
+            "Initech\n2016 - 2020\nMaintained reports\nMentored interns\nWrote docs\nSQL\nJan 2015 - Dec 2015",
+        ]
+        text, stats = compact_pages(pages)
+        for dates in ("2020 - 2023", "2016 - 2020", "Jan 2019 - Dec 2019", "Jan 2015 - Dec 2015"):
+            self.assertIn(dates, text)
+        self.assertEqual(stats.repeated_lines_removed, 0)
+
+    def test_removes_running_footer_with_page_counter(self):
+        pages = [
+            "Experience\nAcme Corp\nBuilt things\nLed people\nShipped\nPython\nJane Doe - 1",
+            "Education\nState University\nBSc\nHonours\nThesis\nGraduated\nJane Doe - 2",
+        ]
+        text, stats = compact_pages(pages)
+        self.assertNotIn("Jane Doe", text)
+        self.assertEqual(stats.repeated_lines_removed, 2)
+
+class JSONRepairTests(SimpleTestCase):
+    def test_valid_json_is_not_repaired(self):
+        self.assertEqual(repair_json('{"a": 1}'), ({"a": 1}, False))
+
+    def test_code_fence_is_not_a_repair(self):
+        self.assertEqual(repair_json('```json\n{"a": 1}\n```'), ({"a": 1}, False))
+
+    def test_prose_around_object(self):
+        self.assertEqual(repair_json('Here you go: {"a": 1} Hope it helps'), ({"a": 1}, True))
+
+    def test_trailing_and_missing_commas(self):
+        self.assertEqual(repair_json('{"a": [1, 2,], "b": 3 "c": 4,}'), ({"a": [1, 2], "b": 3, "c": 4}, True))
+
+    def test_truncated_object_is_closed(self):
+        self.assertEqual(repair_json('{"skills": ["Py'), ({"skills": ["Py"]}, True))
+        self.assertEqual(repair_json('{"a": 1, "b": tr'), ({"a": 1, "b": True}, True))
+        self.assertEqual(repair_json('{"a": 1, "b":'), ({"a": 1}, True))
+
+    def test_raw_newlines_in_strings(self):
+        self.assertEqual(repair_json('{"a": "line one\nline two",}'), ({"a": "line one\nline two"}, True))
+
+    def test_skips_stray_brace_in_prose(self):
+        self.assertEqual(repair_json('Fill the {placeholders} in: {"a": 1}'), ({"a": 1}, True))
+        self.assertEqual(repair_json('Empty {} first, then {"a": 1}'), ({"a": 1}, True))
+
+    def test_does_not_fall_into_nested_object_of_broken_json(self):
+        with self.assertRaises(JSONRepairError):
+            repair_json('{"experience": [{"title": "x"}], oops}')
+
+    def test_no_object(self):
+        with self.assertRaises(JSONRepairError):
+            repair_json("no json here")
+        with self.assertRaises(JSONRepairError):
+            repair_json('{"unterminated')
+
+    def test_empty_object(self):
+        self.assertEqual(repair_json("{}"), ({}, False))
+
+    def test_repaired_results_are_flagged_and_not_cacheable(self):
+        clean = parse_json_content('{"a": 1}')
+        repaired = parse_json_content('{"a": [1')
+        self.assertEqual(clean, {"a": 1})
+        self.assertEqual(repaired, {"a": [1], "repaired": True})
+        self.assertTrue(is_cacheable(clean))
+        self.assertFalse(is_cacheable(repaired))
+        self.assertFalse(is_cacheable(parse_json_content("nothing")))
+
+
+class ParseCacheTests(TestCase):
+    def setUp(self):
+        # The in-process LRU outlives each test's transaction
+        resume_parser.parse_cache.clear()
+
+    def _parse_with(self, result):
+        client = mock.Mock()
+        client.chat_json.side_effect = lambda *args, **kwargs: dict(result)
+        with mock.patch.object(resume_parser, "get_llm_client", return_value=client):
+            for _ in range(2):
+                parsed = resume_parser.ats_extractor("Jane Doe\nSkills: Python")
+        return parsed, client.chat_json.call_count
+
+    def test_clean_parse_is_cached(self):
+        parsed, calls = self._parse_with({"skills": ["Python"]})
+        self.assertEqual(parsed["skills"], ["Python"])
+        self.assertEqual(calls, 1)
+
+    def test_repaired_parse_is_returned_but_not_cached(self):
+        parsed, calls = self._parse_with({"skills": ["Py"], "repaired": True})
+        self.assertEqual(parsed["skills"], ["Py"])
+        self.assertNotIn("repaired", parsed)
+        self.assertEqual(calls, 2)
+
+    def test_repaired_match_is_returned_without_its_flag(self):
+        client = mock.Mock(chat_json=mock.Mock(return_value={"overallMatch": 80, "repaired": True}))
+        match_analyzer.match_cache.clear()
+        with mock.patch.object(match_analyzer, "get_llm_client", return_value=client):
+            result = match_analyzer.match_analyzer({"skills": ["Python"]}, "Python developer")
+        self.assertEqual(result["overallMatch"], 80)
+        self.assertNotIn("repaired", result)
+        self.assertEqual(match_analyzer.match_cache.get(
+            match_analyzer.match_cache_key({"skills": ["Python"]}, "Python developer")
+        ), None)
+
+
+class MatchCacheKeyTests(SimpleTestCase):
+    resume = {"name": "Jane Doe", "skills": ["Python", "Go"], "experience": [{"company": "Acme"}]}
+
+    def test_stable_across_key_order(self):
+        reordered = {"experience": [{"company": "Acme"}], "skills": ["Python", "Go"], "name": "Jane Doe"}
+        self.assertEqual(
+            match_analyzer.match_cache_key(self.resume, "Python developer"),
+            match_analyzer.match_cache_key(reordered, "Python developer"),
+        )
+
+    def test_stable_across_job_description_whitespace(self):
+        self.assertEqual(
+            match_analyzer.match_cache_key(self.resume, "Python  developer\n\nRemote "),
+            match_analyzer.match_cache_key(self.resume, " Python developer Remote"),
+        )
+
+    def test_differs_by_content_and_model(self):
+        key = match_analyzer.match_cache_key(self.resume, "Python developer")
+        self.assertNotEqual(key, match_analyzer.match_cache_key(self.resume, "Go developer"))
+        self.assertNotEqual(key, match_analyzer.match_cache_key({**self.resume, "skills": ["Go"]}, "Python developer"))
+        self.assertNotEqual(
+            match_analyzer.match_cache_key(self.resume, "Python developer", model="llama-3.1-8b-instant"),
+            match_analyzer.match_cache_key(self.resume, "Python developer", model="llama-3.3-70b-versatile"),
+        )
+
+
+class SingleFlightLockTests(TestCase):
+    def test_leader_releases_its_lock(self):
+        flight = SingleFlight("test")
+        self.assertEqual(flight.do("key", lambda: 1, lambda: None), 1)
+        self.assertFalse(LLMRequestLock.objects.exists())
+
+    def test_expired_leader_keeps_its_successors_lock(self):
+        flight = SingleFlight("test")
+        first = flight._try_lock("key", 60)
+        LLMRequestLock.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        second = flight._try_lock("key", 60)
+        self.assertIsNotNone(second)
+
+        flight._unlock("key", first)
+        self.assertTrue(flight._is_locked("key"))
+        flight._unlock("key", second)
+        self.assertFalse(flight._is_locked("key"))
+
+
+class BatchRecoveryTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name, RESUME_BATCH_ORPHAN_AFTER=60)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = get_user_model().objects.create_user("batch@example.com", "pw", name="Batch")
+
+    def _batch(self, age):
+        batch = ResumeBatch.objects.create(user=self.user, status=ResumeBatch.STATUS_RUNNING)
+        directory = batch_processing._batch_dir(batch.id)
+        os.makedirs(directory)
+        path = os.path.join(directory, "0000.pdf")
+        open(path, "wb").close()
+        ResumeBatchItem.objects.create(batch=batch, original_filename="cv.pdf", file_path=path)
+        then = timezone.now() - timedelta(seconds=age)
+        ResumeBatch.objects.filter(id=batch.id).update(updated_at=then)
+        ResumeBatchItem.objects.filter(batch=batch).update(updated_at=then)
+        return batch, directory
+
+    def test_stale_batch_is_failed_and_cleaned(self):
+        batch, directory = self._batch(age=600)
+        self.assertEqual(batch_processing.recover_orphaned_batches(), 1)
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, ResumeBatch.STATUS_FAILED)
+        self.assertEqual(batch.items.get().status, ResumeBatchItem.STATUS_FAILED)
+        self.assertFalse(os.path.exists(directory))
+
+    def test_active_batch_is_left_running(self):
+        batch, directory = self._batch(age=5)
+        self.assertEqual(batch_processing.recover_orphaned_batches(), 0)
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, ResumeBatch.STATUS_RUNNING)
+        self.assertTrue(os.path.exists(directory))
+
+    def test_batch_waiting_for_slots_is_left_running(self):
+        # No item has moved for a while, but the runner is still alive
+        batch, directory = self._batch(age=600)
+        ResumeBatch.objects.filter(id=batch.id).update(heartbeat_at=timezone.now())
+        self.assertEqual(batch_processing.recover_orphaned_batches(), 0)
+        self.assertTrue(os.path.exists(directory))
+
+    def test_stale_heartbeat_is_failed(self):
+        batch, directory = self._batch(age=600)
+        ResumeBatch.objects.filter(id=batch.id).update(heartbeat_at=timezone.now() - timedelta(seconds=600))
+        ResumeBatchItem.objects.filter(batch=batch).update(updated_at=timezone.now())
+        self.assertEqual(batch_processing.recover_orphaned_batches(), 1)
+        self.assertFalse(os.path.exists(directory))
+
+    @override_settings(RESUME_BATCH_HEARTBEAT_INTERVAL=0.01)
+    def test_runner_heartbeats_while_waiting_for_a_slot(self):
+        batch, _ = self._batch(age=600)
+        slots = threading.Semaphore(0)
+        release = threading.Timer(0.1, slots.release)
+        release.start()
+        self.addCleanup(release.cancel)
+        batch_processing._acquire_slot(slots, batch.id)
+        batch.refresh_from_db()
+        self.assertGreater(batch.heartbeat_at, timezone.now() - timedelta(seconds=5))
+
+    def test_user_slots_are_dropped_with_the_last_batch(self):
+        first = batch_processing._acquire_user_slots(self.user.id)
+        self.assertIs(batch_processing._acquire_user_slots(self.user.id), first)
+        batch_processing._release_user_slots(self.user.id)
+        self.assertIn(self.user.id, batch_processing._user_slots)
+        batch_processing._release_user_slots(self.user.id)
+        self.assertNotIn(self.user.id, batch_processing._user_slots)
+
+
+class TextCacheTests(TestCase):
+    def setUp(self):
+        text_cache._memory.clear()
+
+    def _extract(self, digest="a" * 64):
+        extract = mock.Mock(return_value="resume text")
+        resume_text.cached_extract(digest, extract)
+        return extract.call_count
+
+    def test_same_settings_hit(self):
+        self.assertEqual(self._extract(), 1)
+        self.assertEqual(self._extract(), 0)
+
+    def test_changed_settings_miss(self):
+        self._extract()
+        with override_settings(RESUME_EXTRACT_PAGE_LIMIT=3):
+            self.assertEqual(self._extract(), 1)
+        with override_settings(RESUME_TEXT_COMPACTION=False):
+            self.assertEqual(self._extract(), 1)
+        with mock.patch.object(resume_text, "EXTRACTION_REVISION", 99):
+            self.assertEqual(self._extract(), 1)
+
+
+def _pdf(pages):
+    doc = fitz.open()
+    for number in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page {number + 1} of the resume with enough text on it")
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+def _linked_pdf():
+    """One page: a GitHub line with a link over it, then a plain line below."""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "GitHub profile")
+    page.insert_text((72, 200), "Machine learning engineer")
+    page.insert_link({"kind": fitz.LINK_URI, "from": fitz.Rect(70, 60, 200, 76), "uri": "https://github.com/jane"})
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+class PDFExtractionTests(SimpleTestCase):
+    def test_link_stays_on_its_block_line(self):
+        text = extract_clean_text(_linked_pdf())
+        self.assertIn("GitHub profile https://github.com/jane\n", text)
+        self.assertIn("Machine learning engineer", text)
+        self.assertEqual(text.count("https://github.com/jane"), 1)
+
+    def test_text_mode_appends_page_links(self):
+        text = extract_clean_text(_linked_pdf(), text_mode=TEXT_MODE_TEXT)
+        self.assertTrue(text.rstrip().endswith("https://github.com/jane"))
+
+    def test_link_index_matches_overlapping_rects_in_page_order(self):
+        index = LinkIndex([
+            {"from": fitz.Rect(0, 100, 50, 110), "uri": "b"},
+            {"from": fitz.Rect(0, 0, 50, 10), "uri": "a"},
+            {"from": fitz.Rect(0, 100, 50, 400), "uri": "tall"},
+            {"from": fitz.Rect(0, 0, 50, 10)},
+        ])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.uris_for(fitz.Rect(0, 105, 50, 108)), ["b", "tall"])
+        self.assertEqual(index.uris_for(fitz.Rect(0, 300, 50, 310)), ["tall"])
+        self.assertEqual(index.uris_for(fitz.Rect(0, 500, 50, 510)), [])
+
+    def test_index_matches_a_linear_scan_on_link_heavy_pages(self):
+        from .management.commands.bench_extraction import _synthetic_pdf, _unindexed_extract_clean_text
+
+        data = _synthetic_pdf(60)
+        text = extract_clean_text(data)
+        self.assertEqual(text, _unindexed_extract_clean_text(data))
+        self.assertEqual(text.count("https://example.com/project/"), 60)
+
+    def test_budgets_stop_extraction_early(self):
+        data = _pdf(5)
+        self.assertEqual(extract_clean_text(data, page_limit=2).count("Page "), 2)
+        self.assertLessEqual(len(extract_clean_text(data, char_budget=20)), 20)
+
+
+class ExtractionServiceTests(SimpleTestCase):
+    def test_preflight_error_crosses_the_worker(self):
+        service = ExtractionService(max_workers=1, timeout=60)
+        self.addCleanup(service.shutdown)
+        with self.assertRaises(PreflightError) as caught:
+            service.extract(pdf_bytes=b"not a pdf", preflight=functools.partial(preflight_pdf))
+        self.assertEqual(caught.exception.code, "not_pdf")
+
+    def test_recovers_from_a_crashed_worker(self):
+        service = ExtractionService(max_workers=1, timeout=60)
+        self.addCleanup(service.shutdown)
+        self.assertIn("Page 1", service.extract(pdf_bytes=_pdf(1)))
+
+        # What a MuPDF segfault or an OOM kill leaves behind
+        for process in list(service._executor._processes.values()):
+            process.kill()
+            process.join()
+
+        self.assertIn("Page 1", service.extract(pdf_bytes=_pdf(1)))
+        self.assertIn("Page 2", service.extract(pdf_bytes=_pdf(2)))
+
+    def test_repeated_pool_failures_become_busy(self):
+        service = ExtractionService(max_workers=1, timeout=60)
+        self.addCleanup(service.shutdown)
+        broken = mock.Mock()
+        broken.result.side_effect = BrokenProcessPool("worker died")
+        with mock.patch.object(service, "submit", return_value=broken), \
+                mock.patch.object(service, "_retire_executor") as retire:
+            with self.assertRaises(ExtractionBusy):
+                service.extract(pdf_bytes=_pdf(1))
+        self.assertEqual(retire.call_count, 2)
+
+    def test_tracemalloc_is_stopped_after_each_job(self):
+        _, usage = _run_extraction(_pdf(2), None, "blocks", 0, track_memory=True)
+        self.assertGreater(usage["peak_traced_bytes"], 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_inline_jobs_are_never_traced(self):
+        service = ExtractionService(max_workers=0, track_memory=True)
+        service.extract(pdf_bytes=_pdf(1))
+        self.assertIsNone(service.memory_stats()["last"]["peak_traced_bytes"])
+
+    @override_settings(RESUME_EXTRACT_PAGE_LIMIT=10, RESUME_TEXT_COMPACTION=False)
+    def test_long_cv_is_truncated_not_rejected(self):
+        service = ExtractionService(max_workers=0, max_pages=200)
+        with mock.patch.object(resume_text, "get_extraction_service", return_value=service):
+            text = resume_text.extract_resume_text(pdf_bytes=_pdf(40))
+        self.assertIn("Page 10 ", text)
+        self.assertNotIn("Page 11 ", text)
+
+
+class ExtractionBusyViewTests(SimpleTestCase):
+    def _post(self, view):
+        request = APIRequestFactory().post(
+            "/api/resume/process/",
+            {"pdf_doc": SimpleUploadedFile("cv.pdf", _pdf(1), content_type="application/pdf")},
+            format="multipart",
+        )
+        force_authenticate(request, user=mock.Mock(is_authenticated=True))
+        busy = ExtractionBusy("PDF extraction queue is full")
+        with mock.patch.object(views, "read_uploaded_pdf", side_effect=busy):
+            return view(request)
+
+    def _assert_busy(self, response):
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "30")
+
+    @override_settings(PDF_EXTRACTION_TIMEOUT=30)
+    def test_sync_view(self):
+        self._assert_busy(self._post(views.process_resume))
+
+    @override_settings(PDF_EXTRACTION_TIMEOUT=30)
+    def test_async_view(self):
+        self._assert_busy(self._post(async_to_sync(views.process_resume_async)))
+
+
+class PDFUploadTests(SimpleTestCase):
+    def _post(self, data, name="cv.pdf"):
+        request = APIRequestFactory().post(
+            "/api/resume/process/",
+            {"pdf_doc": SimpleUploadedFile(name, data, content_type="application/pdf")},
+            format="multipart",
+        )
+        force_authenticate(request, user=mock.Mock(is_authenticated=True))
+        return views.process_resume(request)
+
+    def test_rejects_wrong_magic(self):
+        with mock.patch.object(resume_text, "cached_extract") as extract:
+            response = self._post(b"PK\x03\x04 not a pdf at all")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["code"], "not_pdf")
+        extract.assert_not_called()
+
+    @override_settings(RESUME_UPLOAD_MAX_SIZE=1024)
+    def test_rejects_oversized_stream(self):
+        with mock.patch.object(resume_text, "cached_extract") as extract:
+            response = self._post(b"%PDF-1.7\n" + b"0" * 4096)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.data["code"], "too_large")
+        extract.assert_not_called()
+
+    def test_rejects_declared_size_before_any_data(self):
+        request = mock.Mock()
+        handler = PDFUploadHandler(request, max_size=1024)
+        with self.assertRaises(StopUpload):
+            handler.new_file("pdf_doc", "cv.pdf", "application/pdf", 4096)
+        self.assertEqual(request.pdf_upload_error.code, "too_large")
+        self.assertFalse(handler.active)
+
+    def test_ignores_other_fields(self):
+        handler = PDFUploadHandler(mock.Mock(), max_size=1024)
+        handler.new_file("notes", "notes.txt", "text/plain", 4096)
+        self.assertEqual(handler.receive_data_chunk(b"x" * 4096, 0), b"x" * 4096)
+
+    def test_hands_the_streamed_digest_to_the_text_cache(self):
+        data = _pdf(1)
+        failed = {"error": "Request failed", "code": "upstream_error"}
+        with mock.patch.object(resume_text, "cached_extract", return_value="Jane Doe") as extract, \
+                mock.patch.object(views, "ats_extractor", return_value=failed) as parse, \
+                mock.patch.object(text_cache, "new_hasher", wraps=text_cache.new_hasher) as hashers:
+            self._post(data)
+        self.assertEqual(extract.call_args.args[0], hashlib.sha256(data).hexdigest())
+        # Hashed once, while streaming; the view does not read the file again
+        self.assertEqual(hashers.call_count, 1)
+        parse.assert_called_once_with("Jane Doe", use_cache=True)
+
+
+class UploadSpoolTests(SimpleTestCase):
+    def _extract(self, data):
+        request = APIRequestFactory().post(
+            "/api/resume/process/",
+            {"pdf_doc": SimpleUploadedFile("cv.pdf", data, content_type="application/pdf")},
+            format="multipart",
+        )
+        force_authenticate(request, user=mock.Mock(is_authenticated=True))
+        failed = {"error": "Request failed", "code": "upstream_error"}
+        calls = []
+
+        def extract_resume_text(pdf_bytes=None, path=None):
+            # The in-memory buffer is wiped once extraction returns
+            calls.append({"pdf_bytes": pdf_bytes and bytes(pdf_bytes), "path": path})
+            return "Jane Doe"
+
+        with mock.patch.object(resume_text, "cached_extract", lambda digest, extract: extract()), \
+                mock.patch.object(resume_text, "extract_resume_text", extract_resume_text), \
+                mock.patch.object(views, "ats_extractor", return_value=failed):
+            views.process_resume(request)
+        self.assertEqual(len(calls), 1)
+        return calls[0]
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=512)
+    def test_spooled_upload_is_read_from_its_temp_file(self):
+        # Even when it would fit under RESUME_UPLOAD_MAX_MEMORY_SIZE
+        data = _pdf(1)
+        self.assertGreater(len(data), 512)
+        kwargs = self._extract(data)
+        self.assertIsNone(kwargs["pdf_bytes"])
+        self.assertTrue(kwargs["path"].endswith(".upload.pdf"))
+
+    def test_small_upload_is_read_from_memory(self):
+        data = _pdf(1)
+        kwargs = self._extract(data)
+        self.assertEqual(kwargs["pdf_bytes"], data)
+        self.assertIsNone(kwargs["path"])
+
+
+class _DenyThrottle:
+    def allow_request(self, request, view):
+        return False
+
+    def wait(self):
+        return 12.5
+
+
+class AsyncViewTests(SimpleTestCase):
+    def _post_match(self):
+        request = APIRequestFactory().post(
+            "/api/resume/match/", {"resume_data": "Python", "job_description": "Python"}, format="json"
+        )
+        force_authenticate(request, user=mock.Mock(is_authenticated=True, id=1))
+        return async_to_sync(views.match_analysis_async)(request)
+
+    @override_settings(REST_FRAMEWORK={"DEFAULT_THROTTLE_CLASSES": ["resume_api.tests._DenyThrottle"]})
+    def test_default_throttles_apply(self):
+        with mock.patch.object(views, "amatch_analyzer") as analyzer:
+            response = self._post_match()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "13")
+        analyzer.assert_not_called()
+
+
+class CoverLetterBudgetTests(SimpleTestCase):
+    def _prompt(self, instructions):
+        messages = generate_cover_letter._cover_letter_messages(
+            {"skills": ["Python"] * 400}, "Build APIs. " * 2000, "Acme", "Engineer", instructions
+        )
+        return messages[1]["content"]
+
+    @override_settings(LLM_PROMPT_TOKEN_BUDGET=1500)
+    def test_instructions_survive_a_long_job_description(self):
+        instructions = "Mention my open source work and keep it formal. " * 20
+        self.assertIn(instructions.strip(), self._prompt(instructions))
+
+    @override_settings(LLM_PROMPT_TOKEN_BUDGET=1500)
+    def test_oversized_instructions_are_cut_to_their_floor(self):
+        instructions = "Mention my open source work and keep it formal. " * 400
+        self.assertNotIn(instructions.strip(), self._prompt(instructions))
+
+
+_SECTIONED_RESUME = (
+    "Jane Doe\njane@example.com\n"
+    "SUMMARY\nBackend engineer.\n"
+    "Work Experience\nAcme 2019 - 2021\nBuilt the billing API.\n"
+    "EDUCATION\nBSc Computer Science, 2019\n"
+    "Skills\nPython, Go\n"
+    "Projects\nParser: a resume parser.\n"
+    "Key Projects\nLinter: a config linter.\n"
+)
+
+
+class ModelRoutingTests(SimpleTestCase):
+    def test_tasks_resolve_to_their_tier(self):
+        route = get_route("resume_parse")
+        self.assertEqual(route._asdict(), settings.LLM_TIERS["extract"])
+        self.assertEqual(get_route("interview_question").model, settings.LLM_TIERS["fast"]["model"])
+
+    def test_model_override_keeps_the_tier_options(self):
+        route = get_route("cover_letter", model="other-model")
+        self.assertEqual(route.model, "other-model")
+        self.assertEqual(route.max_tokens, settings.LLM_TIERS["generate"]["max_tokens"])
+
+    def test_misconfigured_routes_fail_loudly(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_route("unknown_task")
+        with override_settings(LLM_ROUTES={"resume_parse": "huge"}):
+            with self.assertRaises(ImproperlyConfigured):
+                get_route("resume_parse")
+
+    def test_routing_table_lists_every_task(self):
+        table = routing_table()
+        self.assertEqual(set(table), set(settings.LLM_ROUTES))
+        self.assertEqual(table["match_analysis"]["tier"], "extract")
+
+    @override_settings(LLM_CONTEXT_TOKENS=8192)
+    def test_completion_cap_fits_the_context_left_by_the_prompt(self):
+        route = Route("m", 4000, 0.1, 60)
+        short = [{"role": "user", "content": "Parse this."}]
+        self.assertEqual(fit_to_context(route, short).max_tokens, 4000)
+        long = [{"role": "user", "content": "word " * 6000}]
+        fitted = fit_to_context(route, long)
+        self.assertLess(fitted.max_tokens, 4000)
+        self.assertEqual(estimate_tokens(long, fitted.max_tokens), 8192)
+
+    def test_unsplit_resume_gets_room_for_its_json(self):
+        # Just under the split threshold, so parsed by a single completion
+        text = "Built and ran payment services in Python. " * 290
+        tokens = count_tokens(text)
+        self.assertLess(tokens, settings.RESUME_SECTION_SPLIT_MIN_TOKENS)
+        client = mock.Mock(chat_json=mock.Mock(return_value={"name": "Jane Doe"}))
+        with mock.patch.object(resume_parser, "get_llm_client", return_value=client):
+            resume_parser._parse(text, None)
+        self.assertEqual(client.chat_json.call_count, 1)
+        messages, options = client.chat_json.call_args.args[0], client.chat_json.call_args.kwargs
+        self.assertGreaterEqual(options["max_tokens"], tokens * 4 // 3)
+        self.assertLessEqual(estimate_tokens(messages, options["max_tokens"]), settings.LLM_CONTEXT_TOKENS)
+
+
+class SectionSegmenterTests(SimpleTestCase):
+    def test_classifies_headings(self):
+        self.assertEqual(classify_heading("Work Experience"), "experience")
+        self.assertEqual(classify_heading("SKILLS & TOOLS:"), "skills")
+        self.assertEqual(classify_heading("RELEVANT COURSEWORK AND CERTIFICATIONS"), "certifications")
+        self.assertEqual(classify_heading("Projects https://github.com/janedoe"), "projects")
+
+    def test_ignores_body_lines(self):
+        self.assertIsNone(classify_heading("experience"))
+        self.assertIsNone(classify_heading("Improved transferable skills."))
+        self.assertIsNone(classify_heading("Led the education platform rewrite for schools"))
+
+    def test_segments_in_order_and_joins_repeated_sections(self):
+        sections = segment_resume(_SECTIONED_RESUME)
+        self.assertEqual(
+            list(sections),
+            [SECTION_HEADER, "summary", "experience", "education", "skills", "projects"],
+        )
+        self.assertEqual(sections[SECTION_HEADER], "Jane Doe\njane@example.com")
+        self.assertEqual(sections["projects"], "Parser: a resume parser.\n\nLinter: a config linter.")
+
+
+class PlanSectionsTests(SimpleTestCase):
+    fields = ["name", "summary", "skills", "experience", "education", "projects"]
+
+    @override_settings(RESUME_SECTION_SPLIT_MIN_TOKENS=10)
+    def test_splits_long_resumes_by_section(self):
+        tasks = resume_parser._plan_sections(_SECTIONED_RESUME, self.fields)
+        self.assertEqual([fields for fields, _ in tasks], [
+            ["experience"], ["education"], ["projects"], ["name", "summary", "skills"],
+        ])
+        self.assertEqual(tasks[0][1], "Acme 2019 - 2021\nBuilt the billing API.")
+        profile_text = tasks[-1][1]
+        self.assertIn("Jane Doe", profile_text)
+        self.assertIn("Python, Go", profile_text)
+        self.assertNotIn("Acme", profile_text)
+
+    @override_settings(RESUME_SECTION_SPLIT_MIN_TOKENS=10)
+    def test_profile_falls_back_to_the_start_without_a_header(self):
+        text = _SECTIONED_RESUME.split("SUMMARY\n", 1)[1]
+        tasks = resume_parser._plan_sections("SUMMARY\n" + text, self.fields)
+        self.assertTrue(tasks[-1][1].startswith("SUMMARY\nBackend engineer."))
+
+    @override_settings(RESUME_SECTION_SPLIT_MIN_TOKENS=10)
+    def test_keeps_resumes_with_one_split_section_whole(self):
+        text = "Jane Doe\nWork Experience\nAcme 2019 - 2021\nSkills\nPython, Go\n" * 3
+        self.assertIsNone(resume_parser._plan_sections(text, self.fields))
+
+    def test_keeps_a_two_page_resume_whole(self):
+        # About two dense pages: one completion beats a fan-out of four
+        text = _SECTIONED_RESUME + "Built and ran services for a payments team.\n" * 120
+        self.assertGreater(len(text), 5000)
+        self.assertIsNone(resume_parser._plan_sections(text, self.fields))
+
+
+_LETTER_CHUNKS = ["Sure! Here is", " your cover letter:\n\nDe", "ar Hiring", " Manager,\nI build APIs.", "\nBest, Jane"]
+_LETTER = "Dear Hiring Manager,\nI build APIs.\nBest, Jane"
+
+
+def _sse_frames(chunks):
+    frames = []
+    for chunk in chunks:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        event, data = chunk.strip().split("\n")
+        frames.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return frames
+
+
+class CoverLetterStreamTests(SimpleTestCase):
+    def test_strips_a_preamble_split_across_chunks(self):
+        client = mock.Mock(stream_chat=mock.Mock(return_value=iter(_LETTER_CHUNKS)))
+        with mock.patch.object(generate_cover_letter, "get_llm_client", return_value=client):
+            pieces = list(generate_cover_letter.stream_cover_letter(
+                job_description="APIs", company_name="Acme", job_title="Engineer"
+            ))
+        self.assertEqual("".join(pieces), _LETTER)
+        self.assertTrue(pieces[0].startswith("Dear Hiring"))
+
+    def test_short_letter_is_released_at_the_end(self):
+        stripper = generate_cover_letter.PreambleStripper()
+        self.assertEqual(stripper.feed("Here is your letter:\n"), "")
+        self.assertEqual(stripper.feed("Hello"), "")
+        self.assertEqual(stripper.finish(), "Hello")
+        self.assertEqual(stripper.finish(), "")
+
+    def _post(self):
+        request = APIRequestFactory().post(
+            "/api/resume/cover-letter/",
+            {"job_description": "APIs", "company_name": "Acme", "job_title": "Engineer", "stream": True},
+            format="json",
+        )
+        force_authenticate(request, user=mock.Mock(is_authenticated=True, id=1))
+        return request
+
+    def _stream(self, pieces):
+        with mock.patch.object(views, "stream_cover_letter", return_value=iter(pieces)), \
+                mock.patch.object(views.User.objects, "filter") as users:
+            response = views.cover_letter_generator_custom(self._post())
+            frames = _sse_frames(response.streaming_content) if response.streaming else None
+        return response, frames, users.return_value.update
+
+    def _astream(self, pieces):
+        async def astream(**kwargs):
+            for piece in pieces:
+                if isinstance(piece, Exception):
+                    raise piece
+                yield piece
+
+        async def run():
+            response = await views.cover_letter_generator_async(self._post())
+            if not response.streaming:
+                return response, None
+            return response, _sse_frames([chunk async for chunk in response.streaming_content])
+
+        with mock.patch.object(views, "astream_cover_letter", astream), \
+                mock.patch.object(views.User.objects, "filter") as users:
+            users.return_value.aupdate = mock.AsyncMock()
+            response, frames = async_to_sync(run)()
+        return response, frames, users.return_value.aupdate
+
+    def _failing(self, *pieces):
+        def pieces_then_error():
+            yield from pieces
+            raise LLMStreamError({"error": "Request timed out", "message": "read timeout", "code": "timeout"})
+        return pieces_then_error()
+
+    def test_sends_deltas_then_done(self):
+        response, frames, update = self._stream(["Dear team,", "\nI build APIs."])
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(frames, [
+            ("delta", {"text": "Dear team,"}),
+            ("delta", {"text": "\nI build APIs."}),
+            ("done", {"cover_letter": "Dear team,\nI build APIs."}),
+        ])
+        update.assert_called_once()
+
+    def test_error_midway_sends_an_error_frame_and_is_not_counted(self):
+        response, frames, update = self._stream(self._failing("Dear team,"))
+        self.assertEqual(frames, [
+            ("delta", {"text": "Dear team,"}),
+            ("error", {"error": "Request timed out", "message": "read timeout", "code": "timeout"}),
+        ])
+        update.assert_not_called()
+
+    def test_error_before_any_text_is_a_plain_error_response(self):
+        response, frames, update = self._stream(self._failing())
+        self.assertIsNone(frames)
+        self.assertEqual(response.status_code, views._llm_status({"error": "x", "code": "timeout"}))
+        update.assert_not_called()
+
+    def test_async_sends_deltas_then_done(self):
+        response, frames, update = self._astream(["Dear team,", "\nI build APIs."])
+        self.assertEqual([event for event, _ in frames], ["delta", "delta", "done"])
+        self.assertEqual(frames[-1][1], {"cover_letter": "Dear team,\nI build APIs."})
+        update.assert_awaited_once()
+
+    def test_async_error_midway_is_not_counted(self):
+        error = LLMStreamError({"error": "Request timed out", "message": "read timeout", "code": "timeout"})
+        response, frames, update = self._astream(["Dear team,", error])
+        self.assertEqual([event for event, _ in frames], ["delta", "error"])
+        update.assert_not_awaited()
+
+
+class ContactExtractionTests(SimpleTestCase):
+    def test_header_fields(self):
+        fields = extract_contact_fields(
+            "Jane Doe\njane.doe@example.com | +1 (415) 555-0100\n"
+            "https://www.linkedin.com/in/jane-doe/ | github.com/janedoe | janedoe.dev\n"
+            "Experience\nAcme 2019-2021"
+        )
+        self.assertEqual(fields, {
+            "name": "Jane Doe",
+            "email": "jane.doe@example.com",
+            "phone": "+1 (415) 555-0100",
+            "linkedin": "https://www.linkedin.com/in/jane-doe",
+            "github": "https://github.com/janedoe",
+            "portfolio": "https://janedoe.dev",
+        })
+
+    def test_labelled_linkedin_handle(self):
+        fields = extract_contact_fields("Jane Doe\nLinkedIn: in/jane-doe")
+        self.assertEqual(fields["linkedin"], "https://www.linkedin.com/in/jane-doe")
+
+    def test_in_slash_in_body_text_is_not_linkedin(self):
+        fields = extract_contact_fields("Jane Doe\nRebuilt the hotel check-in/checkout flow")
+        self.assertNotIn("linkedin", fields)
+
+    def test_job_title_headline_is_not_a_name(self):
+        self.assertNotIn("name", extract_contact_fields("Software Engineer\njane@example.com"))
+        self.assertNotIn("name", extract_contact_fields("Senior Data Analyst\njane@example.com"))
+
+    def test_github_repository_is_not_the_profile(self):
+        fields = extract_contact_fields("Jane Doe\nProject: github.com/janedoe/parser")
+        self.assertNotIn("github", fields)
+
+    def test_year_range_is_not_a_phone(self):
+        self.assertNotIn("phone", extract_contact_fields("Jane Doe\nAcme Corp 2019 - 2021"))
@@ -0,0 +1,91 @@
+"""Streaming validation for single-resume uploads.
+
+PDFUploadHandler sits in front of Django's default upload handlers for the
+``pdf_doc`` field. It checks the PDF magic bytes in the first chunk,
+enforces RESUME_UPLOAD_MAX_SIZE and hashes the data as it streams past, so
+a bad upload is aborted before the rest of the body is read and the view
+gets the text-cache key without another pass over the file.
+"""
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from rest_framework.parsers import MultiPartParser
+
+from .utils import text_cache
+from .utils.pdf_preflight import HEADER_WINDOW, PDF_MAGIC
+
+
+class UploadRejected(Exception):
+    """Why an upload was aborted. ``code`` is "not_pdf" or "too_large"."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class PDFUploadHandler(FileUploadHandler):
+    """Validate and hash the ``pdf_doc`` upload while it is received.
+
+    Data is passed through unchanged to the next handler. On completion the
+    SHA-256 hex digest is stored as ``request.pdf_upload_sha256``; on
+    rejection the UploadRejected is stored as ``request.pdf_upload_error``
+    and the rest of the request body is left unread.
+    """
+
+    field = 'pdf_doc'
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size if max_size is not None else settings.RESUME_UPLOAD_MAX_SIZE
+        self.active = False
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name == self.field
+        if not self.active:
+            return
+
+        self.hasher = text_cache.new_hasher()
+        self.received = 0
+        # content_length is client supplied and usually absent; when it is
+        # present an oversized upload can be refused before any data arrives
+        if self.content_length and self.content_length > self.max_size:
+            self._reject('too_large', self._too_large_message())
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        if start == 0 and PDF_MAGIC not in raw_data[:HEADER_WINDOW]:
+            self._reject('not_pdf', "File must be a PDF")
+
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self._reject('too_large', self._too_large_message())
+
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.active:
+            self.request.pdf_upload_sha256 = self.hasher.hexdigest()
+            self.active = False
+        # Let the next handler build the UploadedFile
+        return None
+
+    def _too_large_message(self):
+        return f"File is larger than the {self.max_size // 1024} KB upload limit"
+
+    def _reject(self, code, message):
+        self.active = False
+        self.request.pdf_upload_error = UploadRejected(code, message)
+        raise StopUpload(connection_reset=True)
+
+
+class PDFUploadParser(MultiPartParser):
+    """MultiPartParser that streams ``pdf_doc`` through PDFUploadHandler."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request.upload_handlers.insert(0, PDFUploadHandler(request._request))
+        return super().parse(stream, media_type, parser_context)
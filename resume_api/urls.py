@@ -1,20 +1,35 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Async views keep a worker free while the LLM call is in flight under
+# ASGI; RESUME_ASYNC_VIEWS=false routes to the DRF sync views instead.
+if settings.RESUME_ASYNC_VIEWS:
+    process_resume = views.process_resume_async
+    match_analysis = views.match_analysis_async
+    cover_letter_generator = views.cover_letter_generator_async
+else:
+    process_resume = views.process_resume
+    match_analysis = views.match_analysis
+    cover_letter_generator = views.cover_letter_generator_custom
+
 
 urlpatterns = [
     path('', views.index, name='index'),
-    path('process/', views.process_resume, name='process_resume'),
-    path('match/', views.match_analysis, name='match_analysis'),
+    path('process/', process_resume, name='process_resume'),
+    path('process/batch/', views.process_resume_batch, name='process_resume_batch'),
+    path('batch/<uuid:batch_id>/', views.resume_batch_status, name='resume_batch_status'),
+    path('match/', match_analysis, name='match_analysis'),
     path('save/', views.save_resume, name='save_resume'),
     path('latest/', views.get_latest_resume, name='latest_resume'),
     path('history/', views.get_resume_history, name='resume_history'),
-    path('cover-letter/', views.cover_letter_generator_custom, name='cover_letter_generator_custom'),
+    path('cover-letter/', cover_letter_generator, name='cover_letter_generator_custom'),
     # Add cover-letters endpoints to match frontend expectations
-    path('cover-letters/generate/', views.cover_letter_generator_custom, name='cover_letter_generate'),
-    path('cover-letters/regenerate/', views.cover_letter_generator_custom, name='cover_letter_regenerate'),
+    path('cover-letters/generate/', cover_letter_generator, name='cover_letter_generate'),
+    path('cover-letters/regenerate/', cover_letter_generator, name='cover_letter_regenerate'),
     path('cover-letters/history/', views.get_cover_letter_history, name='cover_letter_history'),
     path('user-stats/', views.user_stats, name='user_stats'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
    
 ]
 
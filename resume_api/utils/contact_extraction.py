@@ -0,0 +1,129 @@
+"""Deterministic extraction of resume contact fields.
+
+Contact details are the most regular part of a resume, and the extracted
+text already carries the PDF's link annotations (mailto:, LinkedIn, GitHub
+URIs are appended to the block they sit on). Pulling them out with regexes
+lets ats_extractor drop them from the prompt, so the LLM no longer spends
+output tokens regenerating them.
+"""
+
+import re
+
+CONTACT_FIELDS = ("name", "email", "phone", "linkedin", "github", "portfolio")
+
+# Name and portfolio heuristics only look at the top of the resume
+HEADER_LINES = 8
+
+_EMAIL = re.compile(r"(?<![\w.+-])[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}")
+_PHONE = re.compile(r"(?<![\w+])\+?\(?\d[\d ().-]{7,18}\d(?!\w)")
+# A profile URL, or "in/<handle>" right after a LinkedIn label; a bare
+# "in/<word>" in body text ("check-in/checkout") is not a profile
+_LINKEDIN = re.compile(
+    r"(?:(?:https?://)?(?:[\w-]+\.)?linkedin\.com/|\blinkedin\s*[:\-|]?\s*)in/([\w%-]{3,100})/?",
+    re.IGNORECASE,
+)
+_GITHUB = re.compile(
+    r"(?:https?://)?(?:www\.)?github\.com/([A-Za-z\d](?:[A-Za-z\d-]{0,38}))(/[^\s]*)?",
+    re.IGNORECASE,
+)
+_URL = re.compile(r"(?:https?://)?(?:www\.)?(?:[\w-]+\.)+[a-z]{2,}(?:/[^\s|,]*)?", re.IGNORECASE)
+_PORTFOLIO_LABEL = re.compile(r"\b(?:portfolio|website|personal site|web)\s*[:\-|]\s*(\S+)", re.IGNORECASE)
+_PORTFOLIO_HOSTS = re.compile(r"\.(?:vercel\.app|netlify\.app|github\.io|pages\.dev|dev|me|site|tech)(?:/|$)", re.IGNORECASE)
+_NAME = re.compile(r"^[A-Z][A-Za-z'’.-]+(?: [A-Z][A-Za-z'’.-]+){1,3}$")
+# Words that make a title-case first line a headline ("Software Engineer")
+# rather than a name; such resumes leave the name to the LLM
+_TITLE_WORDS = re.compile(
+    r"\b(?:resume|curriculum|vitae|cv|engineer(?:ing)?|developer|programmer|architect|manager|director|"
+    r"lead|head|officer|designer|analyst|scientist|consultant|specialist|intern|associate|assistant|"
+    r"administrator|coordinator|technician|accountant|executive|president|founder|student|graduate|"
+    r"senior|junior|principal|software|data|product|project|marketing|sales|full[- ]stack|frontend|"
+    r"backend|devops|cloud|web|mobile|teacher|nurse|professional|profile|summary)\b",
+    re.IGNORECASE,
+)
+_NOT_PROFILE = {"orgs", "topics", "features", "about", "pricing", "marketplace", "sponsors"}
+
+
+def _with_scheme(url):
+    return url if re.match(r"https?://", url, re.IGNORECASE) else f"https://{url}"
+
+
+def _find_email(text):
+    match = _EMAIL.search(text)
+    return match.group().rstrip(".") if match else None
+
+
+def _find_phone(text):
+    for match in _PHONE.finditer(text):
+        candidate = match.group().strip()
+        digits = re.sub(r"\D", "", candidate)
+        # Skip date ranges like 2019-2021 and other short number runs
+        if 10 <= len(digits) <= 15 and not re.fullmatch(r"(?:19|20)\d\d\s*[-–]\s*(?:19|20)\d\d", candidate):
+            return candidate
+    return None
+
+
+def _find_linkedin(text):
+    match = _LINKEDIN.search(text)
+    if not match:
+        return None
+    return f"https://www.linkedin.com/in/{match.group(1)}"
+
+
+def _find_github(text):
+    for match in _GITHUB.finditer(text):
+        user, rest = match.group(1), (match.group(2) or "").strip("/")
+        # Repository links belong to projects, not the profile field
+        if not rest and user.lower() not in _NOT_PROFILE:
+            return f"https://github.com/{user}"
+    return None
+
+
+def _find_portfolio(lines):
+    for line in lines:
+        labeled = _PORTFOLIO_LABEL.search(line)
+        if labeled and _URL.fullmatch(labeled.group(1).rstrip("/.,")):
+            return _with_scheme(labeled.group(1).rstrip(".,"))
+
+    for line in lines:
+        for match in _URL.finditer(line):
+            url = match.group()
+            if "@" in line[max(match.start() - 1, 0):match.start()]:
+                continue
+            if re.search(r"linkedin\.com|github\.com", url, re.IGNORECASE):
+                continue
+            if _PORTFOLIO_HOSTS.search(url):
+                return _with_scheme(url.rstrip(".,"))
+    return None
+
+
+def _find_name(lines):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if _NAME.match(line) and not _TITLE_WORDS.search(line):
+            return line
+        # The name is the first thing on a resume; don't guess past a
+        # first line that clearly isn't one
+        return None
+    return None
+
+
+def extract_contact_fields(text):
+    """Return the contact fields that could be found locally.
+
+    Only fields with a confident match are included; anything missing is
+    left for the LLM to extract.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    header = lines[:HEADER_LINES]
+
+    found = {
+        "name": _find_name(header),
+        "email": _find_email(text),
+        "phone": _find_phone("\n".join(header)),
+        "linkedin": _find_linkedin(text),
+        "github": _find_github(text),
+        "portfolio": _find_portfolio(header),
+    }
+    return {field: value for field, value in found.items() if value}
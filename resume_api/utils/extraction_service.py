@@ -0,0 +1,346 @@
+"""Out-of-process PDF text extraction.
+
+PyMuPDF holds the GIL while it parses, so a pathological PDF parsed inline
+stalls the whole request worker. ExtractionService runs extraction in a
+bounded pool of spawned processes instead, with a wall-clock limit per job,
+a page-count limit enforced inside the worker, and worker recycling after a
+fixed number of jobs so leaked MuPDF memory is returned to the OS.
+
+Every job closes its document and empties MuPDF's resource store before it
+returns, oversized documents are rejected before they are sent to a worker,
+and worker RSS is sampled page by page against a memory ceiling. The peak
+memory of each job is recorded so long-running workers can be watched for
+growth.
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import resource
+import threading
+import tracemalloc
+from concurrent.futures import BrokenExecutor, CancelledError, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import fitz  # PyMuPDF
+
+from .pdf_extraction import PAGE_SEPARATOR, TEXT_MODE_BLOCKS, _char_budget, _iter_document_pages
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionError(Exception):
+    """Base class for extraction service failures."""
+
+
+class ExtractionBusy(ExtractionError):
+    """Raised when the pool queue is full for longer than the job timeout."""
+
+
+class ExtractionTimeout(ExtractionError):
+    """Raised when a job exceeds its wall-clock limit."""
+
+
+class PageLimitExceeded(ExtractionError):
+    """Raised when a document has more pages than the configured limit."""
+
+
+class DocumentTooLarge(ExtractionError):
+    """Raised when a document is larger than the configured byte limit."""
+
+
+class MemoryLimitExceeded(ExtractionError):
+    """Raised when a worker's RSS passes the memory ceiling mid-job."""
+
+
+def _rss_bytes():
+    """Current resident set size of this process, or None if unknown."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _MemoryMeter:
+    """Samples RSS during a job and enforces the memory ceiling."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.peak = None
+
+    def sample(self):
+        rss = _rss_bytes()
+        if rss is None:
+            return
+        self.peak = rss if self.peak is None else max(self.peak, rss)
+        if self.limit and rss > self.limit:
+            raise MemoryLimitExceeded(
+                f"PDF extraction used {rss // (1024 * 1024)} MB; the limit is {self.limit // (1024 * 1024)} MB"
+            )
+
+
+def _run_extraction(pdf_bytes, path, text_mode, max_pages, page_limit=None, char_budget=None,
+                    as_pages=False, memory_limit=0, track_memory=False, preflight=None):
+    """Worker entry point. Must stay importable without Django settings.
+
+    ``preflight`` is an optional picklable ``preflight(pdf_bytes=, path=)``
+    callable run before extraction, so validation happens off the caller's
+    thread too. Returns ``(result, usage)``. ``usage`` holds the page
+    count, the peak RSS sampled after every page and, with
+    ``track_memory``, the tracemalloc peak of the job's Python allocations.
+    tracemalloc runs for this job only; it slows every allocation, so it is
+    stopped again before the worker picks up the next job.
+    """
+    traced = track_memory and not tracemalloc.is_tracing()
+    if traced:
+        tracemalloc.start()
+    try:
+        result, usage = _extract_document(
+            pdf_bytes, path, text_mode, max_pages, page_limit, char_budget, as_pages, memory_limit, preflight
+        )
+        usage["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1] if traced else None
+        return result, usage
+    finally:
+        if traced:
+            tracemalloc.stop()
+
+
+def _extract_document(pdf_bytes, path, text_mode, max_pages, page_limit, char_budget, as_pages,
+                      memory_limit, preflight):
+    meter = _MemoryMeter(memory_limit)
+    if preflight is not None:
+        preflight(pdf_bytes=pdf_bytes, path=path)
+    if path is not None:
+        doc = fitz.open(path, filetype="pdf")
+    else:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+    pages = []
+    try:
+        meter.sample()
+        if max_pages and doc.page_count > max_pages:
+            raise PageLimitExceeded(
+                f"PDF has {doc.page_count} pages; the limit is {max_pages}"
+            )
+        for text in _iter_document_pages(doc, text_mode, page_limit, char_budget):
+            pages.append(text)
+            meter.sample()
+    finally:
+        doc.close()
+        # MuPDF keeps decoded fonts and images in a process-wide store that
+        # outlives the document; empty it so the next job starts flat.
+        fitz.TOOLS.store_shrink(100)
+
+    usage = {"pages": len(pages), "peak_rss_bytes": meter.peak}
+    return (pages if as_pages else PAGE_SEPARATOR.join(pages)), usage
+
+
+class ExtractionService:
+    """Bounded process pool for extract_clean_text.
+
+    ``max_workers=0`` runs jobs inline on the calling thread, which keeps
+    local development and management commands free of subprocesses.
+    """
+
+    def __init__(self, max_workers, max_pending=0, timeout=30.0, max_pages=0, max_tasks_per_child=100,
+                 max_bytes=0, memory_limit=0, track_memory=False):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.max_tasks_per_child = max_tasks_per_child
+        self.max_bytes = max_bytes
+        self.memory_limit = memory_limit
+        self.track_memory = track_memory
+
+        self._slots = threading.BoundedSemaphore(max(1, max_workers + max_pending))
+        self._lock = threading.Lock()
+        self._executor = None
+        self._usage = {"jobs": 0, "peak_rss_bytes": None, "peak_traced_bytes": None, "last": None}
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # max_tasks_per_child is not supported with the fork start method
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=self.max_tasks_per_child or None,
+                )
+            return self._executor
+
+    def _reset_executor(self, executor):
+        """Tear down a pool whose worker is stuck past its deadline."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+
+        # ProcessPoolExecutor cannot cancel a running job, so the only way to
+        # reclaim a stuck worker is to terminate the pool's processes.
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _retire_executor(self, executor):
+        """Replace a pool whose workers grew too large, letting running jobs finish."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False)
+
+    def _job_args(self, pdf_bytes, path, text_mode, page_limit, char_budget, token_budget, as_pages,
+                  preflight):
+        if (pdf_bytes is None) == (path is None):
+            raise ValueError("Pass exactly one of pdf_bytes or path")
+
+        size = len(pdf_bytes) if path is None else os.path.getsize(path)
+        if self.max_bytes and size > self.max_bytes:
+            raise DocumentTooLarge(
+                f"PDF is {size // 1024} KB; the limit is {self.max_bytes // 1024} KB"
+            )
+
+        return (
+            pdf_bytes, path, text_mode, self.max_pages, page_limit,
+            _char_budget(char_budget, token_budget), as_pages,
+            # Never trace the web process itself when jobs run inline
+            self.memory_limit, self.track_memory and self.max_workers > 0, preflight,
+        )
+
+    def _finish(self, outcome):
+        result, usage = outcome
+        with self._lock:
+            self._usage["jobs"] += 1
+            self._usage["last"] = usage
+            for key in ("peak_rss_bytes", "peak_traced_bytes"):
+                if usage[key] is not None:
+                    self._usage[key] = max(self._usage[key] or 0, usage[key])
+        logger.debug(
+            "PDF extraction: %d pages, peak RSS %s bytes, peak traced %s bytes",
+            usage["pages"], usage["peak_rss_bytes"], usage["peak_traced_bytes"],
+        )
+        return result
+
+    def memory_stats(self):
+        """Job count and the largest per-job memory peaks seen so far."""
+        with self._lock:
+            return dict(self._usage)
+
+    def submit(self, pdf_bytes=None, path=None, text_mode=TEXT_MODE_BLOCKS,
+               page_limit=None, char_budget=None, token_budget=None, as_pages=False,
+               preflight=None):
+        """Queue an extraction and return a concurrent.futures.Future.
+
+        Exactly one of ``pdf_bytes`` or ``path`` must be given. Extraction
+        stops early at ``page_limit`` pages or the character/token budget.
+        With ``as_pages`` the result is a list of page texts instead of one
+        joined string. ``preflight`` validates the document in the worker
+        first (see _run_extraction). The future resolves to a
+        ``(result, usage)`` pair. Raises DocumentTooLarge before queueing a
+        document over the byte limit. Blocks while the queue is full and
+        raises ExtractionBusy if no slot frees up within the job timeout.
+        A pool broken by a crashed worker is replaced before submitting.
+        """
+        args = self._job_args(
+            pdf_bytes, path, text_mode, page_limit, char_budget, token_budget, as_pages, preflight
+        )
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ExtractionBusy("PDF extraction queue is full")
+
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(_run_extraction, *args)
+            except BrokenExecutor:
+                # A worker died (segfault, OOM kill) since the last job
+                self._retire_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(_run_extraction, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        future.executor = executor
+        return future
+
+    def extract(self, pdf_bytes=None, path=None, text_mode=TEXT_MODE_BLOCKS,
+                page_limit=None, char_budget=None, token_budget=None, as_pages=False,
+                preflight=None):
+        """Extract text, blocking the caller until the job finishes.
+
+        A job lost to a crashed worker, or cancelled when another job's
+        timeout recycled the pool, is retried once on a fresh pool; if that
+        fails too, ExtractionBusy is raised.
+        """
+        if not self.max_workers:
+            args = self._job_args(
+                pdf_bytes, path, text_mode, page_limit, char_budget, token_budget, as_pages, preflight
+            )
+            return self._finish(_run_extraction(*args))
+
+        for _ in range(2):
+            future = self.submit(
+                pdf_bytes=pdf_bytes, path=path, text_mode=text_mode,
+                page_limit=page_limit, char_budget=char_budget, token_budget=token_budget,
+                as_pages=as_pages, preflight=preflight,
+            )
+            try:
+                return self._finish(future.result(timeout=self.timeout))
+            except FutureTimeoutError:
+                self._on_timeout(future)
+            except MemoryLimitExceeded:
+                self._on_memory_limit(future)
+                raise
+            except (BrokenExecutor, CancelledError):
+                logger.warning("PDF extraction worker pool broke mid-job; retrying on a fresh pool")
+                self._retire_executor(future.executor)
+        raise ExtractionBusy("PDF extraction workers keep failing")
+
+    def _on_timeout(self, future):
+        logger.warning("PDF extraction exceeded %.1fs; recycling worker pool", self.timeout)
+        if not future.cancel():
+            self._reset_executor(future.executor)
+        raise ExtractionTimeout(f"PDF extraction took longer than {self.timeout:.0f}s")
+
+    def _on_memory_limit(self, future):
+        logger.warning(
+            "PDF extraction passed the %d MB memory limit; recycling worker pool",
+            self.memory_limit // (1024 * 1024),
+        )
+        self._retire_executor(future.executor)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_extraction_service():
+    """Return the process-wide ExtractionService configured from settings."""
+    global _service
+    if _service is None:
+        from django.conf import settings
+
+        with _service_lock:
+            if _service is None:
+                _service = ExtractionService(
+                    max_workers=settings.PDF_EXTRACTION_WORKERS,
+                    max_pending=settings.PDF_EXTRACTION_MAX_PENDING,
+                    timeout=settings.PDF_EXTRACTION_TIMEOUT,
+                    max_pages=settings.PDF_EXTRACTION_MAX_PAGES,
+                    max_tasks_per_child=settings.PDF_EXTRACTION_MAX_TASKS_PER_CHILD,
+                    max_bytes=settings.PDF_EXTRACTION_MAX_BYTES,
+                    memory_limit=settings.PDF_EXTRACTION_MEMORY_LIMIT,
+                    track_memory=settings.PDF_EXTRACTION_TRACK_MEMORY,
+                )
+                atexit.register(_service.shutdown)
+    return _service
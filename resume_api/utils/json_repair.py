@@ -0,0 +1,247 @@
+"""Single-pass tolerant JSON parser for LLM completions.
+
+Models asked for JSON still wrap it in prose or code fences, leave trailing
+commas, or stop mid-object when they hit max_tokens. repair_json() parses
+the first JSON object in a completion in one left-to-right pass and fixes
+those on the way:
+
+- text before the object and after its closing brace is ignored
+- trailing commas and missing commas between members are tolerated
+- raw newlines and tabs inside strings are accepted
+- at end of input an unterminated string, number or literal is completed,
+  open arrays and objects are closed, and a key left without a value is
+  dropped
+
+Valid JSON takes the C decoder's fast path. A ``{`` in the prose that
+doesn't open a usable object is skipped in favour of the next one.
+repair_json() also reports whether anything had to be repaired, so callers
+can tell clean output from salvaged output, which may be missing whatever
+came after a truncation.
+"""
+
+import json
+import re
+
+_decoder = json.JSONDecoder()
+
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_STRING_RUN = re.compile(r'[^"\\]+')
+_NUMBER = re.compile(r"[-+0-9.eE]+")
+_WORD = re.compile(r"[A-Za-z]+")
+_WHITESPACE = re.compile(r"\s*")
+# Markdown fences around the JSON aren't worth reporting as a repair
+_FENCE = re.compile(r"^\s*(?:```(?:json)?)?\s*$", re.IGNORECASE)
+
+# Key the LLM client sets on objects that had to be salvaged; such results
+# are never cached, and the flag is stripped before they reach API clients
+# (repairs are counted in the LLM client's JSON stats instead)
+REPAIRED_FLAG = "repaired"
+
+
+def strip_repaired_flag(value):
+    """``value`` without REPAIRED_FLAG, once the cache has seen it."""
+    if isinstance(value, dict) and REPAIRED_FLAG in value:
+        return {key: item for key, item in value.items() if key != REPAIRED_FLAG}
+    return value
+
+
+class JSONRepairError(ValueError):
+    """The completion holds no JSON object that can be salvaged."""
+
+
+class _EndOfInput(Exception):
+    """Input ended where a value was expected."""
+
+
+class _StrayBrace(JSONRepairError):
+    """The ``{`` doesn't open an object: no key could be read after it."""
+
+
+def _parse_at(text, start):
+    """``(value, repaired)`` for the object opening at ``start``."""
+    try:
+        value, end = _decoder.raw_decode(text, start)
+    except ValueError:
+        parser = _Parser(text, start)
+        try:
+            return parser.object(), True
+        except JSONRepairError as e:
+            if parser.keys:
+                raise
+            raise _StrayBrace(str(e)) from None
+    repaired = not (_FENCE.match(text[:start]) and _FENCE.match(text[end:]))
+    return value, repaired
+
+
+def repair_json(text):
+    """Parse the first usable JSON object in ``text``; return ``(value, repaired)``.
+
+    Raises JSONRepairError when there is no object or none can be salvaged.
+    """
+    start = text.find("{")
+    if start < 0:
+        raise JSONRepairError("No JSON object found")
+
+    error = empty = None
+    while start >= 0:
+        try:
+            value, repaired = _parse_at(text, start)
+        except _StrayBrace as e:
+            error = error or e
+        else:
+            if value:
+                # Anything skipped before the object is a repair too
+                return value, repaired or error is not None or empty is not None
+            empty = empty or (value, repaired)
+        start = text.find("{", start + 1)
+
+    if empty is not None and not empty[1]:
+        # A completion that is exactly "{}"
+        return empty
+    raise error or JSONRepairError("Nothing could be salvaged from the JSON object")
+
+
+class _Parser:
+    def __init__(self, text, pos):
+        self.text = text
+        self.pos = pos
+        # Keys read so far; an object that had some was real JSON, not a stray brace
+        self.keys = 0
+
+    def _peek(self):
+        self.pos = _WHITESPACE.match(self.text, self.pos).end()
+        return self.text[self.pos] if self.pos < len(self.text) else ""
+
+    def _error(self, message):
+        return JSONRepairError(f"{message} at position {self.pos}")
+
+    def value(self):
+        ch = self._peek()
+        if not ch:
+            raise _EndOfInput
+        if ch == "{":
+            return self.object()
+        if ch == "[":
+            return self.array()
+        if ch == '"':
+            return self.string()[0]
+        if ch in "-0123456789":
+            return self.number()
+        return self.literal()
+
+    def object(self):
+        self.pos += 1
+        result = {}
+        while True:
+            ch = self._peek()
+            if not ch:
+                return result
+            if ch == "}":
+                self.pos += 1
+                return result
+            if ch == ",":
+                self.pos += 1
+                continue
+            if ch != '"':
+                raise self._error("Expected a key")
+
+            key, complete = self.string()
+            if not complete:
+                return result
+            self.keys += 1
+            ch = self._peek()
+            if not ch:
+                return result
+            if ch != ":":
+                raise self._error("Expected ':'")
+            self.pos += 1
+            try:
+                result[key] = self.value()
+            except _EndOfInput:
+                return result
+
+    def array(self):
+        self.pos += 1
+        items = []
+        while True:
+            ch = self._peek()
+            if not ch:
+                return items
+            if ch == "]":
+                self.pos += 1
+                return items
+            if ch == ",":
+                self.pos += 1
+                continue
+            try:
+                items.append(self.value())
+            except _EndOfInput:
+                return items
+
+    def string(self):
+        """Return ``(text, complete)``; an unterminated string runs to the end."""
+        text = self.text
+        self.pos += 1
+        chunks = []
+        while self.pos < len(text):
+            run = _STRING_RUN.match(text, self.pos)
+            if run:
+                chunks.append(run.group())
+                self.pos = run.end()
+                continue
+            if text[self.pos] == '"':
+                self.pos += 1
+                return _join_string(chunks), True
+
+            escape = text[self.pos + 1:self.pos + 2]
+            if escape == "u":
+                digits = text[self.pos + 2:self.pos + 6]
+                if len(digits) < 4:
+                    break
+                try:
+                    chunks.append(chr(int(digits, 16)))
+                except ValueError:
+                    chunks.append(digits)
+                self.pos += 6
+            elif escape:
+                chunks.append(_ESCAPES.get(escape, escape))
+                self.pos += 2
+            else:
+                break
+        self.pos = len(text)
+        return _join_string(chunks), False
+
+    def number(self):
+        token = _NUMBER.match(self.text, self.pos).group()
+        self.pos += len(token)
+        # A number cut off mid-way ("1.", "2e") loses its incomplete tail
+        while token:
+            try:
+                return json.loads(token)
+            except ValueError:
+                token = token[:-1]
+        raise self._error("Invalid number")
+
+    def literal(self):
+        match = _WORD.match(self.text, self.pos)
+        if not match:
+            raise self._error(f"Unexpected {self.text[self.pos]!r}")
+        word = match.group()
+        self.pos = match.end()
+        if word in _LITERALS:
+            return _LITERALS[word]
+        if self.pos == len(self.text):
+            for literal in ("true", "false", "null"):
+                if literal.startswith(word):
+                    return _LITERALS[literal]
+        raise self._error(f"Unexpected {word!r}")
+
+
+def _join_string(chunks):
+    value = "".join(chunks)
+    # \uXXXX escapes of a surrogate pair arrive as two halves
+    try:
+        return value.encode("utf-16", "surrogatepass").decode("utf-16")
+    except UnicodeError:
+        return value
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with an item cap and a size cap.
+
+    ``sizeof`` measures each value (``len`` by default) and the least
+    recently used entries are evicted until both caps are satisfied.
+    """
+
+    def __init__(self, max_items=256, max_size=None, sizeof=len):
+        self.max_items = max_items
+        self.max_size = max_size
+        self._sizeof = sizeof
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = self._sizeof(value)
+        if self.max_size is not None and size > self.max_size:
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._size -= self._sizeof(self._data.pop(key))
+            self._data[key] = value
+            self._size += size
+
+            while self._data and (
+                len(self._data) > self.max_items
+                or (self.max_size is not None and self._size > self.max_size)
+            ):
+                _, evicted = self._data.popitem(last=False)
+                self._size -= self._sizeof(evicted)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            value = self._data.pop(key)
+            self._size -= self._sizeof(value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "items": len(self._data),
+                "size": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,65 @@
+"""Per-task model routing.
+
+Every LLM call names its task. settings.LLM_ROUTES maps the task to a tier
+in settings.LLM_TIERS, and the tier fixes the model, the completion cap
+(max_tokens), the temperature and the per-attempt timeout. JSON extraction
+and long-form writing stay on the large model, while the interview turns,
+which are short and latency-bound, go to a small, fast one. Both tables are
+configured per environment through LLM_TIER_* and LLM_ROUTE_*.
+
+A tier's max_tokens is a ceiling; fit_to_context() lowers it to what the
+model's context window leaves after a given prompt.
+"""
+
+from typing import NamedTuple
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .rate_limiter import estimate_tokens
+
+
+class Route(NamedTuple):
+    """Model and completion options for one task; fields match the client's keyword arguments."""
+
+    model: str
+    max_tokens: int
+    temperature: float
+    timeout: float
+
+
+def _tier(task):
+    from django.conf import settings
+
+    try:
+        name = settings.LLM_ROUTES[task]
+    except KeyError:
+        raise ImproperlyConfigured(f"No LLM route for task {task!r}") from None
+    if name not in settings.LLM_TIERS:
+        raise ImproperlyConfigured(f"LLM task {task!r} is routed to unknown tier {name!r}")
+    return name, settings.LLM_TIERS[name]
+
+
+def get_route(task, model=None):
+    """The Route for ``task``; ``model`` overrides the tier's model only."""
+    _, tier = _tier(task)
+    route = Route(**tier)
+    return route._replace(model=model) if model else route
+
+
+def fit_to_context(route, messages):
+    """``route`` with max_tokens capped to the context left after ``messages``."""
+    from django.conf import settings
+
+    room = settings.LLM_CONTEXT_TOKENS - estimate_tokens(messages)
+    return route._replace(max_tokens=max(1, min(route.max_tokens, room)))
+
+
+def routing_table():
+    """Tier and options of every task, for monitoring."""
+    from django.conf import settings
+
+    table = {}
+    for task in settings.LLM_ROUTES:
+        name, tier = _tier(task)
+        table[task] = {"tier": name, **tier}
+    return table
@@ -1,32 +1,158 @@
+import bisect
+
 import fitz  # PyMuPDF
 
-def extract_clean_text(pdf_bytes: bytes) -> str:
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    full_text_pages = []
+# "blocks" keeps block geometry so link URIs can be attached to the block they
+# sit on. "text" is the cheaper plain-text mode: no per-block rects are built
+# and the page's link URIs are appended once at the end of the page instead.
+TEXT_MODE_BLOCKS = "blocks"
+TEXT_MODE_TEXT = "text"
+TEXT_MODES = (TEXT_MODE_BLOCKS, TEXT_MODE_TEXT)
+
+PAGE_SEPARATOR = "\n\n"
+
+# Rough characters-per-token ratio used to turn a token budget into a
+# character budget without loading a tokenizer.
+CHARS_PER_TOKEN = 4
+
+
+class LinkIndex:
+    """Sorted y-interval index over the URI links of a single page.
+
+    Links are sorted by their top edge so a block only has to be tested
+    against the links whose vertical span can overlap it, instead of every
+    link on the page.
+    """
+
+    def __init__(self, links):
+        entries = []
+        for order, link in enumerate(links):
+            if "uri" not in link:
+                continue
+            rect = fitz.Rect(link["from"])
+            entries.append((rect.y0, order, rect, link["uri"]))
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+
+        self._entries = entries
+        self._tops = [entry[0] for entry in entries]
+        self._max_height = max((entry[2].height for entry in entries), default=0)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def uris_for(self, block_rect):
+        """Return the URIs whose rect intersects ``block_rect``, in page order."""
+        if not self._entries:
+            return []
+
+        # Any link overlapping the block starts no earlier than
+        # block.y0 - tallest link and no later than block.y1.
+        lo = bisect.bisect_left(self._tops, block_rect.y0 - self._max_height)
+        hi = bisect.bisect_right(self._tops, block_rect.y1)
+
+        hits = [
+            (order, uri)
+            for _, order, rect, uri in self._entries[lo:hi]
+            if rect.intersects(block_rect)
+        ]
+        hits.sort()
+        return [uri for _, uri in hits]
+
+
+def _page_text_blocks(page) -> str:
+    link_index = LinkIndex(page.get_links())
+    parts = []
+
+    for block in page.get_text("blocks"):
+        block_text = block[4]
+        urls = link_index.uris_for(fitz.Rect(block[:4])) if link_index else []
+        if not urls:
+            parts.append(block_text)
+            continue
+
+        # Keep the URIs on the block's own line so they don't run into the
+        # first word of the next block.
+        parts.append(block_text.rstrip("\n"))
+        for url in urls:
+            parts.append(" " + url)
+        parts.append("\n")
+
+    return "".join(parts)
+
+
+def _page_text_plain(page) -> str:
+    parts = [page.get_text("text")]
+    for link in page.get_links():
+        if "uri" in link:
+            parts.append(" " + link["uri"])
+    return "".join(parts)
+
+
+def _iter_document_pages(doc, text_mode, page_limit=None, char_budget=None):
+    if text_mode not in TEXT_MODES:
+        raise ValueError(f"Unsupported text mode: {text_mode}")
+
+    page_text = _page_text_blocks if text_mode == TEXT_MODE_BLOCKS else _page_text_plain
+    remaining = char_budget
+
+    for number in range(doc.page_count):
+        if page_limit is not None and number >= page_limit:
+            return
+        if remaining is not None and remaining <= 0:
+            return
+
+        # Pages are loaded one at a time and dropped after yielding, so only
+        # the current page's objects are alive at any point.
+        text = page_text(doc.load_page(number))
+        if remaining is not None:
+            text = text[:remaining]
+            remaining -= len(text) + len(PAGE_SEPARATOR)
+        yield text
+
 
-    for page in doc:
-        blocks = page.get_text("blocks")
-        links = page.get_links()
+def _char_budget(char_budget, token_budget):
+    if token_budget is None:
+        return char_budget
+    token_chars = token_budget * CHARS_PER_TOKEN
+    return token_chars if char_budget is None else min(char_budget, token_chars)
 
-        link_rects = [(fitz.Rect(link["from"]), link["uri"]) for link in links if "uri" in link]
 
-        page_text_with_links = ""
+def iter_clean_pages(pdf_bytes: bytes = None, path: str = None, text_mode: str = TEXT_MODE_BLOCKS,
+                     page_limit: int = None, char_budget: int = None, token_budget: int = None):
+    """Yield the text of each page in order, stopping early at a budget.
 
-        for block in blocks:
-            block_rect = fitz.Rect(block[:4])
-            block_text = block[4]
+    Pass either ``pdf_bytes`` or ``path``. Iteration stops after
+    ``page_limit`` pages or once ``char_budget`` characters (or the
+    approximate equivalent of ``token_budget`` tokens) have been produced;
+    the page that crosses the budget is truncated. The document is closed
+    when the generator finishes or is closed.
+    """
+    if path is not None:
+        doc = fitz.open(path, filetype="pdf")
+    else:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
 
-            appended_urls = []
-            for rect, uri in link_rects:
-                if rect.intersects(block_rect):
-                    appended_urls.append(uri)
+    try:
+        yield from _iter_document_pages(
+            doc, text_mode, page_limit, _char_budget(char_budget, token_budget)
+        )
+    finally:
+        doc.close()
 
-            combined = block_text
-            for url in appended_urls:
-                combined += " " + url  # <-- space added here
 
-            page_text_with_links += combined
+def extract_clean_text(pdf_bytes: bytes, text_mode: str = TEXT_MODE_BLOCKS,
+                       page_limit: int = None, char_budget: int = None, token_budget: int = None) -> str:
+    """Extract text from an in-memory PDF (bytes, bytearray or memoryview)."""
+    return PAGE_SEPARATOR.join(iter_clean_pages(
+        pdf_bytes=pdf_bytes, text_mode=text_mode, page_limit=page_limit,
+        char_budget=char_budget, token_budget=token_budget,
+    ))
 
-        full_text_pages.append(page_text_with_links)
 
-    return "\n\n".join(full_text_pages)
+def extract_clean_text_from_path(path: str, text_mode: str = TEXT_MODE_BLOCKS,
+                                 page_limit: int = None, char_budget: int = None, token_budget: int = None) -> str:
+    """Extract text from a PDF on disk without loading it into memory first."""
+    return PAGE_SEPARATOR.join(iter_clean_pages(
+        path=path, text_mode=text_mode, page_limit=page_limit,
+        char_budget=char_budget, token_budget=token_budget,
+    ))
@@ -0,0 +1,112 @@
+"""Token-budgeted prompt assembly.
+
+build_prompt() formats a prompt template whose variable parts (resume text,
+job description, conversation history) are Sections. Token counts come from
+count_tokens(), an offline approximation of the Llama 3 tokenizer, so no
+tokenizer download or API call is needed. When the prompt is over budget,
+sections are truncated lowest ``priority`` first, each no shorter than its
+``min_tokens``, and the final prompt size is logged per task.
+
+Structured resume data goes in as compact_json(project(...)): only the
+fields a task uses, without indentation.
+"""
+
+import json
+import logging
+import re
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Letters-only runs cost one token per ~6 characters; numbers split into
+# groups of up to three digits; newline runs, indentation and runs of up to
+# three punctuation characters (JSON's '":"' and '","') are a token each
+_TOKEN = re.compile(r"[^\W\d_]+|\d{1,3}|\n+|[ \t]{2,}|[^\w\s]{1,3}|_")
+
+TRUNCATION_MARK = "[...]"
+
+
+def _cost(token):
+    return (len(token) + 5) // 6 if token[0].isalpha() else 1
+
+
+def count_tokens(text):
+    """Approximate Llama 3 token count of ``text``."""
+    return sum(_cost(token) for token in _TOKEN.findall(text))
+
+
+def truncate_to_tokens(text, max_tokens, keep="head"):
+    """Cut ``text`` to about ``max_tokens``, keeping its start ("head") or end ("tail")."""
+    matches = list(_TOKEN.finditer(text))
+    if sum(_cost(match.group()) for match in matches) <= max_tokens:
+        return text
+    if keep == "tail":
+        matches.reverse()
+
+    # Leave room for the marker that shows where text was cut
+    limit = max_tokens - count_tokens(TRUNCATION_MARK)
+    used = 0
+    for match in matches:
+        used += _cost(match.group())
+        if used > limit:
+            break
+
+    if keep == "tail":
+        return f"{TRUNCATION_MARK} {text[match.end():].lstrip()}"
+    return f"{text[:match.start()].rstrip()} {TRUNCATION_MARK}"
+
+
+def project(data, fields):
+    """The non-empty ``fields`` of a parsed resume, in the given order."""
+    if not isinstance(data, dict):
+        return data
+    return {field: data[field] for field in fields if data.get(field) not in (None, "", [], {})}
+
+
+def compact_json(value):
+    """JSON without indentation or spaces; strings pass through unchanged."""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+class Section(NamedTuple):
+    """A truncatable part of a prompt."""
+
+    text: str
+    priority: int = 0
+    min_tokens: int = 0
+    keep: str = "head"
+
+
+def build_prompt(task, template, budget, sections, **fixed):
+    """Format ``template`` with ``sections`` cut down to fit ``budget`` tokens.
+
+    ``fixed`` values are formatted in as they are. A budget of 0 disables
+    truncation; the token count is logged either way.
+    """
+    texts = {name: section.text or "" for name, section in sections.items()}
+    counts = {name: count_tokens(text) for name, text in texts.items()}
+    total = count_tokens(template.format(**fixed, **{name: "" for name in sections})) + sum(counts.values())
+
+    truncated = []
+    for name, section in sorted(sections.items(), key=lambda item: item[1].priority):
+        excess = total - budget
+        if not budget or excess <= 0:
+            break
+        allowed = max(section.min_tokens, counts[name] - excess)
+        if allowed >= counts[name]:
+            continue
+        texts[name] = truncate_to_tokens(texts[name], allowed, section.keep)
+        new_count = count_tokens(texts[name])
+        total -= counts[name] - new_count
+        counts[name] = new_count
+        truncated.append(name)
+
+    if budget and total > budget:
+        logger.warning("%s prompt is ~%d tokens, over its %d token budget", task, total, budget)
+    logger.info(
+        "%s prompt: ~%d tokens%s", task, total,
+        f" (truncated {', '.join(truncated)})" if truncated else "",
+    )
+    return template.format(**fixed, **texts)
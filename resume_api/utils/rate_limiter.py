@@ -0,0 +1,287 @@
+"""Token-bucket limiter for LLM quota shared by every worker process.
+
+The provider enforces requests-per-minute and tokens-per-minute per API
+key, not per process, so the buckets live in a small SQLite file that every
+gunicorn/uvicorn worker opens. Each take refills both buckets for the time
+elapsed and deducts one request plus the call's estimated tokens inside a
+``BEGIN IMMEDIATE`` transaction, so workers never double-spend capacity.
+
+Callers that find a bucket short sleep until it should have refilled and
+try again, up to ``max_wait`` seconds, instead of sending a request the
+provider would answer with 429. Token estimates are settled against the
+usage the provider reports once a call completes.
+
+Batch ingestion takes from its own smaller bucket as well as the shared
+one (get_batch_rate_limiter()), so batches can use at most their share of
+the quota and the rest stays free for interactive requests.
+"""
+
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+
+from .prompt_budget import count_tokens
+
+# Chat-format overhead per message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class RateLimitTimeout(Exception):
+    """The buckets did not refill within the caller's maximum wait."""
+
+
+def estimate_tokens(messages, completion_tokens=0):
+    """Approximate prompt tokens of chat ``messages`` plus the completion budget."""
+    prompt = sum(
+        count_tokens(str(message.get("content", ""))) + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    )
+    return prompt + completion_tokens
+
+
+class TokenBucketLimiter:
+    """Request and token buckets stored in a SQLite file shared across processes.
+
+    ``requests_per_minute`` or ``tokens_per_minute`` of 0 leaves that bucket
+    unlimited. Both buckets start full and hold at most one minute of quota.
+    A limiter with a ``parent`` takes from its own buckets first and then
+    from the parent's, so it can only use part of the parent's quota.
+    """
+
+    def __init__(self, path, requests_per_minute=0, tokens_per_minute=0, max_wait=60.0, name="groq",
+                 parent=None):
+        self.path = str(path)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait = max_wait
+        self.name = name
+        self.parent = parent
+        self._local = threading.local()
+        self._counters = {"acquired": 0, "queued": 0, "timeouts": 0, "waited_seconds": 0.0}
+        self._counters_lock = threading.Lock()
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_rate_buckets ("
+                "name TEXT PRIMARY KEY, requests REAL NOT NULL, "
+                "tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _refilled(self, conn, now):
+        row = conn.execute(
+            "SELECT requests, tokens, updated_at FROM llm_rate_buckets WHERE name = ?", (self.name,)
+        ).fetchone()
+        rpm, tpm = self.requests_per_minute, self.tokens_per_minute
+        if row is None:
+            return float(rpm), float(tpm)
+        requests, tokens, updated_at = row
+        elapsed = max(0.0, now - updated_at)
+        return (
+            min(rpm, requests + elapsed * rpm / 60),
+            min(tpm, tokens + elapsed * tpm / 60),
+        )
+
+    def _store(self, conn, requests, tokens, now):
+        conn.execute(
+            "INSERT INTO llm_rate_buckets (name, requests, tokens, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET requests = excluded.requests, "
+            "tokens = excluded.tokens, updated_at = excluded.updated_at",
+            (self.name, requests, tokens, now),
+        )
+
+    def _take(self, tokens):
+        """Deduct one request and ``tokens`` if both buckets allow it.
+
+        Returns 0 on success, otherwise the seconds until they should.
+        """
+        rpm, tpm = self.requests_per_minute, self.tokens_per_minute
+        # A call larger than a whole minute of quota waits for a full bucket
+        # rather than forever
+        tokens = min(tokens, tpm)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            available_requests, available_tokens = self._refilled(conn, now)
+            wait = 0.0
+            if rpm and available_requests < 1:
+                wait = (1 - available_requests) * 60 / rpm
+            if tpm and available_tokens < tokens:
+                wait = max(wait, (tokens - available_tokens) * 60 / tpm)
+            if not wait:
+                available_requests -= 1 if rpm else 0
+                available_tokens -= tokens
+            self._store(conn, available_requests, available_tokens, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self._counters[name] += amount
+
+    def _deadline(self, max_wait):
+        # Callers can only shorten the configured maximum wait
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        return time.monotonic() + max_wait
+
+    def _next_wait(self, tokens, deadline_at, waited):
+        """Seconds to sleep before the next take, or None once it succeeded."""
+        wait = self._take(tokens)
+        if not wait:
+            self._count("acquired")
+            if waited:
+                self._count("waited_seconds", waited)
+            return None
+        if time.monotonic() + wait > deadline_at:
+            self._count("timeouts")
+            raise RateLimitTimeout(f"LLM rate limit: no capacity for {wait:.1f}s")
+        if not waited:
+            self._count("queued")
+        # Spread waiters that computed the same refill time
+        return wait + random.uniform(0, 0.05)
+
+    def acquire(self, tokens, max_wait=None):
+        """Block until one request and ``tokens`` tokens are available.
+
+        Raises RateLimitTimeout if that would take longer than ``max_wait``
+        (capped at the limiter's own max_wait).
+        """
+        deadline_at = self._deadline(max_wait)
+        waited = 0.0
+        while True:
+            wait = self._next_wait(tokens, deadline_at, waited)
+            if wait is None:
+                break
+            time.sleep(wait)
+            waited += wait
+
+        if self.parent is not None:
+            try:
+                self.parent.acquire(tokens, max_wait=deadline_at - time.monotonic())
+            except BaseException:
+                self._refund(tokens)
+                raise
+
+    async def aacquire(self, tokens, max_wait=None):
+        """acquire() for async callers; the SQLite transaction runs in a thread."""
+        deadline_at = self._deadline(max_wait)
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self._next_wait, tokens, deadline_at, waited)
+            if wait is None:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+
+        if self.parent is not None:
+            try:
+                await self.parent.aacquire(tokens, max_wait=deadline_at - time.monotonic())
+            except BaseException:
+                await asyncio.to_thread(self._refund, tokens)
+                raise
+
+    def _adjust(self, requests, tokens):
+        """Add ``requests`` and ``tokens`` (either may be negative) to the buckets."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            available_requests, available_tokens = self._refilled(conn, now)
+            self._store(
+                conn,
+                min(self.requests_per_minute, available_requests + requests),
+                min(self.tokens_per_minute, available_tokens + tokens),
+                now,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _refund(self, tokens):
+        # The parent refused the call, so it never used this limiter's share
+        self._adjust(1 if self.requests_per_minute else 0, min(tokens, self.tokens_per_minute))
+
+    def settle(self, estimated, actual):
+        """Return over-estimated tokens to the bucket, or charge the shortfall."""
+        if self.parent is not None:
+            self.parent.settle(estimated, actual)
+        if not self.tokens_per_minute or actual is None or actual == estimated:
+            return
+        self._adjust(0, estimated - actual)
+
+    async def asettle(self, estimated, actual):
+        await asyncio.to_thread(self.settle, estimated, actual)
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self._counters)
+        counters["waited_seconds"] = round(counters["waited_seconds"], 3)
+        return {
+            **counters,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+        }
+
+
+_limiter = None
+_batch_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the process-wide limiter from settings, or None when disabled."""
+    global _limiter
+    from django.conf import settings
+
+    if not (settings.LLM_RATE_LIMIT_RPM or settings.LLM_RATE_LIMIT_TPM):
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TokenBucketLimiter(
+                    settings.LLM_RATE_LIMIT_DB,
+                    requests_per_minute=settings.LLM_RATE_LIMIT_RPM,
+                    tokens_per_minute=settings.LLM_RATE_LIMIT_TPM,
+                    max_wait=settings.LLM_RATE_LIMIT_MAX_WAIT,
+                )
+    return _limiter
+
+
+def get_batch_rate_limiter():
+    """Limiter for batch ingestion: LLM_RATE_LIMIT_BATCH_SHARE of the shared quota.
+
+    Returns the shared limiter itself when the share is 1, and None when
+    rate limiting is disabled.
+    """
+    global _batch_limiter
+    from django.conf import settings
+
+    parent = get_rate_limiter()
+    share = settings.LLM_RATE_LIMIT_BATCH_SHARE
+    if parent is None or share >= 1:
+        return parent
+    if _batch_limiter is None:
+        with _limiter_lock:
+            if _batch_limiter is None:
+                _batch_limiter = TokenBucketLimiter(
+                    settings.LLM_RATE_LIMIT_DB,
+                    requests_per_minute=max(1, int(parent.requests_per_minute * share)) if parent.requests_per_minute else 0,
+                    tokens_per_minute=max(1, int(parent.tokens_per_minute * share)) if parent.tokens_per_minute else 0,
+                    max_wait=settings.LLM_RATE_LIMIT_BATCH_MAX_WAIT,
+                    name=f"{parent.name}_batch",
+                    parent=parent,
+                )
+    return _batch_limiter
@@ -0,0 +1,162 @@
+"""Two-tier cache for LLM responses.
+
+Each ResponseCache owns a namespace in the CachedLLMResponse table and an
+in-process LRU in front of it. Values are stored as JSON, so callers get a
+fresh copy on every hit and the LRU's size cap is measured in characters.
+Entries in both tiers expire after ``ttl`` seconds, and the oldest rows of
+the namespace are evicted once it holds more than ``max_rows``. Error
+responses (dicts with an ``error`` key) and JSON salvaged from malformed
+or truncated completions (flagged ``repaired``) are never stored.
+
+invalidate() and clear() reach the DB and this process's LRU; other worker
+processes drop their copy when it expires or is evicted.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from .json_repair import REPAIRED_FLAG
+from .lru_cache import LRUCache
+
+
+def cache_key(*parts):
+    """SHA-256 over the parts, separated so ("ab", "c") != ("a", "bc")."""
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\x00")
+    return hasher.hexdigest()
+
+
+def is_cacheable(value):
+    return value is not None and not (
+        isinstance(value, dict) and ("error" in value or value.get(REPAIRED_FLAG))
+    )
+
+
+class ResponseCache:
+    """LRU in front of one namespace of the CachedLLMResponse table."""
+
+    def __init__(self, namespace, ttl, max_items=256, max_chars=None, max_rows=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_rows = max_rows
+        # Memory entries are (expires_at, json) pairs
+        self._memory = LRUCache(max_items=max_items, max_size=max_chars, sizeof=lambda entry: len(entry[1]))
+        self._counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "bypassed": 0}
+        self._counters_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def _expiry_cutoff(self):
+        return timezone.now() - timedelta(seconds=self.ttl)
+
+    def _rows(self):
+        from ..models import CachedLLMResponse
+
+        return CachedLLMResponse.objects.filter(namespace=self.namespace)
+
+    def _memory_get(self, key):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, raw = entry
+        if expires_at < time.time():
+            self._memory.pop(key)
+            return None
+        self._count("memory_hits")
+        return json.loads(raw)
+
+    def _memory_set(self, key, value, created_at):
+        self._memory.set(key, (created_at.timestamp() + self.ttl, json.dumps(value)))
+
+    def get(self, key):
+        """Return the cached response for ``key``, or None."""
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+        return self._db_get(key)
+
+    def _db_get(self, key):
+        entry = self._rows().filter(key=key).only("response", "created_at").first()
+        if entry is not None and entry.created_at >= self._expiry_cutoff():
+            self._memory_set(key, entry.response, entry.created_at)
+            self._count("db_hits")
+            return entry.response
+
+        if entry is not None:
+            entry.delete()
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        """Store ``value`` in both tiers unless it is an error or repaired response."""
+        if not is_cacheable(value):
+            return
+        now = timezone.now()
+        self._memory_set(key, value, now)
+        self._db_set(key, value, now)
+
+    def _db_set(self, key, value, created_at):
+        from ..models import CachedLLMResponse
+
+        CachedLLMResponse.objects.update_or_create(
+            namespace=self.namespace, key=key,
+            defaults={"response": value, "created_at": created_at},
+        )
+
+        rows = self._rows()
+        rows.filter(created_at__lt=self._expiry_cutoff()).delete()
+        if self.max_rows:
+            # Keep the newest max_rows rows of this namespace
+            cutoff = rows.order_by("-created_at").values_list("created_at", flat=True)[self.max_rows:self.max_rows + 1]
+            if cutoff:
+                rows.filter(created_at__lte=cutoff[0]).delete()
+
+    async def aget(self, key):
+        """get() for async callers; only the DB tier leaves the event loop."""
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+        return await sync_to_async(self._db_get)(key)
+
+    async def aset(self, key, value):
+        if not is_cacheable(value):
+            return
+        now = timezone.now()
+        self._memory_set(key, value, now)
+        await sync_to_async(self._db_set)(key, value, now)
+
+    def bypass(self):
+        """Record a lookup that was skipped at the caller's request."""
+        self._count("bypassed")
+
+    def invalidate(self, key):
+        """Drop one entry from both tiers."""
+        self._memory.pop(key)
+        self._rows().filter(key=key).delete()
+
+    def clear(self):
+        """Drop every entry in this namespace from both tiers."""
+        self._memory.clear()
+        return self._rows().delete()[0]
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self._counters)
+        lookups = counters["memory_hits"] + counters["db_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["db_hits"]
+        return {
+            **counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory": self._memory.stats(),
+        }
+
@@ -0,0 +1,111 @@
+"""Split resume text into its top-level sections.
+
+Extraction emits every fitz text block on its own line(s), so section
+headings arrive as short standalone lines. A line is treated as a heading
+when, once appended link URIs and trailing punctuation are removed, it is
+one of the known section titles, or it is a short all-caps line containing
+one of their keywords.
+"""
+
+import re
+
+SECTION_HEADER = "header"
+
+# Canonical section -> heading titles that introduce it
+SECTION_TITLES = {
+    "summary": (
+        "summary", "professional summary", "profile", "professional profile",
+        "about", "about me", "objective", "career objective", "career summary",
+    ),
+    "skills": (
+        "skills", "technical skills", "key skills", "core skills", "core competencies",
+        "competencies", "technologies", "tech stack", "skills and tools", "tools",
+    ),
+    "experience": (
+        "experience", "work experience", "professional experience", "employment",
+        "employment history", "work history", "internships", "internship experience",
+        "relevant experience",
+    ),
+    "education": (
+        "education", "academic background", "academics", "qualifications",
+        "educational qualifications", "education and training",
+    ),
+    "projects": (
+        "projects", "personal projects", "academic projects", "key projects",
+        "selected projects", "side projects",
+    ),
+    "certifications": (
+        "certifications", "certificates", "certification", "licenses and certifications",
+        "courses", "courses and certifications",
+    ),
+    "awards": (
+        "awards", "achievements", "honors", "honours", "awards and achievements",
+        "honors and awards", "accomplishments",
+    ),
+}
+
+_TITLE_TO_SECTION = {
+    title: section for section, titles in SECTION_TITLES.items() for title in titles
+}
+_KEYWORDS = {section: titles[0] for section, titles in SECTION_TITLES.items()}
+
+MAX_HEADING_WORDS = 5
+
+_URL = re.compile(r"(?:https?://|mailto:)\S+", re.IGNORECASE)
+_TRIM = re.compile(r"^[\W_]+|[\W_]+$")
+
+
+def _heading_key(line):
+    line = _URL.sub("", line)
+    line = line.replace("&", " and ")
+    line = re.sub(r"\s+", " ", line)
+    return _TRIM.sub("", line).lower()
+
+
+def classify_heading(line):
+    """Return the canonical section a heading line introduces, or None."""
+    stripped = _URL.sub("", line).strip()
+    # Wrapped sentence fragments ("...transferable skills.") are not headings
+    if not stripped[:1].isupper() or stripped.endswith((".", ",", ";")):
+        return None
+
+    key = _heading_key(stripped)
+    if not key or len(key.split()) > MAX_HEADING_WORDS:
+        return None
+
+    if key in _TITLE_TO_SECTION:
+        return _TITLE_TO_SECTION[key]
+
+    if stripped.isupper():
+        for section, keyword in _KEYWORDS.items():
+            if keyword in key:
+                return section
+    return None
+
+
+def segment_resume(text):
+    """Return an ordered dict of section -> text.
+
+    Text before the first heading is returned under SECTION_HEADER. A
+    section that appears more than once (e.g. a second "Projects" heading
+    on page two) is concatenated.
+    """
+    sections = {}
+    current = SECTION_HEADER
+    buffer = []
+
+    def flush():
+        content = "\n".join(buffer).strip()
+        if content:
+            sections[current] = f"{sections[current]}\n\n{content}" if current in sections else content
+
+    for line in text.splitlines():
+        section = classify_heading(line)
+        if section is None:
+            buffer.append(line)
+            continue
+        flush()
+        current, buffer = section, []
+
+    flush()
+    return sections
@@ -0,0 +1,174 @@
+"""Coalesce identical in-flight LLM requests.
+
+A double-submitted form or a client retry sends the same payload while the
+first completion is still running. SingleFlight.do() runs ``compute`` once
+per key: concurrent callers in the same process wait on the leader's future,
+and callers in other workers see the leader's LLMRequestLock row, poll
+until it is released and then read the result it published (``lookup``).
+
+``compute`` is responsible for publishing its result somewhere ``lookup``
+can read it, normally a ResponseCache. If a remote leader fails or its
+lock expires without a result, the waiter computes the response itself.
+Each lock row carries its leader's owner token, so a leader whose lock
+expired and was taken over never deletes its successor's row. The TTL
+should outlast ``compute`` (see LLM_SINGLE_FLIGHT_LOCK_TTL).
+
+The lock rows live in the default database. SQLite serialises writers
+across processes, so with several web workers point DATABASES at a server
+database (PostgreSQL, MySQL) or the lock polling contends with every
+other write.
+"""
+
+import asyncio
+import copy
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+
+class SingleFlight:
+    """Per-namespace coalescing of calls that share a key."""
+
+    def __init__(self, namespace, lock_ttl=120.0, poll_interval=0.25):
+        self.namespace = namespace
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counters = {"led": 0, "coalesced": 0, "waited_remote": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _join(self, key):
+        """Return (future, is_leader) for ``key`` in this process."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._counters["coalesced"] += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _leave(self, key):
+        with self._lock:
+            del self._inflight[key]
+
+    # Cross-worker lock: one LLMRequestLock row per namespace/key
+
+    def _locks(self):
+        from ..models import LLMRequestLock
+
+        return LLMRequestLock.objects.filter(namespace=self.namespace)
+
+    def _try_lock(self, key, lock_ttl):
+        """Take the lock for ``key``; returns its owner token, or None if it is held."""
+        from ..models import LLMRequestLock
+
+        now = timezone.now()
+        owner = uuid.uuid4().hex
+        # A worker that died mid-call leaves its row behind until it expires
+        self._locks().filter(key=key, expires_at__lt=now).delete()
+        try:
+            with transaction.atomic():
+                LLMRequestLock.objects.create(
+                    namespace=self.namespace, key=key, owner=owner,
+                    expires_at=now + timedelta(seconds=lock_ttl),
+                )
+        except IntegrityError:
+            return None
+        return owner
+
+    def _is_locked(self, key):
+        return self._locks().filter(key=key, expires_at__gte=timezone.now()).exists()
+
+    def _unlock(self, key, owner):
+        self._locks().filter(key=key, owner=owner).delete()
+
+    def _lead(self, key, compute, lookup, lock_ttl):
+        owner = self._try_lock(key, lock_ttl)
+        if owner is None:
+            self._count("waited_remote")
+            deadline_at = time.monotonic() + lock_ttl
+            while self._is_locked(key) and time.monotonic() < deadline_at:
+                time.sleep(self.poll_interval)
+            result = lookup()
+            if result is not None:
+                return result
+            owner = self._try_lock(key, lock_ttl)
+
+        self._count("led")
+        try:
+            return compute()
+        finally:
+            if owner is not None:
+                self._unlock(key, owner)
+
+    async def _alead(self, key, acompute, alookup, lock_ttl):
+        owner = await sync_to_async(self._try_lock)(key, lock_ttl)
+        if owner is None:
+            self._count("waited_remote")
+            deadline_at = time.monotonic() + lock_ttl
+            while await sync_to_async(self._is_locked)(key) and time.monotonic() < deadline_at:
+                await asyncio.sleep(self.poll_interval)
+            result = await alookup()
+            if result is not None:
+                return result
+            owner = await sync_to_async(self._try_lock)(key, lock_ttl)
+
+        self._count("led")
+        try:
+            return await acompute()
+        finally:
+            if owner is not None:
+                await sync_to_async(self._unlock)(key, owner)
+
+    def do(self, key, compute, lookup, lock_ttl=None):
+        """Return ``compute()``, sharing one call among concurrent callers of ``key``.
+
+        ``lock_ttl`` overrides the namespace's lock TTL for calls that may
+        run longer, such as batch calls queued behind the rate limiter.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            # Followers get their own copy, as they would from the cache
+            return copy.deepcopy(future.result())
+
+        try:
+            result = self._lead(key, compute, lookup, lock_ttl or self.lock_ttl)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._leave(key)
+
+    async def ado(self, key, acompute, alookup, lock_ttl=None):
+        """do() for async callers; shares in-flight calls with sync callers too."""
+        future, leader = self._join(key)
+        if not leader:
+            return copy.deepcopy(await asyncio.wrap_future(future))
+
+        try:
+            result = await self._alead(key, acompute, alookup, lock_ttl or self.lock_ttl)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._leave(key)
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, "in_flight": len(self._inflight)}
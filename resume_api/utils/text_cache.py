@@ -0,0 +1,81 @@
+"""Content-addressed cache of extracted resume text.
+
+Text is keyed by the SHA-256 of the PDF bytes combined with the extraction
+settings' fingerprint (resume_text.extraction_fingerprint). Lookups go through an
+in-process LRU first and fall back to the ExtractedText table, whose rows
+expire after RESUME_TEXT_CACHE_TTL seconds.
+"""
+
+import hashlib
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .lru_cache import LRUCache
+
+_memory = LRUCache(
+    max_items=settings.RESUME_TEXT_CACHE_MAX_ITEMS,
+    max_size=settings.RESUME_TEXT_CACHE_MAX_CHARS,
+)
+_counters = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def new_hasher():
+    """Return the hash object used for cache keys; feed it upload chunks."""
+    return hashlib.sha256()
+
+
+def _expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.RESUME_TEXT_CACHE_TTL)
+
+
+def get_text(digest):
+    """Return cached text for a PDF digest, or None."""
+    text = _memory.get(digest)
+    if text is not None:
+        _count("memory_hits")
+        return text
+
+    from ..models import ExtractedText
+
+    entry = ExtractedText.objects.filter(sha256=digest).only("text", "created_at").first()
+    if entry is not None and entry.created_at >= _expiry_cutoff():
+        _memory.set(digest, entry.text)
+        _count("db_hits")
+        return entry.text
+
+    if entry is not None:
+        entry.delete()
+    _count("misses")
+    return None
+
+
+def set_text(digest, text):
+    """Store extracted text in both tiers and purge expired rows."""
+    from ..models import ExtractedText
+
+    _memory.set(digest, text)
+    ExtractedText.objects.update_or_create(
+        sha256=digest, defaults={"text": text, "created_at": timezone.now()}
+    )
+    ExtractedText.objects.filter(created_at__lt=_expiry_cutoff()).delete()
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    lookups = sum(counters.values())
+    hits = counters["memory_hits"] + counters["db_hits"]
+    return {
+        **counters,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "memory": _memory.stats(),
+    }
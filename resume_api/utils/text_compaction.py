@@ -0,0 +1,200 @@
+"""Normalize extracted resume text before it is sent to the LLM.
+
+Prompt tokens drive both latency and cost of the parse call, and raw PDF
+text carries a lot of noise: running headers and footers, page numbers,
+words hyphenated across lines, whitespace runs and link URIs that repeat
+text already on the page. compact_pages() strips that noise and reports
+how much it saved.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from .pdf_extraction import CHARS_PER_TOKEN, PAGE_SEPARATOR
+
+# Only the first/last few lines of a page are treated as header/footer
+# candidates so repeated lines in the body (e.g. a skill) are kept.
+EDGE_LINES = 3
+
+# A word broken across lines, with any hyphenated parts on either side
+_HYPHEN_BREAK = re.compile(r"((?:\w+-)*\w*[a-z])-\n[ \t]*([a-z]\w*(?:-\w+)*)")
+_INLINE_SPACE = re.compile(r"[ \t\u00a0\u2000-\u200b\u3000]+")
+_PAGE_NUMBER = re.compile(r"^(page\s*)?\d{1,3}(\s*(/|of)\s*\d{1,3})?$", re.IGNORECASE)
+_DIGITS = re.compile(r"\d+")
+# Edge lines that carry a page counter: "Page 2", "2 of 3", "Jane Doe - 2"
+_PAGE_LABEL = re.compile(r"\bpage\b|\b\d{1,3}\s+of\s+\d{1,3}\b|[-–|·]\s*\d{1,3}$", re.IGNORECASE)
+_URL = re.compile(r"(?:https?://|mailto:)[^\s<>\"']+", re.IGNORECASE)
+_BARE_LINK = re.compile(
+    r"(?<![\w@/.])(?:[\w.+-]+@[\w-]+(?:\.[\w-]+)+|(?:www\.)?[\w-]+(?:\.[\w-]+)+/[^\s<>\"']*)",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text):
+    """Approximate token count using the extraction CHARS_PER_TOKEN ratio."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class CompactionStats:
+    chars_before: int = 0
+    chars_after: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+    repeated_lines_removed: int = 0
+    page_numbers_removed: int = 0
+    hyphenations_joined: int = 0
+    urls_removed: int = 0
+
+    @property
+    def chars_saved(self):
+        return self.chars_before - self.chars_after
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+    def as_dict(self):
+        return {
+            **self.__dict__,
+            "chars_saved": self.chars_saved,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+def _normalize_url(url):
+    url = re.sub(r"^(?:https?://|mailto:)", "", url, flags=re.IGNORECASE)
+    url = re.sub(r"^www\.", "", url, flags=re.IGNORECASE)
+    return url.rstrip("/.,;)").lower()
+
+
+def _edge_key(line):
+    # Page numbers inside a running footer ("Jane Doe - 2") differ per page,
+    # so only those lines ignore digits; others must repeat exactly, or two
+    # date ranges at page edges ("2016 - 2020", "2020 - 2023") would match
+    if _PAGE_LABEL.search(line):
+        return _DIGITS.sub("#", line.lower())
+    return line
+
+
+def _rejoin(match, stats):
+    head, tail = match.groups()
+    # "state-\nof-the-art" is a compound that happened to wrap: keep its hyphen
+    if "-" in head or "-" in tail:
+        return f"{head}-{tail}"
+    stats.hyphenations_joined += 1
+    return head + tail
+
+
+def _split_lines(page, stats):
+    page = _HYPHEN_BREAK.sub(lambda match: _rejoin(match, stats), page)
+
+    return [_INLINE_SPACE.sub(" ", line).strip() for line in page.splitlines()]
+
+
+def _edge_indexes(lines):
+    content = [i for i, line in enumerate(lines) if line]
+    return set(content[:EDGE_LINES]) | set(content[-EDGE_LINES:])
+
+
+def _repeated_edge_lines(pages):
+    if len(pages) < 2:
+        return set()
+
+    seen_on = Counter()
+    for lines in pages:
+        seen_on.update({_edge_key(lines[i]) for i in _edge_indexes(lines)})
+
+    threshold = max(2, math.ceil(len(pages) / 2))
+    return {key for key, count in seen_on.items() if count >= threshold}
+
+
+def _dedupe_urls(text, stats):
+    # Only targets written out elsewhere count as known; the address inside
+    # "mailto:jane@x.com" is that link's only copy
+    urls = [match.span() for match in _URL.finditer(text)]
+    known = {
+        _normalize_url(match.group())
+        for match in _BARE_LINK.finditer(text)
+        if not any(start <= match.start() < end for start, end in urls)
+    }
+    seen = set()
+
+    def replace(match):
+        key = _normalize_url(match.group())
+        if key in known or key in seen:
+            stats.urls_removed += 1
+            return ""
+        seen.add(key)
+        return match.group()
+
+    text = _URL.sub(replace, text)
+    return _INLINE_SPACE.sub(" ", text)
+
+
+def _join_lines(lines):
+    out = []
+    for line in lines:
+        line = line.strip()
+        if not line and (not out or not out[-1]):
+            continue
+        out.append(line)
+    while out and not out[-1]:
+        out.pop()
+    return "\n".join(out)
+
+
+def compact_pages(pages):
+    """Return (compacted_text, CompactionStats) for a list of page texts."""
+    stats = CompactionStats()
+    stats.chars_before = sum(len(page) for page in pages) + len(PAGE_SEPARATOR) * max(len(pages) - 1, 0)
+    stats.tokens_before = math.ceil(stats.chars_before / CHARS_PER_TOKEN)
+
+    split = [_split_lines(page, stats) for page in pages]
+    repeated = _repeated_edge_lines(split)
+
+    compacted_pages = []
+    for lines in split:
+        edges = _edge_indexes(lines)
+        kept = []
+        for i, line in enumerate(lines):
+            if i in edges:
+                if _PAGE_NUMBER.match(line):
+                    stats.page_numbers_removed += 1
+                    continue
+                if _edge_key(line) in repeated:
+                    stats.repeated_lines_removed += 1
+                    continue
+            kept.append(line)
+        page = _join_lines(kept)
+        if page:
+            compacted_pages.append(page)
+
+    text = _dedupe_urls(PAGE_SEPARATOR.join(compacted_pages), stats)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+
+    stats.chars_after = len(text)
+    stats.tokens_after = estimate_tokens(text)
+    return text, stats
+
+
+_totals = CompactionStats()
+_totals_lock = threading.Lock()
+_runs = 0
+
+
+def record(stats):
+    """Add one run's stats to the process-wide totals."""
+    global _runs
+    with _totals_lock:
+        _runs += 1
+        for name, value in stats.__dict__.items():
+            setattr(_totals, name, getattr(_totals, name) + value)
+
+
+def totals():
+    with _totals_lock:
+        return {"runs": _runs, **_totals.as_dict()}
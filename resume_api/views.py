@@ -1,19 +1,56 @@
-import os
+import json
+import math
+
 from rest_framework.decorators import api_view, parser_classes, permission_classes
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from .resume_parser import ats_extractor
-from .match_analyzer import match_analyzer
-from .generate_cover_letter import generate_cover_letter
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.http import JsonResponse, StreamingHttpResponse
+from .async_api import async_api_view
+from .resume_parser import aats_extractor, ats_extractor, parse_cache, parse_flight
+from .match_analyzer import amatch_analyzer, match_analyzer, match_cache, match_flight
+from .generate_cover_letter import (
+    agenerate_cover_letter, astream_cover_letter, cover_letter_flight, generate_cover_letter, stream_cover_letter,
+)
+from .llm_client import LLMStreamError, circuit_state, json_stats
 from django.utils import timezone
-from .models import Resume
-from .utils.pdf_extraction import extract_clean_text
+from .batch_processing import BatchError, batch_summary, create_batch, start_batch
+from .models import Resume, ResumeBatch
+from .resume_text import read_uploaded_pdf
+from .upload_handlers import PDFUploadParser
+from .utils import text_cache, text_compaction
+from .utils.extraction_service import ExtractionBusy, ExtractionError, ExtractionTimeout, get_extraction_service
+from .utils.model_routing import routing_table
+from .utils.pdf_preflight import PreflightError
+from .utils.rate_limiter import get_batch_rate_limiter, get_rate_limiter
 from users.models import User
 
 
+# HTTP status for an LLM helper's error dict, keyed by its "code"; anything
+# else that went wrong upstream is a 502
+LLM_ERROR_STATUS = {
+    'rate_limited': status.HTTP_429_TOO_MANY_REQUESTS,
+    'unavailable': status.HTTP_503_SERVICE_UNAVAILABLE,
+    'timeout': status.HTTP_504_GATEWAY_TIMEOUT,
+}
+
+
+def _llm_status(result):
+    """200 for a usable LLM result, otherwise the status for its error."""
+    if isinstance(result, dict) and 'error' in result:
+        return LLM_ERROR_STATUS.get(result.get('code'), status.HTTP_502_BAD_GATEWAY)
+    return status.HTTP_200_OK
+
+
+def _extraction_busy_headers():
+    """Retry-After for a full extraction queue: about one job timeout."""
+    return {'Retry-After': str(math.ceil(settings.PDF_EXTRACTION_TIMEOUT))}
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -39,19 +76,33 @@ def index(request):
 
 
 @api_view(['POST'])
-@parser_classes([MultiPartParser, FormParser])
+@parser_classes([PDFUploadParser, FormParser])
 @permission_classes([IsAuthenticated])
 def process_resume(request):
     """Process uploaded PDF resume and extract information"""
     
+    files = request.FILES
+    
+    # PDFUploadHandler aborts non-PDF and oversized uploads mid-stream
+    rejection = getattr(request, 'pdf_upload_error', None)
+    if rejection is not None:
+        return Response(
+            {"error": str(rejection), "code": rejection.code},
+            status=(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                if rejection.code == 'too_large'
+                else status.HTTP_400_BAD_REQUEST
+            )
+        )
+    
     # Check if file was uploaded
-    if 'pdf_doc' not in request.FILES:
+    if 'pdf_doc' not in files:
         return Response(
             {"error": "No file part"}, 
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    uploaded_file = request.FILES['pdf_doc']
+    uploaded_file = files['pdf_doc']
     
     # Check if file has a name
     if uploaded_file.name == '':
@@ -68,50 +119,172 @@ def process_resume(request):
         )
     
     try:
-        # Create media directory if it doesn't exist
-        media_dir = os.path.join(settings.MEDIA_ROOT, 'resumes')
-        os.makedirs(media_dir, exist_ok=True)
-        
-        # Save the uploaded file
-        file_path = os.path.join(media_dir, 'temp_resume.pdf')
-        with open(file_path, 'wb+') as destination:
-            for chunk in uploaded_file.chunks():
-                destination.write(chunk)
+        # Extract text straight from the upload; only large files touch disk
+        data = read_uploaded_pdf(uploaded_file, digest=getattr(request, 'pdf_upload_sha256', None))
         
-        # Read the PDF file
-        data = _read_file_from_path(file_path)
-        
-        # Parse the resume
-        parsed_data = ats_extractor(data)
-        if parsed_data:
+        # Parse the resume; ?refresh=1 skips the cached parse
+        parsed_data = ats_extractor(data, use_cache=request.query_params.get('refresh') != '1')
+        result_status = _llm_status(parsed_data)
+        if result_status == status.HTTP_200_OK:
             user = User.objects.get(id=request.user.id)
             user.resume_analyzed += 1
             user.save()
         
-        # Clean up the temporary file
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
-        return Response(parsed_data, status=status.HTTP_200_OK)
+        return Response(parsed_data, status=result_status)
         
+    except ExtractionBusy as e:
+        return Response(
+            {"error": "PDF processing is busy", "message": str(e), "code": "unavailable"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers=_extraction_busy_headers()
+        )
+    except ExtractionTimeout as e:
+        return Response(
+            {"error": "PDF took too long to process", "message": str(e)},
+            status=status.HTTP_504_GATEWAY_TIMEOUT
+        )
+    except PreflightError as e:
+        return Response(
+            {"error": "PDF rejected", "code": e.code, "message": str(e)},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    except ExtractionError as e:
+        return Response(
+            {"error": "Failed to read PDF", "message": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
-        # Clean up the temporary file in case of error
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
-        
         return Response(
             {"error": "Failed to process file", "message": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
-def _read_file_from_path(path):
-    """Extract text from PDF file"""
+def _read_uploaded_pdf_in_thread(uploaded_file, digest):
+    # Runs in an executor thread, so close the connection the text cache
+    # opened there instead of leaving it to the request cycle
+    try:
+        return read_uploaded_pdf(uploaded_file, digest=digest)
+    finally:
+        connection.close()
+
+
+@async_api_view(['POST'], [PDFUploadParser, FormParser])
+async def process_resume_async(request):
+    """Async process_resume: the LLM call doesn't hold a worker thread"""
+    
+    files = request.FILES
+    
+    rejection = getattr(request, 'pdf_upload_error', None)
+    if rejection is not None:
+        return JsonResponse(
+            {"error": str(rejection), "code": rejection.code},
+            status=(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                if rejection.code == 'too_large'
+                else status.HTTP_400_BAD_REQUEST
+            )
+        )
+    
+    if 'pdf_doc' not in files:
+        return JsonResponse({"error": "No file part"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    uploaded_file = files['pdf_doc']
+    
+    if uploaded_file.name == '':
+        return JsonResponse({"error": "No selected file"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not uploaded_file.name.lower().endswith('.pdf'):
+        return JsonResponse({"error": "File must be a PDF"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        # Extraction waits on the process pool from an executor thread;
+        # thread_sensitive=False lets uploads extract in parallel
+        data = await sync_to_async(_read_uploaded_pdf_in_thread, thread_sensitive=False)(
+            uploaded_file, getattr(request, 'pdf_upload_sha256', None)
+        )
+        
+        parsed_data = await aats_extractor(data, use_cache=request.query_params.get('refresh') != '1')
+        result_status = _llm_status(parsed_data)
+        if result_status == status.HTTP_200_OK:
+            await User.objects.filter(id=request.user.id).aupdate(resume_analyzed=F('resume_analyzed') + 1)
+        
+        return JsonResponse(parsed_data, status=result_status)
+        
+    except ExtractionBusy as e:
+        return JsonResponse(
+            {"error": "PDF processing is busy", "message": str(e), "code": "unavailable"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers=_extraction_busy_headers()
+        )
+    except ExtractionTimeout as e:
+        return JsonResponse(
+            {"error": "PDF took too long to process", "message": str(e)},
+            status=status.HTTP_504_GATEWAY_TIMEOUT
+        )
+    except PreflightError as e:
+        return JsonResponse(
+            {"error": "PDF rejected", "code": e.code, "message": str(e)},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    except ExtractionError as e:
+        return JsonResponse(
+            {"error": "Failed to read PDF", "message": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return JsonResponse(
+            {"error": "Failed to process file", "message": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+@permission_classes([IsAuthenticated])
+def process_resume_batch(request):
+    """Queue a batch of PDF resumes (multiple pdf_doc parts or zip files)"""
+    
+    uploaded_files = request.FILES.getlist('pdf_doc')
+    if not uploaded_files:
+        return Response(
+            {"error": "No file part"}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        batch = create_batch(request.user, uploaded_files)
+    except BatchError as e:
+        return Response(
+            {"error": "Invalid batch upload", "message": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {"error": "Failed to create batch", "message": str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    
+    start_batch(batch)
+    
+    return Response({
+        'batch_id': str(batch.id),
+        'status': batch.status,
+        'total': batch.items.count(),
+        'status_url': f"/api/resumes/batch/{batch.id}/",
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def resume_batch_status(request, batch_id):
+    """Per-item status and results of a resume batch (?results=0 omits results)"""
+    batch = ResumeBatch.objects.filter(id=batch_id, user=request.user).first()
+    if batch is None:
+        return Response({'message': 'Batch not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    with open(path, "rb") as f:
-        pdf_bytes = f.read()
-    data = extract_clean_text(pdf_bytes)
-    return data
+    include_results = request.query_params.get('results', '1') != '0'
+    return Response(batch_summary(batch, include_results), status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -133,14 +306,17 @@ def match_analysis(request):
         resume_data = data['resume_data']
         job_description = data['job_description']
         
-        # Perform match analysis using LLM
-        match_result = match_analyzer(resume_data, job_description)
-        if match_result:
+        # Perform match analysis using LLM; ?refresh=1 skips the cached result
+        match_result = match_analyzer(
+            resume_data, job_description, use_cache=request.query_params.get('refresh') != '1'
+        )
+        result_status = _llm_status(match_result)
+        if result_status == status.HTTP_200_OK:
             user = User.objects.get(id=request.user.id)
             user.job_analyzed += 1
             user.save()
         
-        return Response(match_result, status=status.HTTP_200_OK)
+        return Response(match_result, status=result_status)
         
     except Exception as e:
         return Response(
@@ -151,6 +327,36 @@ def match_analysis(request):
 
 
 
+@async_api_view(['POST'], [JSONParser])
+async def match_analysis_async(request):
+    """Async match_analysis: the LLM call doesn't hold a worker thread"""
+    
+    try:
+        data = request.data
+        
+        if 'resume_data' not in data or 'job_description' not in data:
+            return JsonResponse(
+                {"error": "Both resume_data and job_description are required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        match_result = await amatch_analyzer(
+            data['resume_data'], data['job_description'],
+            use_cache=request.query_params.get('refresh') != '1'
+        )
+        result_status = _llm_status(match_result)
+        if result_status == status.HTTP_200_OK:
+            await User.objects.filter(id=request.user.id).aupdate(job_analyzed=F('job_analyzed') + 1)
+        
+        return JsonResponse(match_result, status=result_status)
+        
+    except Exception as e:
+        return JsonResponse(
+            {"error": "Failed to analyze match", "message": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['POST'])
 @parser_classes([JSONParser])
 @permission_classes([IsAuthenticated])
@@ -198,6 +404,56 @@ def get_resume_history(request):
     return Response({'resumes': resume_list})
 
 
+def _wants_stream(data):
+    return str(data.get('stream', '')).lower() in ('true', '1')
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _event_stream(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the stream until it ends
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _cover_letter_events(user_id, first, pieces):
+    """SSE frames for a streamed cover letter: delta*, then done or error.
+
+    The letter is counted only once the stream completes.
+    """
+    parts = [first]
+    try:
+        if first:
+            yield _sse('delta', {'text': first})
+        for text in pieces:
+            parts.append(text)
+            yield _sse('delta', {'text': text})
+    except LLMStreamError as e:
+        yield _sse('error', e.error)
+        return
+    User.objects.filter(id=user_id).update(cover_letters=F('cover_letters') + 1)
+    yield _sse('done', {'cover_letter': ''.join(parts).strip()})
+
+
+async def _acover_letter_events(user_id, first, pieces):
+    parts = [first]
+    try:
+        if first:
+            yield _sse('delta', {'text': first})
+        async for text in pieces:
+            parts.append(text)
+            yield _sse('delta', {'text': text})
+    except LLMStreamError as e:
+        yield _sse('error', e.error)
+        return
+    await User.objects.filter(id=user_id).aupdate(cover_letters=F('cover_letters') + 1)
+    yield _sse('done', {'cover_letter': ''.join(parts).strip()})
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def cover_letter_generator_custom(request):
@@ -215,6 +471,21 @@ def cover_letter_generator_custom(request):
                 'error': 'job_description, company_name, and job_title are required fields'
             }, status=400)
 
+        # stream=true answers with server-sent events as the letter is written
+        if _wants_stream(data):
+            pieces = stream_cover_letter(
+                resume_data=resume_data,
+                job_description=job_description,
+                company_name=company_name,
+                job_title=job_title,
+                additional_prompts=additional_prompts
+            )
+            try:
+                first = next(pieces, '')
+            except LLMStreamError as e:
+                return Response(e.error, status=_llm_status(e.error))
+            return _event_stream(_cover_letter_events(request.user.id, first, pieces))
+
         # Generate Cover Letter with llm
         cover_letter = generate_cover_letter(
             resume_data=resume_data,
@@ -223,14 +494,59 @@ def cover_letter_generator_custom(request):
             job_title=job_title,
             additional_prompts=additional_prompts
         )
-        if cover_letter:
-            user = User.objects.get(id=request.user.id)
-            user.cover_letters += 1
-            user.save()
+        result_status = _llm_status(cover_letter)
+        if result_status != status.HTTP_200_OK:
+            return Response(cover_letter, status=result_status)
+        user = User.objects.get(id=request.user.id)
+        user.cover_letters += 1
+        user.save()
         return Response({'cover_letter': cover_letter})
     except Exception as e:
         return Response({'error': str(e)}, status=400)
 
+@async_api_view(['POST'], [JSONParser, FormParser, MultiPartParser])
+async def cover_letter_generator_async(request):
+    """Async cover_letter_generator_custom: the LLM call doesn't hold a worker thread"""
+    try:
+        data = request.data
+        job_description = data.get('job_description')
+        company_name = data.get('company_name')
+        job_title = data.get('job_title')
+
+        if not job_description or not company_name or not job_title:
+            return JsonResponse({
+                'error': 'job_description, company_name, and job_title are required fields'
+            }, status=400)
+
+        if _wants_stream(data):
+            pieces = astream_cover_letter(
+                resume_data=data.get('resume_data'),
+                job_description=job_description,
+                company_name=company_name,
+                job_title=job_title,
+                additional_prompts=data.get('additional_prompts')
+            )
+            try:
+                first = await anext(pieces, '')
+            except LLMStreamError as e:
+                return JsonResponse(e.error, status=_llm_status(e.error))
+            return _event_stream(_acover_letter_events(request.user.id, first, pieces))
+
+        cover_letter = await agenerate_cover_letter(
+            resume_data=data.get('resume_data'),
+            job_description=job_description,
+            company_name=company_name,
+            job_title=job_title,
+            additional_prompts=data.get('additional_prompts')
+        )
+        result_status = _llm_status(cover_letter)
+        if result_status != status.HTTP_200_OK:
+            return JsonResponse(cover_letter, status=result_status)
+        await User.objects.filter(id=request.user.id).aupdate(cover_letters=F('cover_letters') + 1)
+        return JsonResponse({'cover_letter': cover_letter})
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_cover_letter_history(request):
@@ -272,4 +588,30 @@ def user_stats(request):
         return Response({
             'success': False,
             'message': 'Failed to fetch user statistics'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Hit/miss counters for this worker's resume caches"""
+    return Response({
+        'extracted_text': text_cache.stats(),
+        'text_compaction': text_compaction.totals(),
+        'pdf_extraction': get_extraction_service().memory_stats(),
+        'resume_parse': parse_cache.stats(),
+        'match_analysis': match_cache.stats(),
+        'llm_circuit': circuit_state(),
+        'llm_json': json_stats(),
+        'llm_single_flight': {
+            'resume_parse': parse_flight.stats(),
+            'match_analysis': match_flight.stats(),
+            'cover_letter': cover_letter_flight.stats(),
+        },
+        'llm_rate_limit': get_rate_limiter().stats() if get_rate_limiter() else None,
+        'llm_rate_limit_batch': (
+            get_batch_rate_limiter().stats()
+            if get_batch_rate_limiter() not in (None, get_rate_limiter()) else None
+        ),
+        'llm_routes': routing_table(),
+    }, status=status.HTTP_200_OK)